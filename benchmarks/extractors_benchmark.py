@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos extratores por site contra o caminho genérico.
+
+Faz o parse das páginas em benchmarks/fixtures com o extrator do site e
+com o extrator genérico e compara tokens enviados ao LLM e tempo de parse.
+
+Uso:
+    python benchmarks/extractors_benchmark.py [--repeat 50]
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+from extractors import GENERIC, get_extractor  # noqa: E402
+from web_scraper import WebScraper  # noqa: E402
+
+FIXTURES_DIR = ROOT / 'benchmarks' / 'fixtures'
+
+# Fixture -> URL de origem (define o extrator escolhido pelo domínio)
+FIXTURES = {
+    'modthesims.html': 'https://modthesims.info/d/000001/better-autonomy-overhaul.html',
+    'curseforge.html': 'https://www.curseforge.com/sims4/mods/custom-traits-pack',
+    'patreon.html': 'https://www.patreon.com/posts/romance-overhaul-3-0-000001',
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Mesma estimativa usada pelo LLMClient (~4 caracteres por token)."""
+    return len(text) // 4
+
+
+def measure(scraper: WebScraper, url: str, body: bytes, extractor, repeat: int):
+    """Retorna (resultado, mediana do tempo de parse em ms)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = scraper._parse(url, body, extractor=extractor)
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara extratores por site com o genérico')
+    parser.add_argument('--repeat', type=int, default=50, help='Repetições por página')
+    parser.add_argument('--show-text', action='store_true', help='Mostra o texto extraído')
+    args = parser.parse_args()
+
+    scraper = WebScraper(cache=None)
+    header = f"{'página':<18}{'extrator':<16}{'KB':>6}{'tokens':>9}{'parse ms':>10}"
+    print(header)
+    print('-' * len(header))
+
+    totals = {'generic': [0, 0.0], 'site': [0, 0.0]}
+    for filename, url in FIXTURES.items():
+        body = (FIXTURES_DIR / filename).read_bytes()
+        site = get_extractor(url)
+        for label, extractor in (('generic', GENERIC), ('site', site)):
+            result, parse_ms = measure(scraper, url, body, extractor, args.repeat)
+            tokens = estimate_tokens(result['full_text'])
+            totals[label][0] += tokens
+            totals[label][1] += parse_ms
+            print(f"{filename:<18}{extractor.name:<16}{len(body) // 1024:>6}{tokens:>9}{parse_ms:>10.2f}")
+            if args.show_text:
+                print(f"  {result['full_text'][:600]}\n")
+
+    print('-' * len(header))
+    for label, (tokens, parse_ms) in totals.items():
+        print(f"{'total':<18}{label:<16}{'':>6}{tokens:>9}{parse_ms:>10.2f}")
+    generic_tokens, generic_ms = totals['generic']
+    site_tokens, site_ms = totals['site']
+    print(f"\nTokens: -{100 * (1 - site_tokens / generic_tokens):.0f}%  "
+          f"Parse: -{100 * (1 - site_ms / generic_ms):.0f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+Servidores locais que imitam as APIs externas do pipeline (benchmarks offline).
+
+Um único processo atende, na mesma porta:
+
+- OpenAI     POST /v1/chat/completions (com e sem streaming)
+- Anthropic  POST /v1/messages (tool_use ou texto, com e sem streaming)
+- Gemini     POST /v1beta/models/<modelo>:generateContent e
+             :streamGenerateContent?alt=sse (API REST)
+- Notion     GET/PATCH /v1/pages/<id> (Notes guardado em memória) e
+             POST /v1/databases/<id>/query (paginado)
+- Sites      qualquer requisição de proxy (HTTP_PROXY apontando para cá):
+             modthesims.info, curseforge.com e patreon.com respondem com as
+             páginas gravadas em benchmarks/fixtures (ETag/304 incluídos);
+             /robots.txt proíbe /private/ e pode pedir um Crawl-delay
+
+A latência (mediana + jitter + cauda), a taxa de 429 e a taxa de JSON
+malformado são configuráveis. Pedidos de reparo (prompt "corrige
+respostas JSON") sempre recebem JSON válido, como um modelo que acerta
+na segunda tentativa. GET /_stats devolve os contadores de requisições.
+
+Uso:
+    python benchmarks/fake_servers.py [--port 8780] [--latency-ms 800]
+        [--rate-429 0.05] [--malformed 0.05]
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+# Domínio -> página gravada (hosts desconhecidos recebem a do modthesims)
+SITE_FIXTURES = {
+    'modthesims.info': 'modthesims.html',
+    'curseforge.com': 'curseforge.html',
+    'patreon.com': 'patreon.html',
+}
+
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+# Classificação coerente com o esquema (passa na validação de consistência)
+CLASSIFICATION = {
+    'priority': 3, 'priority_label': 'Verde', 'score': 4, 'remocao': 2,
+    'framework': 0, 'essencial': 2, 'sub_category': '3C',
+    'sub_category_label': 'Família', 'mod_name': 'Mod de benchmark',
+    'creator': '', 'notes_reason': 'Classificação gerada pelo servidor falso do benchmark.',
+}
+
+REPAIR_MARKER = 'corrige respostas JSON'
+PACKED_ID = re.compile(r'=== Mod id=([^\s=]+) ===')
+
+STREAM_CHUNK_CHARS = 12
+
+# Parâmetros de FakeBehavior expostos como opções de linha de comando
+BEHAVIOR_OPTIONS = ('latency_ms', 'jitter_ms', 'tail_rate', 'tail_ms', 'rate_429', 'retry_after_ms',
+                    'malformed', 'notion_latency_ms', 'site_latency_ms', 'site_rate_429',
+                    'robots_crawl_delay', 'notion_rows', 'seed')
+
+
+class FakeBehavior:
+    """Latência e falhas injetadas pelos servidores falsos."""
+
+    def __init__(self, latency_ms: float = 800, jitter_ms: float = 200,
+                 tail_rate: float = 0.02, tail_ms: float = 5000,
+                 rate_429: float = 0.0, retry_after_ms: int = 200,
+                 malformed: float = 0.0, notion_latency_ms: float = 150,
+                 site_latency_ms: float = 80, site_rate_429: float = 0.0,
+                 robots_crawl_delay: float = 0.0, notion_rows: int = 200,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            latency_ms: Latência mediana das respostas dos LLMs
+            jitter_ms: Variação uniforme (±) em torno da mediana
+            tail_rate: Fração das respostas de LLM com latência de cauda
+            tail_ms: Latência das respostas de cauda
+            rate_429: Fração das requisições (LLM e Notion) respondidas com 429
+            retry_after_ms: Espera sugerida nos 429 (retry-after-ms / Retry-After)
+            malformed: Fração das classificações com JSON truncado
+            notion_latency_ms: Latência mediana do Notion
+            site_latency_ms: Latência mediana das páginas dos sites
+            site_rate_429: Fração das páginas dos sites respondidas com 429 (com Retry-After)
+            robots_crawl_delay: Crawl-delay anunciado no robots.txt dos sites (0: nenhum)
+            notion_rows: Linhas devolvidas por databases.query
+            seed: Semente do sorteio (reprodutível entre execuções)
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tail_rate = tail_rate
+        self.tail_ms = tail_ms
+        self.rate_429 = rate_429
+        self.retry_after_ms = retry_after_ms
+        self.malformed = malformed
+        self.notion_latency_ms = notion_latency_ms
+        self.site_latency_ms = site_latency_ms
+        self.site_rate_429 = site_rate_429
+        self.robots_crawl_delay = robots_crawl_delay
+        self.notion_rows = notion_rows
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def roll(self, rate: float) -> bool:
+        """Sorteia um evento com a probabilidade rate."""
+        with self._lock:
+            return rate > 0 and self._random.random() < rate
+
+    def sleep(self, median_ms: float, tail: bool = False) -> None:
+        """Espera median_ms ± jitter (ou tail_ms, sorteado com tail_rate)."""
+        if tail and self.roll(self.tail_rate):
+            time.sleep(self.tail_ms / 1000)
+            return
+        jitter = min(self.jitter_ms, median_ms)
+        with self._lock:
+            delay = median_ms + self._random.uniform(-jitter, jitter)
+        time.sleep(max(0.0, delay) / 1000)
+
+
+class FakeState:
+    """Estado compartilhado entre as requisições (Notes do Notion, contadores)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.notes: Dict[str, str] = {}
+        self.counts = Counter()
+        self.site_active = Counter()
+        self.pages = {name: (FIXTURES_DIR / filename).read_bytes()
+                      for name, filename in SITE_FIXTURES.items()}
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.counts[key] += 1
+
+
+def site_fixture(host: str) -> str:
+    """Domínio (com ou sem subdomínio) -> chave de SITE_FIXTURES."""
+    for domain in SITE_FIXTURES:
+        if host == domain or host.endswith('.' + domain):
+            return domain
+    return 'modthesims.info'
+
+
+def classification_text(user_message: str) -> str:
+    """Resposta JSON para uma classificação simples ou empacotada (=== Mod id=N ===)."""
+    ids = PACKED_ID.findall(user_message)
+    if ids:
+        return json.dumps({'classifications': [dict(CLASSIFICATION, id=mod_id) for mod_id in ids]},
+                          ensure_ascii=False)
+    return json.dumps(CLASSIFICATION, ensure_ascii=False)
+
+
+def chunks(text: str) -> List[str]:
+    return [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Roteia as requisições para o provedor, o Notion ou o site imitado."""
+
+    protocol_version = 'HTTP/1.1'
+    behavior: FakeBehavior = None
+    state: FakeState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- Utilitários ---
+
+    def _send(self, status: int, body, headers: Optional[Dict[str, str]] = None,
+              content_type: str = 'application/json') -> None:
+        data = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_sse(self, events: List) -> None:
+        """Envia eventos SSE; tuplas (nome, dados) viram 'event:' + 'data:'."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for event in events:
+            if isinstance(event, tuple):
+                self.wfile.write(f"event: {event[0]}\ndata: {json.dumps(event[1])}\n\n".encode('utf-8'))
+            else:
+                data = event if isinstance(event, str) else json.dumps(event)
+                self.wfile.write(f"data: {data}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        self.close_connection = True
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _too_many_requests(self, kind: str, error: Dict) -> bool:
+        """Responde 429 (com retry-after-ms e Retry-After) na fração configurada."""
+        if not self.behavior.roll(self.behavior.rate_429):
+            return False
+        self.state.count(f'{kind}_429')
+        retry_after_ms = self.behavior.retry_after_ms
+        self._send(429, error, {'retry-after-ms': str(retry_after_ms),
+                                'Retry-After': str(max(1, round(retry_after_ms / 1000)))})
+        return True
+
+    def _llm_output(self, kind: str, text_of_request: str, user_message: str) -> str:
+        """Espera a latência do LLM e devolve a classificação (às vezes truncada)."""
+        self.state.count(kind)
+        self.behavior.sleep(self.behavior.latency_ms, tail=True)
+        output = classification_text(user_message)
+        if REPAIR_MARKER in text_of_request:
+            self.state.count(f'{kind}_repair')
+        elif self.behavior.roll(self.behavior.malformed):
+            self.state.count(f'{kind}_malformed')
+            output = output[:len(output) * 2 // 3]
+        return output
+
+    # --- Roteamento ---
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        host = (url.hostname or self.headers.get('Host', '').rsplit(':', 1)[0]).strip('[]')
+        if host and host not in LOCAL_HOSTS:
+            return self._site(host, method)
+        path = url.path
+        body = self._read_json() if method in ('POST', 'PATCH') else {}
+        if path == '/_stats':
+            with self.state.lock:
+                return self._send(200, dict(self.state.counts))
+        if path.endswith('/chat/completions'):
+            return self._openai(body)
+        if path.endswith('/messages'):
+            return self._anthropic(body)
+        if ':generateContent' in path or ':streamGenerateContent' in path:
+            return self._gemini(body, stream=':streamGenerateContent' in path,
+                                sse=parse_qs(url.query).get('alt') == ['sse'])
+        if '/cachedContents' in path:
+            return self._gemini_cache(method, body)
+        if path.startswith('/v1/pages/'):
+            return self._notion_page(method, path[len('/v1/pages/'):], body)
+        if path.startswith('/v1/databases/') and path.endswith('/query'):
+            return self._notion_query(body)
+        self._send(404, {'error': f'rota não imitada: {method} {path}'})
+
+    # --- Sites ---
+
+    def _site(self, host: str, method: str) -> None:
+        if urlsplit(self.path).path == '/robots.txt':
+            self.state.count('site_robots')
+            robots = 'User-agent: *\nDisallow: /private/\n'
+            if self.behavior.robots_crawl_delay:
+                robots += f'Crawl-delay: {self.behavior.robots_crawl_delay:g}\n'
+            return self._send(200, robots.encode('utf-8'), content_type='text/plain')
+        # Maior número de requisições simultâneas visto em um mesmo host
+        with self.state.lock:
+            self.state.site_active[host] += 1
+            active = self.state.site_active[host]
+            if active > self.state.counts['site_max_active']:
+                self.state.counts['site_max_active'] = active
+        try:
+            self._site_page(host, method)
+        finally:
+            with self.state.lock:
+                self.state.site_active[host] -= 1
+
+    def _site_page(self, host: str, method: str) -> None:
+        self.state.count('site')
+        domain = site_fixture(host)
+        page = self.state.pages[domain]
+        etag = '"' + hashlib.sha1(page).hexdigest()[:16] + '"'
+        self.behavior.sleep(self.behavior.site_latency_ms)
+        if self.behavior.roll(self.behavior.site_rate_429):
+            self.state.count('site_429')
+            return self._send(429, b'Too Many Requests', {'Retry-After': '1'}, content_type='text/plain')
+        if self.headers.get('If-None-Match') == etag:
+            self.state.count('site_304')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self._send(200, page if method != 'HEAD' else b'', {'ETag': etag},
+                   content_type='text/html; charset=utf-8')
+
+    # --- OpenAI ---
+
+    def _openai(self, body: Dict) -> None:
+        if self._too_many_requests('openai', {'error': {
+                'message': 'Rate limit reached (servidor falso)', 'type': 'requests',
+                'code': 'rate_limit_exceeded'}}):
+            return
+        messages = body.get('messages') or [{}]
+        user_message = str(messages[-1].get('content', ''))
+        output = self._llm_output('openai', json.dumps(messages[0], ensure_ascii=False), user_message)
+        usage = {'prompt_tokens': len(json.dumps(messages)) // 4,
+                 'completion_tokens': len(output) // 4}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        base = {'id': 'chatcmpl-fake', 'created': int(time.time()), 'model': body.get('model', 'fake')}
+        if not body.get('stream'):
+            return self._send(200, dict(base, object='chat.completion', usage=usage, choices=[{
+                'index': 0, 'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': output}}]))
+        events = [dict(base, object='chat.completion.chunk', choices=[{
+            'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]) for piece in chunks(output)]
+        events.append(dict(base, object='chat.completion.chunk', choices=[], usage=usage))
+        events.append('[DONE]')
+        self._send_sse(events)
+
+    # --- Anthropic ---
+
+    def _anthropic(self, body: Dict) -> None:
+        if self._too_many_requests('anthropic', {'type': 'error', 'error': {
+                'type': 'rate_limit_error', 'message': 'Rate limit (servidor falso)'}}):
+            return
+        messages = body.get('messages') or [{}]
+        content = messages[-1].get('content', '')
+        user_message = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+        output = self._llm_output('anthropic', json.dumps(body.get('system'), ensure_ascii=False),
+                                  user_message)
+        tools = body.get('tools') or []
+        usage = {'input_tokens': len(json.dumps(messages)) // 4, 'output_tokens': len(output) // 4}
+        message = {'id': 'msg_fake', 'type': 'message', 'role': 'assistant',
+                   'model': body.get('model', 'fake'), 'stop_sequence': None}
+        try:
+            tool_input = json.loads(output) if tools else None
+        except ValueError:
+            tool_input = None
+        if not body.get('stream'):
+            if tool_input is not None:
+                block = {'type': 'tool_use', 'id': 'toolu_fake', 'name': tools[0]['name'],
+                         'input': tool_input}
+            else:
+                block = {'type': 'text', 'text': output}
+            return self._send(200, dict(message, content=[block], usage=usage,
+                                        stop_reason='tool_use' if tool_input is not None else 'end_turn'))
+        if tools:
+            start = {'type': 'tool_use', 'id': 'toolu_fake', 'name': tools[0]['name'], 'input': {}}
+            delta = [{'type': 'input_json_delta', 'partial_json': piece} for piece in chunks(output)]
+        else:
+            start = {'type': 'text', 'text': ''}
+            delta = [{'type': 'text_delta', 'text': piece} for piece in chunks(output)]
+        events = [
+            ('message_start', {'type': 'message_start', 'message': dict(
+                message, content=[], stop_reason=None, usage=dict(usage, output_tokens=1))}),
+            ('content_block_start', {'type': 'content_block_start', 'index': 0, 'content_block': start}),
+        ]
+        events += [('content_block_delta', {'type': 'content_block_delta', 'index': 0, 'delta': item})
+                   for item in delta]
+        events += [
+            ('content_block_stop', {'type': 'content_block_stop', 'index': 0}),
+            ('message_delta', {'type': 'message_delta',
+                               'delta': {'stop_reason': 'tool_use' if tools else 'end_turn',
+                                         'stop_sequence': None},
+                               'usage': {'output_tokens': usage['output_tokens']}}),
+            ('message_stop', {'type': 'message_stop'}),
+        ]
+        self._send_sse(events)
+
+    # --- Gemini ---
+
+    def _gemini(self, body: Dict, stream: bool, sse: bool) -> None:
+        if self._too_many_requests('google', {'error': {
+                'code': 429, 'message': 'Resource exhausted (servidor falso)',
+                'status': 'RESOURCE_EXHAUSTED'}}):
+            return
+        contents = body.get('contents') or [{}]
+        user_message = ''.join(part.get('text', '') for part in contents[-1].get('parts', []))
+        system = json.dumps(body.get('systemInstruction') or body.get('system_instruction'),
+                            ensure_ascii=False)
+        output = self._llm_output('google', system, user_message)
+        usage = {'promptTokenCount': len(json.dumps(contents)) // 4,
+                 'candidatesTokenCount': len(output) // 4}
+        usage['totalTokenCount'] = usage['promptTokenCount'] + usage['candidatesTokenCount']
+
+        def response(text: str, finish: Optional[str]) -> Dict:
+            candidate = {'content': {'role': 'model', 'parts': [{'text': text}]}, 'index': 0}
+            if finish:
+                candidate['finishReason'] = finish
+            return {'candidates': [candidate], 'usageMetadata': usage}
+
+        if not stream:
+            return self._send(200, response(output, 'STOP'))
+        pieces = chunks(output)
+        events = [response(piece, 'STOP' if i == len(pieces) - 1 else None)
+                  for i, piece in enumerate(pieces)]
+        if sse:
+            return self._send_sse(events)
+        self._send(200, events)
+
+    def _gemini_cache(self, method: str, body: Dict) -> None:
+        self.state.count('google_cache')
+        if method == 'DELETE':
+            return self._send(200, {})
+        self._send(200, {'name': 'cachedContents/fake', 'model': body.get('model', ''),
+                         'expireTime': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() + 3600)),
+                         'usageMetadata': {'totalTokenCount': 0}})
+
+    # --- Notion ---
+
+    def _notion_error(self) -> Dict:
+        return {'object': 'error', 'status': 429, 'code': 'rate_limited',
+                'message': 'Rate limited (servidor falso)'}
+
+    def _notion_page_object(self, page_id: str) -> Dict:
+        with self.state.lock:
+            notes = self.state.notes.get(page_id, '')
+        rich_text = [{'type': 'text', 'text': {'content': notes}, 'plain_text': notes}] if notes else []
+        return {'object': 'page', 'id': page_id,
+                'properties': {'Notes': {'id': 'notes', 'type': 'rich_text', 'rich_text': rich_text}}}
+
+    def _notion_page(self, method: str, page_id: str, body: Dict) -> None:
+        if self._too_many_requests('notion', self._notion_error()):
+            return
+        self.state.count(f'notion_{method.lower()}')
+        self.behavior.sleep(self.behavior.notion_latency_ms)
+        if method == 'PATCH':
+            notes = (body.get('properties') or {}).get('Notes', {}).get('rich_text', [])
+            with self.state.lock:
+                self.state.notes[page_id] = ''.join(
+                    item.get('text', {}).get('content', '') for item in notes)
+        self._send(200, self._notion_page_object(page_id))
+
+    def _notion_query(self, body: Dict) -> None:
+        if self._too_many_requests('notion', self._notion_error()):
+            return
+        self.state.count('notion_query')
+        self.behavior.sleep(self.behavior.notion_latency_ms)
+        start = int(body.get('start_cursor') or 0)
+        end = min(self.behavior.notion_rows, start + int(body.get('page_size') or 100))
+        domains = list(SITE_FIXTURES)
+        results = []
+        for index in range(start, end):
+            page = self._notion_page_object(f'{index:032x}')
+            url = f'http://{domains[index % len(domains)]}/mods/{index}'
+            page['properties']['URL'] = {'id': 'url', 'type': 'url', 'url': url}
+            results.append(page)
+        has_more = end < self.behavior.notion_rows
+        self._send(200, {'object': 'list', 'results': results, 'has_more': has_more,
+                         'next_cursor': str(end) if has_more else None})
+
+
+def make_server(behavior: FakeBehavior, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Cria o servidor falso (port=0 escolhe uma porta livre)."""
+    handler = type('Handler', (FakeHandler,), {'behavior': behavior, 'state': FakeState()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def add_behavior_args(parser) -> None:
+    """Opções de latência e falhas (compartilhadas com pipeline_benchmark.py)."""
+    parser.add_argument('--latency-ms', type=float, default=800, help='Latência mediana do LLM (padrão: 800)')
+    parser.add_argument('--jitter-ms', type=float, default=200, help='Variação ± da latência (padrão: 200)')
+    parser.add_argument('--tail-rate', type=float, default=0.02,
+                        help='Fração das respostas com latência de cauda (padrão: 0.02)')
+    parser.add_argument('--tail-ms', type=float, default=5000, help='Latência de cauda (padrão: 5000)')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Fração de respostas 429 (padrão: 0)')
+    parser.add_argument('--retry-after-ms', type=int, default=200, help='Retry-After dos 429 (padrão: 200)')
+    parser.add_argument('--malformed', type=float, default=0.0,
+                        help='Fração de classificações com JSON truncado (padrão: 0)')
+    parser.add_argument('--notion-latency-ms', type=float, default=150,
+                        help='Latência mediana do Notion (padrão: 150)')
+    parser.add_argument('--site-latency-ms', type=float, default=80,
+                        help='Latência mediana das páginas dos sites (padrão: 80)')
+    parser.add_argument('--site-rate-429', type=float, default=0.0,
+                        help='Fração das páginas dos sites respondidas com 429 (padrão: 0)')
+    parser.add_argument('--robots-crawl-delay', type=float, default=0.0,
+                        help='Crawl-delay anunciado no robots.txt dos sites (padrão: nenhum)')
+    parser.add_argument('--notion-rows', type=int, default=200,
+                        help='Linhas devolvidas por databases.query (padrão: 200)')
+    parser.add_argument('--seed', type=int, default=None, help='Semente do sorteio')
+
+
+def behavior_args(args) -> List[str]:
+    """Converte as opções de add_behavior_args de volta em argumentos de linha de comando."""
+    argv = []
+    for name in BEHAVIOR_OPTIONS:
+        value = getattr(args, name)
+        if value is not None:
+            argv += ['--' + name.replace('_', '-'), str(value)]
+    return argv
+
+
+def main():
+    parser = argparse.ArgumentParser(description='APIs falsas (LLMs, Notion, sites) para benchmarks offline')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8780, help='Porta (0 escolhe uma livre)')
+    add_behavior_args(parser)
+    args = parser.parse_args()
+    behavior = FakeBehavior(**{name: getattr(args, name) for name in BEHAVIOR_OPTIONS})
+    server = make_server(behavior, args.host, args.port)
+    # A primeira linha informa a porta a quem iniciou o processo
+    print(f"PORT {server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Escalabilidade do parse de HTML com o pool de processos do WebScraper.
+
+Faz o parse do corpus de benchmarks/fixtures (páginas repetidas com URLs
+diferentes) com o parse na thread (0 processos, várias threads presas ao
+GIL) e com 1..N processos (SCRAPER_PARSE_WORKERS), enviando só os bytes
+de cada página ao pool. Reporta páginas/s e o ganho em relação a 1
+processo.
+
+Antes, mede o pico de memória de cada página do corpus com tracemalloc
+(parse na thread, uma página por vez) e o compara com a estimativa
+peak_kb_est do fetch_stats.
+
+Uso:
+    python benchmarks/parse_scaling.py [--pages 600] [--workers 0,1,2,4]
+        [--threads 8] [--memory-pages 50]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from extractors_benchmark import FIXTURES, FIXTURES_DIR  # noqa: E402
+from web_scraper import WebScraper  # noqa: E402
+
+
+def build_corpus(pages: int):
+    """Gera pages pares (url, corpo) alternando entre as páginas gravadas."""
+    bodies = [(url, (FIXTURES_DIR / filename).read_bytes()) for filename, url in FIXTURES.items()]
+    corpus = []
+    for n in range(pages):
+        url, body = bodies[n % len(bodies)]
+        corpus.append((f'{url}?n={n}', body))
+    return corpus
+
+
+def measure_memory(corpus) -> dict:
+    """Pico de memória medido (tracemalloc) e estimado do parse de cada página, em KB."""
+    scraper = WebScraper(cache=None, parse_workers=0, trace_memory=True)
+    try:
+        stats = [scraper._parse_body(url, body)['fetch_stats'] for url, body in corpus]
+    finally:
+        scraper.close()
+    measured = [item['peak_kb'] for item in stats]
+    estimated = [item['peak_kb_est'] for item in stats]
+    return {
+        'pages': len(stats),
+        'measured_median': statistics.median(measured),
+        'measured_max': max(measured),
+        'estimated_median': statistics.median(estimated),
+        'estimated_max': max(estimated),
+        'ratio_median': statistics.median(m / e for m, e in zip(measured, estimated) if e),
+    }
+
+
+def measure(corpus, workers: int, threads: int) -> dict:
+    """Parse do corpus com `threads` threads enviando ao pool de `workers` processos."""
+    scraper = WebScraper(cache=None, parse_workers=workers)
+    try:
+        # Sobe os processos antes de medir (o spawn não entra na vazão)
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda item: scraper._parse_body(*item), corpus[:max(workers, 1) * 2]))
+            cpu_started = time.process_time()
+            started = time.perf_counter()
+            results = list(executor.map(lambda item: scraper._parse_body(*item), corpus))
+            seconds = time.perf_counter() - started
+            cpu_seconds = time.process_time() - cpu_started
+    finally:
+        scraper.close()
+    return {
+        'workers': workers,
+        'pages': len(results),
+        'seconds': seconds,
+        'pages_per_s': len(results) / seconds,
+        'parent_cpu_s': cpu_seconds,
+    }
+
+
+def main():
+    cores = os.cpu_count() or 1
+    default_workers = sorted({0, 1, cores} | {w for w in (2, 4, 8) if w <= cores})
+    parser = argparse.ArgumentParser(description='Escalabilidade do parse com o pool de processos')
+    parser.add_argument('--pages', type=int, default=600, help='Páginas no corpus (padrão: 600)')
+    parser.add_argument('--workers', default=','.join(map(str, default_workers)),
+                        help='Processos a medir, separados por vírgula (0: parse na thread)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Threads enviando páginas (padrão: 2x o maior número de processos)')
+    parser.add_argument('--memory-pages', type=int, default=50,
+                        help='Páginas com o pico de memória medido (padrão: 50; 0 desativa)')
+    args = parser.parse_args()
+    workers_list = [int(value) for value in args.workers.split(',') if value.strip()]
+    threads = args.threads or max(2 * max(workers_list), 2)
+
+    corpus = build_corpus(args.pages)
+    print(f"Corpus: {args.pages} páginas, {sum(len(body) for _, body in corpus) // 1024} KB; "
+          f"{cores} núcleos; {threads} threads enviando\n")
+
+    if args.memory_pages:
+        memory = measure_memory(corpus[:args.memory_pages])
+        print(f"Pico de memória do parse ({memory['pages']} páginas, tracemalloc): "
+              f"mediana {memory['measured_median']:.1f} KB, máximo {memory['measured_max']:.1f} KB")
+        print(f"Estimativa peak_kb_est: mediana {memory['estimated_median']:.1f} KB, "
+              f"máximo {memory['estimated_max']:.1f} KB "
+              f"(medido/estimado: {memory['ratio_median']:.2f}x na mediana)\n")
+    header = f"{'processos':<12}{'páginas/s':>11}{'segundos':>10}{'CPU pai s':>11}{'ganho':>8}"
+    print(header)
+    print('-' * len(header))
+    baseline = None
+    for workers in workers_list:
+        result = measure(corpus, workers, threads)
+        if workers == 1:
+            baseline = result['pages_per_s']
+        gain = f"{result['pages_per_s'] / baseline:.2f}x" if baseline and workers else '-'
+        label = f"{workers}" if workers else '0 (thread)'
+        print(f"{label:<12}{result['pages_per_s']:>11.1f}{result['seconds']:>10.2f}"
+              f"{result['parent_cpu_s']:>11.2f}{gain:>8}")
+    if cores == 1:
+        print("\nSó 1 núcleo disponível: o pool não tem como escalar nesta máquina.")
+
+
+if __name__ == '__main__':
+    main()
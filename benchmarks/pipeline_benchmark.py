@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline do pipeline completo (extração -> LLM -> Notion).
+
+Sobe benchmarks/fake_servers.py em um processo separado e aponta o
+pipeline para ele (LLM_BASE_URL, NOTION_BASE_URL e HTTP_PROXY para as
+páginas gravadas em benchmarks/fixtures); nada sai da máquina e nenhuma
+chave real é usada. Cenários:
+
+- scrape: reexecuta o corpus pelo WebScraper (páginas/s, latência, memória)
+- single: um processo `main.py <url> <page_id>` por mod (partida a frio)
+- batch:  `main.py batch` com o corpus inteiro (mods/s, latência por mod)
+
+Para cada cenário são reportados vazão, p50/p95/p99, pico de memória
+(RSS máximo do processo) e o que o servidor falso injetou (429s, JSON
+malformado, reparos).
+
+Uso:
+    python benchmarks/pipeline_benchmark.py [--provider openai] [--mods 60]
+        [--scenarios scrape,single,batch] [--rate-429 0.05] [--malformed 0.05]
+        [--json relatorio.json]
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT / 'src'
+sys.path.insert(0, str(ROOT / 'src'))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from fake_servers import add_behavior_args, behavior_args  # noqa: E402
+from metrics import percentile  # noqa: E402
+
+# Modelo usado para cada provedor imitado
+PROVIDER_MODELS = {
+    'openai': 'gpt-4o-mini',
+    'anthropic': 'claude-3-5-haiku-latest',
+    'google': 'gemini-1.5-flash',
+}
+
+# URLs do corpus: o domínio escolhe a página gravada e o extrator do site
+URL_PATTERNS = (
+    'http://modthesims.info/d/{n:06d}/benchmark-mod-{n}.html',
+    'http://www.curseforge.com/sims4/mods/benchmark-mod-{n}',
+    'http://www.patreon.com/posts/benchmark-mod-{n}',
+)
+
+PIPELINE_STAGES = ('scrape', 'classify', 'notion')
+
+
+def build_corpus(count: int) -> List[Tuple[str, str]]:
+    """Gera count pares (url, page_id) alternando entre os sites gravados."""
+    return [(URL_PATTERNS[n % len(URL_PATTERNS)].format(n=n), f'{n:032x}') for n in range(count)]
+
+
+def start_fake_server(args) -> Tuple[subprocess.Popen, int]:
+    """Inicia fake_servers.py em uma porta livre; retorna (processo, porta)."""
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / 'benchmarks' / 'fake_servers.py'), '--port', '0']
+        + behavior_args(args),
+        stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline()
+    if not line.startswith('PORT '):
+        process.kill()
+        raise RuntimeError(f"Servidor falso não iniciou: {line!r}")
+    return process, int(line.split()[1])
+
+
+def fake_stats(port: int) -> Dict[str, int]:
+    """Contadores do servidor falso (requisições, 429s, malformados, reparos)."""
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    with opener.open(f'http://127.0.0.1:{port}/_stats', timeout=10) as response:
+        return json.loads(response.read())
+
+
+def stats_delta(before: Dict[str, int], after: Dict[str, int]) -> Dict[str, int]:
+    return {key: after[key] - before.get(key, 0) for key in sorted(after) if after[key] != before.get(key, 0)}
+
+
+def pipeline_env(port: int, provider: str, state_dir: str) -> Dict[str, str]:
+    """Ambiente que aponta o pipeline para o servidor falso, sem caches nem chaves reais."""
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ)
+    # Vazias (e não ausentes) para o .env do projeto não preenchê-las
+    for name in ('LLM_HEDGE_MODEL', 'LLM_CASCADE', 'NOTION_DATABASE_ID', 'NOTION_DB_ID'):
+        env[name] = ''
+    env.update({
+        'PRECLASSIFIER': '0',
+        'LLM_MODEL': PROVIDER_MODELS[provider],
+        'LLM_API_KEY': 'fake',
+        'LLM_BASE_URL': base_url + '/v1' if provider == 'openai' else base_url,
+        'NOTION_API_KEY': 'fake',
+        'NOTION_BASE_URL': base_url,
+        'HTTP_PROXY': base_url,
+        'http_proxy': base_url,
+        'NO_PROXY': '127.0.0.1,localhost',
+        'no_proxy': '127.0.0.1,localhost',
+        'LLM_CACHE': '0',
+        'HTTP_CACHE': '0',
+        'MOD_STATE_PATH': os.path.join(state_dir, 'mod_state.sqlite3'),
+        'JOB_JOURNAL_PATH': os.path.join(state_dir, 'job_journal.sqlite3'),
+        # Os limites locais não devem mascarar a latência do servidor falso
+        'LLM_RPM': '100000',
+        'LLM_TPM': '100000000',
+        'NOTION_RPS': '1000',
+        'LOG_LEVEL': 'WARNING',
+        'PYTHONPATH': str(SRC_DIR),
+    })
+    return env
+
+
+def run_process(argv: List[str], env: Dict[str, str], log_path: str) -> Dict:
+    """
+    Roda um processo do CLI e mede tempo de parede e pico de memória.
+
+    Returns:
+        Dict com seconds, returncode e max_rss_kb (só deste processo, via wait4)
+    """
+    with open(log_path, 'ab') as log:
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable] + argv, cwd=str(SRC_DIR), env=env,
+                                   stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return {'seconds': seconds, 'returncode': process.returncode,
+            'max_rss_kb': usage.ru_maxrss}
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    return {f'p{int(q * 100)}_ms': round(percentile(seconds, q) * 1000, 1) for q in (0.5, 0.95, 0.99)}
+
+
+def stage_summary(spans_per_mod: List[List[Dict]]) -> Dict[str, Dict[str, float]]:
+    """p50/p95/p99 de cada etapa a partir dos spans gravados por mod."""
+    by_stage: Dict[str, List[float]] = {}
+    for spans in spans_per_mod:
+        for item in spans:
+            by_stage.setdefault(item['stage'], []).append(item['ms'] / 1000)
+    return {stage: latency_summary(values) for stage, values in sorted(by_stage.items())}
+
+
+def scenario_scrape(corpus, args, env) -> Dict:
+    """Passa o corpus pelo WebScraper neste processo (só a etapa de extração)."""
+    os.environ.update(env)
+    from web_scraper import WebScraper
+    scraper = WebScraper(cache=None, pool_size=args.scrape_workers, trace_memory=True,
+                         parse_workers=args.parse_workers)
+    extract = scraper.extract_content
+    if args.async_fetch:
+        from async_fetcher import AsyncFetcher
+        fetcher = AsyncFetcher(scraper=scraper)
+        extract = fetcher.extract_content
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def fetch(url):
+        started = time.perf_counter()
+        result = extract(url)
+        return time.perf_counter() - started, result['fetch_stats']
+
+    started = time.perf_counter()
+    # Com --async-fetch as threads só esperam: os limites são os do AsyncFetcher
+    workers = len(corpus) if args.async_fetch else args.scrape_workers
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(fetch, [url for url, _ in corpus]))
+    seconds = time.perf_counter() - started
+    if args.async_fetch:
+        fetcher.close()
+    scraper.close()
+    return dict(
+        latency_summary([latency for latency, _ in results]),
+        mods=len(corpus), seconds=round(seconds, 2),
+        throughput=round(len(corpus) / seconds, 2),
+        kb_read=sum(stats['bytes'] for _, stats in results) // 1024,
+        # Medido (tracemalloc) só nos parses que não coincidiram com outro
+        parse_peak_kb=max((stats['peak_kb'] for _, stats in results if 'peak_kb' in stats), default=None),
+        parse_peak_kb_est=max(stats['peak_kb_est'] for _, stats in results),
+        max_rss_kb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        rss_growth_kb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+    )
+
+
+def scenario_single(corpus, args, env, work_dir) -> Dict:
+    """Um processo novo por mod, como no uso `main.py <url> <page_id>`."""
+    runs, spans_per_mod = [], []
+    for index, (url, page_id) in enumerate(corpus[:args.singles]):
+        metrics_path = os.path.join(work_dir, f'single-{index}.jsonl')
+        run = run_process(['main.py', url, page_id, '--metrics-out', metrics_path],
+                          env, os.path.join(work_dir, 'single.log'))
+        runs.append(run)
+        if run['returncode'] == 0:
+            spans_per_mod.append([
+                {'stage': row['labels']['stage'], 'ms': row['sum'] * 1000}
+                for row in read_jsonl(metrics_path) if row['name'] == 'stage_seconds'
+            ])
+    seconds = sum(run['seconds'] for run in runs)
+    return dict(
+        latency_summary([run['seconds'] for run in runs]),
+        mods=len(runs), errors=sum(1 for run in runs if run['returncode'] != 0),
+        seconds=round(seconds, 2), throughput=round(len(runs) / seconds, 2),
+        max_rss_kb=max(run['max_rss_kb'] for run in runs),
+        stages=stage_summary(spans_per_mod),
+    )
+
+
+def scenario_batch(corpus, args, env, work_dir) -> Dict:
+    """`main.py batch` com o corpus inteiro; latência por mod = soma das etapas."""
+    input_path = os.path.join(work_dir, 'mods.csv')
+    output_path = os.path.join(work_dir, 'results.jsonl')
+    with open(input_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['url', 'page_id'])
+        writer.writerows(corpus)
+    argv = ['main.py', 'batch', input_path, '-o', output_path,
+            '--scrape-workers', str(args.scrape_workers),
+            '--llm-workers', str(args.llm_workers),
+            '--notion-workers', str(args.notion_workers)]
+    if args.pack:
+        argv += ['--pack', str(args.pack)]
+    if args.async_fetch:
+        argv.append('--async-fetch')
+    run = run_process(argv, env, os.path.join(work_dir, 'batch.log'))
+    results = read_jsonl(output_path) if os.path.exists(output_path) else []
+    spans_per_mod = [result.get('metrics') or [] for result in results]
+    # Nos modos com extração e classificação em bloco (--pack) não há spans por mod
+    per_mod = [sum(item['ms'] for item in spans if item['stage'] in PIPELINE_STAGES) / 1000
+               for spans in spans_per_mod if spans]
+    failures = Counter(f"{result.get('stage')}: {str(result.get('error'))[:120]}"
+                       for result in results if result['status'] != 'ok')
+    return dict(
+        latency_summary(per_mod),
+        mods=len(results), errors=sum(failures.values()), failures=dict(failures.most_common(5)),
+        seconds=round(run['seconds'], 2), throughput=round(len(results) / run['seconds'], 2),
+        max_rss_kb=run['max_rss_kb'], returncode=run['returncode'],
+        stages=stage_summary(spans_per_mod),
+    )
+
+
+def read_jsonl(path: str) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def print_report(report: Dict) -> None:
+    header = f"{'cenário':<10}{'mods':>6}{'erros':>7}{'mods/s':>9}{'p50 ms':>10}{'p95 ms':>10}" \
+             f"{'p99 ms':>10}{'RSS MB':>9}"
+    print(header)
+    print('-' * len(header))
+    for name, result in report['scenarios'].items():
+        print(f"{name:<10}{result['mods']:>6}{result.get('errors', 0):>7}{result['throughput']:>9.2f}"
+              f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+              f"{result['max_rss_kb'] / 1024:>9.1f}")
+    for name, result in report['scenarios'].items():
+        if result.get('stages'):
+            print(f"\n{name} por etapa:")
+            for stage, summary in result['stages'].items():
+                print(f"  {stage:<18}p50 {summary['p50_ms']:>8.1f}  p95 {summary['p95_ms']:>8.1f}  "
+                      f"p99 {summary['p99_ms']:>8.1f} ms")
+        if result.get('injected'):
+            injected = ', '.join(f'{key}={value}' for key, value in result['injected'].items())
+            print(f"{name} servidor falso: {injected}")
+        for failure, count in (result.get('failures') or {}).items():
+            print(f"{name} erro ({count}x): {failure}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark offline do pipeline com servidores falsos')
+    parser.add_argument('--provider', choices=sorted(PROVIDER_MODELS), default='openai',
+                        help='Provedor imitado (padrão: openai)')
+    parser.add_argument('--mods', type=int, default=60, help='Mods no corpus (padrão: 60)')
+    parser.add_argument('--singles', type=int, default=5,
+                        help='Execuções do cenário single (padrão: 5)')
+    parser.add_argument('--scenarios', default='scrape,single,batch',
+                        help='Cenários separados por vírgula (padrão: scrape,single,batch)')
+    parser.add_argument('--scrape-workers', type=int, default=4)
+    parser.add_argument('--llm-workers', type=int, default=4)
+    parser.add_argument('--notion-workers', type=int, default=2)
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Processos para o parse do HTML (SCRAPER_PARSE_WORKERS; padrão: 0)')
+    parser.add_argument('--async-fetch', action='store_true',
+                        help='Baixa as páginas pelo AsyncFetcher (limites por host e robots.txt)')
+    parser.add_argument('--per-host', type=int, default=4,
+                        help='Requisições simultâneas por site com --async-fetch (padrão: 4)')
+    parser.add_argument('--crawl-delay', type=float, default=0.0,
+                        help='Segundos entre requisições ao mesmo site com --async-fetch (padrão: 0)')
+    parser.add_argument('--pack', type=int, default=None, metavar='N',
+                        help='Repassa --pack N ao modo lote')
+    parser.add_argument('--json', metavar='ARQUIVO', help='Grava o relatório em JSON')
+    add_behavior_args(parser)
+    args = parser.parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - {'scrape', 'single', 'batch'}
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(unknown))}")
+
+    corpus = build_corpus(args.mods)
+    server, port = start_fake_server(args)
+    report = {'provider': args.provider, 'model': PROVIDER_MODELS[args.provider],
+              'mods': args.mods, 'scenarios': {}}
+    try:
+        with tempfile.TemporaryDirectory(prefix='pipeline-benchmark-') as work_dir:
+            for name in scenarios:
+                # Estado de fingerprints novo: todos os mods passam pelo LLM
+                state_dir = tempfile.mkdtemp(dir=work_dir)
+                env = pipeline_env(port, args.provider, state_dir)
+                env.update(SCRAPER_PARSE_WORKERS=str(args.parse_workers),
+                           SCRAPER_PER_HOST=str(args.per_host),
+                           SCRAPER_CRAWL_DELAY=str(args.crawl_delay))
+                before = fake_stats(port)
+                if name == 'scrape':
+                    result = scenario_scrape(corpus, args, env)
+                elif name == 'single':
+                    result = scenario_single(corpus, args, env, work_dir)
+                else:
+                    result = scenario_batch(corpus, args, env, work_dir)
+                result['injected'] = stats_delta(before, fake_stats(port))
+                report['scenarios'][name] = result
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"\nProvedor: {args.provider} ({report['model']}), corpus de {args.mods} mods, "
+          f"LLM {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, 429 {args.rate_429:.0%}, "
+          f"malformado {args.malformed:.0%}\n")
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nRelatório gravado em {args.json}")
+    failed = any(result.get('errors') or result.get('returncode') for result in report['scenarios'].values())
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Orçamento de tempo de inicialização do CLI.
+
+Roda `python -X importtime -c "import main"` em processos novos e falha
+(código de saída 1) se o import cumulativo de main passar do orçamento
+ou se algum pacote pesado (SDKs dos provedores, Notion, requests, lxml,
+pydantic) for importado antes do primeiro uso.
+
+Uso:
+    python benchmarks/startup_budget.py [--budget-ms 100] [--repeat 5]
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT / 'src'
+
+DEFAULT_BUDGET_MS = 100.0
+
+# Pacotes que só podem ser importados quando o caminho que os usa roda
+DEFERRED = ('openai', 'anthropic', 'google.generativeai', 'notion_client',
+            'requests', 'lxml', 'bs4', 'pydantic', 'tiktoken', 'dotenv')
+
+
+def import_times(module: Optional[str]):
+    """
+    Importa o módulo em um interpretador novo com -X importtime.
+
+    Args:
+        module: Módulo a importar (None mede só a inicialização do interpretador)
+
+    Returns:
+        Dict {módulo: (self µs, cumulativo µs)} de tudo que foi importado
+    """
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}' if module else 'pass'],
+        cwd=str(SRC_DIR), env=env, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verifica o orçamento de inicialização do CLI')
+    parser.add_argument('--module', default='main', help='Módulo de entrada (padrão: main)')
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.getenv('STARTUP_BUDGET_MS', DEFAULT_BUDGET_MS)),
+                        help='Tempo máximo do import cumulativo (mediana)')
+    parser.add_argument('--repeat', type=int, default=5, help='Processos medidos')
+    parser.add_argument('--top', type=int, default=10, help='Módulos mais lentos exibidos')
+    args = parser.parse_args()
+
+    # A primeira execução grava os .pyc; não entra na mediana
+    import_times(args.module)
+    runs = [import_times(args.module) for _ in range(max(1, args.repeat))]
+    total_ms = statistics.median(run[args.module][1] for run in runs) / 1000
+
+    # Módulos da inicialização do interpretador (site etc.) ficam fora da lista
+    baseline = import_times(None)
+    own = {name: times for name, times in runs[-1].items() if name not in baseline}
+    slowest = sorted(own.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    header = f"{'módulo':<40}{'self ms':>10}{'cumul. ms':>12}"
+    print(header)
+    print('-' * len(header))
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"{name:<40}{self_us / 1000:>10.1f}{cumulative_us / 1000:>12.1f}")
+
+    failures = []
+    imported = [package for package in DEFERRED
+                if any(name == package or name.startswith(package + '.') for run in runs for name in run)]
+    if imported:
+        failures.append(f"importados na inicialização: {', '.join(imported)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"import {total_ms:.1f} ms acima do orçamento de {args.budget_ms:.0f} ms")
+
+    print(f"\nimport {args.module}: {total_ms:.1f} ms (mediana de {len(runs)}), "
+          f"orçamento {args.budget_ms:.0f} ms")
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
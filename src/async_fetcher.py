@@ -0,0 +1,330 @@
+"""Async Fetcher Module - Download concorrente das páginas de mods com limites por host."""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from client_registry import registry
+from rate_limit import retry_after_seconds
+from web_scraper import WebScraper, get_scraper
+
+logger = logging.getLogger(__name__)
+
+# Respostas em que o site pede para esperar (Retry-After) antes de tentar de novo
+RETRY_STATUS = {429, 503}
+
+REDIRECT_STATUS = {301, 302, 303, 307, 308}
+
+MAX_REDIRECTS = 10
+
+
+class RobotsDisallowedError(Exception):
+    """A URL é proibida pelo robots.txt do site."""
+
+
+class _HostState:
+    """Vagas simultâneas, ritmo (crawl delay) e robots.txt de um host."""
+
+    def __init__(self, per_host: int, delay: float):
+        self.slots = asyncio.Semaphore(per_host)
+        self.delay = delay
+        self.next_at = 0.0
+        self.robots: Optional[RobotFileParser] = None
+        self.robots_lock = asyncio.Lock()
+        self.robots_loaded = False
+
+    async def wait_turn(self) -> None:
+        """Espera o intervalo mínimo desde a requisição anterior ao host."""
+        now = time.monotonic()
+        wait = self.next_at - now
+        self.next_at = max(now, self.next_at) + self.delay
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def defer(self, seconds: float) -> None:
+        """Adia todas as próximas requisições ao host (Retry-After)."""
+        self.next_at = max(self.next_at, time.monotonic() + seconds)
+
+
+class AsyncFetcher:
+    """
+    Baixa páginas de vários sites ao mesmo tempo sem sobrecarregar nenhum.
+
+    As requisições rodam num event loop próprio (thread em segundo plano)
+    com um único httpx.AsyncClient, que mantém as conexões abertas
+    (keep-alive) entre as páginas do mesmo host. Cada host tem um limite de
+    requisições simultâneas e um intervalo mínimo entre elas (o maior entre
+    crawl_delay e o Crawl-delay do robots.txt); URLs proibidas pelo
+    robots.txt não são baixadas. Redirecionamentos são seguidos um a um,
+    e cada salto passa pelos limites e pelo robots.txt do seu host. Um 429/503 com Retry-After adia todas as
+    requisições daquele host, não só a que falhou. Acima disso, um limite
+    global de requisições em voo vale para todos os hosts.
+
+    Cache HTTP (ETag/304), parse (na thread ou no pool de processos) e o
+    formato do resultado são os do WebScraper, então extract_content pode
+    substituir WebScraper.extract_content no pipeline.
+    """
+
+    def __init__(self, scraper: Optional[WebScraper] = None,
+                 max_in_flight: Optional[int] = None,
+                 per_host: Optional[int] = None,
+                 crawl_delay: Optional[float] = None,
+                 respect_robots: Optional[bool] = None,
+                 max_retries: int = 3,
+                 max_retry_after: float = 120.0):
+        """
+        Inicializa o fetcher.
+
+        Args:
+            scraper: WebScraper com o cache HTTP, os limites e o parse (padrão: o compartilhado)
+            max_in_flight: Requisições simultâneas no total (padrão: SCRAPER_MAX_IN_FLIGHT ou 64)
+            per_host: Requisições simultâneas por host (padrão: SCRAPER_PER_HOST ou 2)
+            crawl_delay: Segundos entre requisições ao mesmo host (padrão: SCRAPER_CRAWL_DELAY ou 1)
+            respect_robots: Consulta o robots.txt de cada host (padrão: SCRAPER_ROBOTS, ativo)
+            max_retries: Novas tentativas em 429/503 e falhas de conexão
+            max_retry_after: Maior espera aceita de um Retry-After (segundos)
+        """
+        self.scraper = scraper or get_scraper()
+        self.max_in_flight = max_in_flight or int(os.getenv('SCRAPER_MAX_IN_FLIGHT', 64))
+        self.per_host = per_host or int(os.getenv('SCRAPER_PER_HOST', 2))
+        if crawl_delay is None:
+            crawl_delay = float(os.getenv('SCRAPER_CRAWL_DELAY', 1.0))
+        self.crawl_delay = crawl_delay
+        if respect_robots is None:
+            respect_robots = os.getenv('SCRAPER_ROBOTS', '1').lower() in ('1', 'true', 'yes')
+        self.respect_robots = respect_robots
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.user_agent = self.scraper.session.headers['User-Agent']
+        self._hosts: Dict[str, _HostState] = {}
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {'fetched': 0, 'not_modified': 0, 'retried': 0, 'redirected': 0,
+                       'robots_blocked': 0, 'robots_fetched': 0}
+
+    def submit(self, url: str) -> Future:
+        """
+        Agenda o download e a extração de uma página.
+
+        Args:
+            url: URL da página do mod
+
+        Returns:
+            Future com o dict de WebScraper.extract_content (ou a exceção)
+        """
+        return asyncio.run_coroutine_threadsafe(self._extract(url), self._ensure_loop())
+
+    def extract_content(self, url: str) -> Dict[str, str]:
+        """Baixa e extrai uma página, esperando o resultado (mesmo retorno do WebScraper)."""
+        return self.submit(url).result()
+
+    def stats(self) -> Dict[str, int]:
+        """Páginas baixadas, 304s, novas tentativas, redirecionamentos e URLs bloqueadas pelo robots.txt."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name='async-fetcher', daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def _setup(self) -> None:
+        """Cria o cliente e o limite global dentro do event loop (uma vez)."""
+        if self._client is not None:
+            return
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._client = httpx.AsyncClient(
+            headers={'User-Agent': self.user_agent},
+            timeout=self.scraper.timeout,
+            # Redirecionamentos seguidos em _fetch, com os limites de cada host
+            follow_redirects=False,
+            limits=httpx.Limits(max_connections=self.max_in_flight,
+                                max_keepalive_connections=self.max_in_flight)
+        )
+
+    async def _host(self, url: str) -> _HostState:
+        """Estado do host da URL, com o robots.txt lido na primeira vez."""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        host = self._hosts.get(origin)
+        if host is None:
+            host = self._hosts[origin] = _HostState(self.per_host, self.crawl_delay)
+        if self.respect_robots and not host.robots_loaded:
+            async with host.robots_lock:
+                if not host.robots_loaded:
+                    await self._load_robots(origin, host)
+                    host.robots_loaded = True
+        return host
+
+    async def _load_robots(self, origin: str, host: _HostState) -> None:
+        """Lê o robots.txt do host (ausente ou inacessível: tudo permitido)."""
+        try:
+            async with self._in_flight:
+                response = await self._client.get(f"{origin}/robots.txt", follow_redirects=True)
+        except httpx.HTTPError as e:
+            logger.warning("robots.txt de %s inacessível (%s); seguindo sem restrições", origin, e)
+            return
+        self._count('robots_fetched')
+        robots = RobotFileParser()
+        if response.status_code in (401, 403):
+            robots.disallow_all = True
+        elif response.status_code >= 400:
+            robots.allow_all = True
+        else:
+            robots.parse(response.text.splitlines())
+            delay = robots.crawl_delay(self.user_agent)
+            if delay is not None and float(delay) > host.delay:
+                logger.info("%s: Crawl-delay de %ss pelo robots.txt", origin, delay)
+                host.delay = float(delay)
+        host.robots = robots
+
+    async def _extract(self, url: str) -> Dict[str, str]:
+        """Baixa a página respeitando os limites e faz o parse fora do event loop."""
+        self._setup()
+        scraper = self.scraper
+        logger.info("Extraindo conteúdo de: %s", url)
+
+        # A leitura do cache em disco não bloqueia o event loop
+        cached = await asyncio.to_thread(scraper.cache.get, url) if scraper.cache is not None else None
+        result = await self._fetch(url, cached)
+        if result is None:
+            # 304, mas o extrator mudou e o corpo em cache é parcial: baixa de novo
+            result = await self._fetch(url, None)
+        return result
+
+    async def _allowed_host(self, url: str) -> _HostState:
+        """Estado do host da URL, recusando URLs proibidas pelo robots.txt."""
+        host = await self._host(url)
+        if host.robots is not None and not host.robots.can_fetch(self.user_agent, url):
+            self._count('robots_blocked')
+            raise RobotsDisallowedError(f"URL proibida pelo robots.txt: {url}")
+        return host
+
+    async def _fetch(self, url: str, cached: Optional[Dict]) -> Optional[Dict[str, str]]:
+        """
+        GET (condicional se houver entrada no cache) seguindo os redirecionamentos, e a extração.
+
+        Returns:
+            Extração da página, ou None se o 304 não pôde ser aproveitado (ver WebScraper._not_modified)
+        """
+        scraper = self.scraper
+        headers = scraper._conditional_headers(cached)
+        target = url
+        for _ in range(MAX_REDIRECTS + 1):
+            host = await self._allowed_host(target)
+            response, body = await self._request(target, host, headers)
+            location = response.headers.get('Location')
+            if response.status_code not in REDIRECT_STATUS or not location:
+                break
+            target = urljoin(str(response.url), location)
+            logger.debug("%s: redirecionado para %s", url, target)
+            self._count('redirected')
+        else:
+            raise httpx.TooManyRedirects(
+                f"Mais de {MAX_REDIRECTS} redirecionamentos a partir de {url}", request=response.request
+            )
+
+        if response.status_code == 304 and cached:
+            self._count('not_modified')
+            return await asyncio.to_thread(scraper._not_modified, url, cached)
+        response.raise_for_status()
+        scraper._count('revalidate' if headers else 'miss')
+        self._count('fetched')
+        result = await asyncio.to_thread(scraper._parse_body, url, body, response.charset_encoding)
+        return await asyncio.to_thread(
+            scraper._store, url, body, result, response.headers, bool(headers)
+        )
+
+    async def _request(self, url: str, host: _HostState, headers: Dict[str, str]):
+        """
+        Um GET no host, com vaga, crawl delay e novas tentativas (falha de conexão, 429/503).
+
+        Returns:
+            Tupla (resposta já fechada, corpo lido)
+        """
+        attempt = 0
+        while True:
+            async with host.slots:
+                await host.wait_turn()
+                try:
+                    async with self._in_flight:
+                        response, body = await self._get(url, headers)
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    wait = min(2 ** attempt, 30) * random.uniform(0.5, 1.0)
+                    logger.warning("Falha de conexão em %s (%s); nova tentativa em %.1fs", url, e, wait)
+                    host.defer(wait)
+                    attempt += 1
+                    self._count('retried')
+                    continue
+
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                wait = retry_after_seconds(response)
+                if wait is None:
+                    wait = min(2 ** attempt, 30) * random.uniform(0.5, 1.0)
+                wait = min(wait, self.max_retry_after)
+                logger.warning("%s: %s, aguardando %.1fs para o host inteiro",
+                               url, response.status_code, wait)
+                host.defer(wait)
+                attempt += 1
+                self._count('retried')
+                continue
+            return response, body
+
+    async def _get(self, url: str, headers: Dict[str, str]):
+        """
+        GET em streaming, lendo o corpo (só de respostas 2xx) até max_bytes do scraper.
+
+        Returns:
+            Tupla (resposta já fechada, corpo lido)
+        """
+        async with self._client.stream('GET', url, headers=headers) as response:
+            body = []
+            total = 0
+            if response.is_success:
+                async for chunk in response.aiter_bytes(self.scraper.chunk_size):
+                    body.append(chunk)
+                    total += len(chunk)
+                    if total >= self.scraper.max_bytes:
+                        break
+            return response, b''.join(body)
+
+    def close(self) -> None:
+        """Fecha o cliente HTTP e para o event loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=10)
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=10)
+        loop.close()
+
+
+def get_async_fetcher() -> AsyncFetcher:
+    """Retorna o AsyncFetcher compartilhado do processo."""
+    return registry.get_or_create(('async_fetcher',), AsyncFetcher)
@@ -0,0 +1,264 @@
+"""Async LLM Client Module - Variante asyncio do LLMClient com rate limit e retry."""
+
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from tenacity import AsyncRetrying
+
+from classification_cache import get_default_cache
+from classification_schema import CLASSIFICATION_OUTPUT
+from client_registry import import_lock, registry
+from llm_client import LLMClient, anthropic_text, detect_provider, extract_usage, provider_api_key
+from metrics import span
+from prompt_builder import SpendingCap
+from rate_limit import retry_policy
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncLLMClient(LLMClient):
+    """
+    Cliente LLM assíncrono.
+
+    Usa os clientes async dos SDKs (AsyncOpenAI, AsyncAnthropic e
+    generate_content_async do Gemini). Chave de cache, limite de gasto,
+    pedido de confiança e validação (parse_or_repair) são os do LLMClient;
+    cada chamada aguarda cota nos token buckets do provedor sem bloquear o
+    event loop, erros temporários (429, 5xx, timeouts) são repetidos com
+    backoff exponencial com jitter respeitando o Retry-After, e a sobra da
+    reserva de tokens/min volta ao bucket quando o uso real chega.
+
+    classify_mod_async roda no event loop de quem chama; submit agenda a
+    classificação no event loop próprio do cliente (thread em segundo
+    plano), para uso a partir de threads como as do BatchRunner. O cliente
+    síncrono herdado continua disponível e atende as chamadas de reparo.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+    @property
+    def async_client(self):
+        """Cliente assíncrono do SDK do provedor, criado (e importado) no primeiro uso."""
+        return self.ensure_async_client()
+
+    def ensure_async_client(self):
+        """Importa o SDK e cria o cliente assíncrono, se ainda não existir (ver ensure_client)."""
+        if self._async_client is None:
+            with self._client_lock, import_lock:
+                if self._async_client is None:
+                    self._async_client = self._init_async_client()
+        return self._async_client
+
+    def _init_async_client(self):
+        """Inicializa o cliente assíncrono do provedor específico."""
+        try:
+            if self.provider == 'openai':
+                from openai import AsyncOpenAI
+                return AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            elif self.provider == 'anthropic':
+                from anthropic import AsyncAnthropic
+                return AsyncAnthropic(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            elif self.provider == 'google':
+                # O módulo do Gemini atende as duas variantes (generate_content_async)
+                return self._init_client()
+            else:
+                raise ValueError(f"Provedor {self.provider} não suportado")
+        except ImportError as e:
+            logger.error("Biblioteca do provedor não instalada: %s", e)
+            raise
+
+    async def classify_mod_async(self, mod_content: Dict[str, str],
+                                 use_cache: bool = True, refresh_cache: bool = False,
+                                 spend_cap: Optional[SpendingCap] = None,
+                                 ask_confidence: bool = False) -> Dict:
+        """
+        Classifica um mod usando LLM (versão assíncrona de classify_mod).
+
+        Args:
+            mod_content: Dicionário com title, description, full_text
+            use_cache: Se False, ignora o cache (não lê nem grava)
+            refresh_cache: Se True, chama o LLM e sobrescreve a entrada do cache
+            spend_cap: Limite de gasto do lote (opcional)
+            ask_confidence: Se True, pede também o campo "confidence" (0-1)
+
+        Returns:
+            Classificação estruturada
+
+        Raises:
+            BudgetExceededError: Se o custo previsto ultrapassar spend_cap
+        """
+        cache_key = self.cache_key(mod_content, ask_confidence) if use_cache else None
+        if cache_key is not None and not refresh_cache:
+            cached = await asyncio.to_thread(self.cached_classification, cache_key)
+            if cached is not None:
+                return cached
+
+        user_message = self.classification_message(mod_content, ask_confidence)
+        logger.debug("Classificando mod com %s (async): %s", self.provider, self.model)
+        self.charge_prediction(user_message, spend_cap)
+        reserved = self.estimate_request_tokens(user_message)
+
+        async for attempt in AsyncRetrying(**retry_policy()):
+            with attempt:
+                response = await self.call_within_quota_async(user_message, reserved)
+
+        # Resposta inválida: o reparo (raro) usa o cliente síncrono numa thread
+        result = await asyncio.to_thread(self.parse_or_repair, response)
+        logger.debug("Classificação concluída: Priority %s", result['priority'])
+
+        if cache_key is not None:
+            await asyncio.to_thread(self.cache.set, cache_key, self.model, result)
+        return result
+
+    async def classify_all(self, mod_contents: List[Dict[str, str]],
+                           concurrency: int = 8,
+                           use_cache: bool = True,
+                           spend_cap: Optional[SpendingCap] = None) -> List[Optional[Dict]]:
+        """
+        Classifica vários mods concorrentemente, limitados pelo rate limit.
+
+        Args:
+            mod_contents: Lista de conteúdos de mods
+            concurrency: Máximo de requisições em andamento
+            use_cache: Se False, ignora o cache de classificações
+            spend_cap: Limite de gasto do lote (opcional)
+
+        Returns:
+            Lista de classificações na mesma ordem da entrada (None se falhou)
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def classify_one(mod_content):
+            async with semaphore:
+                try:
+                    return await self.classify_mod_async(
+                        mod_content, use_cache=use_cache, spend_cap=spend_cap
+                    )
+                except Exception as e:
+                    logger.error("Erro ao classificar %s: %s", mod_content.get('url', 'mod'), e)
+                    return None
+
+        return await asyncio.gather(*(classify_one(content) for content in mod_contents))
+
+    def submit(self, mod_content: Dict[str, str], **kwargs) -> Future:
+        """
+        Agenda classify_mod_async no event loop do cliente, a partir de qualquer thread.
+
+        Args:
+            mod_content: Conteúdo do mod
+            **kwargs: Repassados a classify_mod_async
+
+        Returns:
+            Future com a classificação (ou a exceção)
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self.classify_mod_async(mod_content, **kwargs), self._ensure_loop()
+        )
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name='async-llm', daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    async def call_within_quota_async(self, user_message: str, reserved: int, **kwargs) -> str:
+        """Versão assíncrona de LLMClient.call_within_quota()."""
+        with span('rate_limit'):
+            await self.rate_limiter.acquire_async(reserved)
+        response, used = await self._call_provider_async(user_message, **kwargs)
+        if used < reserved:
+            self.rate_limiter.refund_tokens(reserved - used)
+        return response
+
+    async def _call_provider_async(self, user_message: str, output: Dict = CLASSIFICATION_OUTPUT,
+                                   system: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Chama o provedor específico de forma assíncrona (sem streaming).
+
+        Returns:
+            Tupla (texto da resposta, tokens de entrada + saída informados)
+        """
+        with span('llm', provider=self.provider, model=self.model):
+            if self.provider == 'openai':
+                response = await self.async_client.chat.completions.create(
+                    **self.openai_request_body(user_message, output=output, system=system)
+                )
+                usage = extract_usage('openai', response.usage)
+                text = response.choices[0].message.content
+            elif self.provider == 'anthropic':
+                response = await self.async_client.messages.create(
+                    **self.anthropic_request_params(user_message, output=output, system=system)
+                )
+                usage = extract_usage('anthropic', response.usage)
+                text = anthropic_text(response)
+            elif self.provider == 'google':
+                if system is None:
+                    # google_model() pode criar o cached content (chamada bloqueante, uma vez por TTL)
+                    model = await asyncio.to_thread(self.google_model)
+                else:
+                    model = self.async_client.GenerativeModel(self.model, system_instruction=system)
+                response = await model.generate_content_async(
+                    user_message,
+                    generation_config=self.google_generation_config(output)
+                )
+                usage = extract_usage('google', getattr(response, 'usage_metadata', None))
+                text = response.text
+            else:
+                raise ValueError(f"Provedor {self.provider} não implementado")
+        self.record_usage(usage)
+        return text, usage['input_tokens'] + usage['output_tokens']
+
+    async def aclose(self) -> None:
+        """Fecha o cliente HTTP assíncrono do provedor."""
+        close = getattr(self._async_client, 'close', None)
+        if callable(close) and asyncio.iscoroutinefunction(close):
+            await close()
+
+    def close(self):
+        """Fecha os clientes (o assíncrono no seu event loop) e para o event loop."""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        try:
+            if loop is not None:
+                asyncio.run_coroutine_threadsafe(self.aclose(), loop).result(timeout=10)
+                loop.call_soon_threadsafe(loop.stop)
+                self._thread.join(timeout=10)
+                loop.close()
+            elif self._async_client is not None:
+                asyncio.run(self.aclose())
+        except (RuntimeError, TimeoutError) as e:
+            logger.debug("Não foi possível fechar o cliente assíncrono: %s", e)
+        super().close()
+
+
+def get_async_llm_client(api_key: Optional[str] = None,
+                         model: Optional[str] = None) -> AsyncLLMClient:
+    """
+    Retorna o AsyncLLMClient compartilhado para (provedor, modelo, api_key).
+
+    Args:
+        api_key: API key (opcional, usa env var)
+        model: Nome do modelo (opcional, usa env var)
+
+    Returns:
+        Instância compartilhada de AsyncLLMClient
+    """
+    model = model or os.getenv('LLM_MODEL', 'gpt-4o')
+    api_key = api_key or provider_api_key(detect_provider(model))
+    key = ('async_llm', detect_provider(model), model, api_key)
+    return registry.get_or_create(
+        key, lambda: AsyncLLMClient(api_key=api_key, model=model, cache=get_default_cache())
+    )
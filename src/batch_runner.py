@@ -0,0 +1,503 @@
+"""Batch Runner Module - Processa listas de mods em pipeline concorrente."""
+
+import csv
+import json
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from job_journal import CLASSIFIED, SCRAPED
+from metrics import record_span, trace
+from prompt_builder import BudgetExceededError
+
+logger = logging.getLogger(__name__)
+
+
+def read_batch_input(path: str) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Lê um arquivo de entrada com pares (url, page_id).
+
+    Aceita JSONL (um objeto por linha com "url" e "page_id") ou CSV
+    (colunas url,page_id, com ou sem cabeçalho).
+
+    Args:
+        path: Caminho do arquivo .jsonl ou .csv
+
+    Yields:
+        Tuplas (url, page_id); page_id pode ser None
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl') or path.endswith('.json'):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                yield item['url'], item.get('page_id') or None
+            return
+
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].startswith('#'):
+                continue
+            url = row[0].strip()
+            if url.lower() == 'url':
+                continue  # cabeçalho
+            page_id = row[1].strip() if len(row) > 1 and row[1].strip() else None
+            yield url, page_id
+
+
+class BatchRunner:
+    """
+    Executa o pipeline de classificação para vários mods ao mesmo tempo.
+
+    Cada etapa (extração, LLM, Notion) tem seu próprio limite de
+    concorrência, de forma que as etapas se sobrepõem: enquanto um mod
+    está no LLM, outros já estão sendo extraídos ou gravados no Notion.
+
+    Com um JobJournal, cada etapa concluída fica registrada: os mods já
+    gravados são pulados e os demais retomam da última etapa guardada.
+    """
+
+    def __init__(self, pipeline, scrape_workers: int = 4,
+                 llm_workers: int = 2, notion_workers: int = 1, journal=None):
+        """
+        Inicializa o runner.
+
+        Args:
+            pipeline: Instância de ModClassifierPipeline
+            scrape_workers: Máximo de extrações simultâneas
+            llm_workers: Máximo de chamadas simultâneas ao LLM
+            notion_workers: Máximo de gravações simultâneas no Notion
+            journal: JobJournal da execução (opcional, permite retomar)
+        """
+        self.pipeline = pipeline
+        self.journal = journal
+        self.scrape_workers = scrape_workers
+        self.llm_workers = llm_workers
+        self.notion_workers = notion_workers
+        self._stage_limits = {
+            'scrape': threading.BoundedSemaphore(scrape_workers),
+            'classify': threading.BoundedSemaphore(llm_workers),
+            'notion': threading.BoundedSemaphore(notion_workers),
+        }
+        self._write_lock = threading.Lock()
+
+    def _warm_up(self) -> None:
+        """Cria os clientes do pipeline na thread principal, antes dos workers."""
+        warm_up = getattr(self.pipeline, 'warm_up', None)
+        if warm_up is None:
+            return
+        try:
+            warm_up()
+        except Exception as e:
+            # Sem o cliente, cada mod falha na sua etapa e o erro fica no resultado
+            logger.warning("Não foi possível preparar os clientes: %s", e)
+
+    def _process_one(self, mod_url: str, notion_page_id: Optional[str]) -> Dict:
+        """Executa as três etapas para um mod; o resultado traz os spans em 'metrics'."""
+        with trace() as spans:
+            result = self._run_stages(mod_url, notion_page_id)
+        result['metrics'] = spans
+        return result
+
+    def _run_stages(self, mod_url: str, notion_page_id: Optional[str]) -> Dict:
+        """Executa as três etapas para um mod, respeitando o limite de cada uma."""
+        result = {'url': mod_url, 'page_id': notion_page_id}
+        stage = 'scrape'
+        spend_cap = getattr(self.pipeline, 'spend_cap', None)
+        journal = self.journal
+        entry = journal.get(mod_url, notion_page_id) if journal is not None else None
+        resumed = entry['state'] if entry is not None else None
+        mod_key = notion_page_id or mod_url
+        try:
+            if resumed in (SCRAPED, CLASSIFIED):
+                # Retomada: reaproveita a extração e a decisão da execução anterior
+                mod_content, decision = entry['content'], entry['decision']
+            else:
+                if spend_cap is not None and spend_cap.exhausted:
+                    # Orçamento já esgotado: não vale a pena nem extrair a página
+                    raise BudgetExceededError("Limite de gasto do lote atingido")
+                with self._stage_limits['scrape']:
+                    mod_content = self.pipeline.scrape(mod_url)
+
+                # Fingerprint inalterado: não chama LLM nem Notion
+                decision, previous = self.pipeline.decide(mod_key, mod_content, mod_url)
+                if decision == 'skipped':
+                    self.pipeline.record_state(mod_key, mod_url, mod_content, previous)
+                    if journal is not None:
+                        journal.record_written(mod_url, notion_page_id, previous, decision)
+                    result.update(decision=decision, status='ok', classification=previous)
+                    return result
+                if journal is not None:
+                    journal.record_scraped(mod_url, notion_page_id, mod_content, decision)
+            result['decision'] = decision
+
+            stage = 'classify'
+            if resumed == CLASSIFIED:
+                classification, write_id = entry['classification'], entry['write_id']
+            else:
+                with self._stage_limits['classify']:
+                    classification = self.pipeline.classify(mod_content)
+                write_id = None
+                if journal is not None:
+                    write_id = journal.record_classified(mod_url, notion_page_id, classification)
+            result['classification'] = classification
+
+            stage = 'notion'
+            if notion_page_id:
+                with self._stage_limits['notion']:
+                    result['notion_updated'] = self.pipeline.update_notion(
+                        notion_page_id, classification, write_id=write_id
+                    )
+                if result['notion_updated']:
+                    self.pipeline.record_state(mod_key, mod_url, mod_content, classification)
+            else:
+                self.pipeline.record_state(mod_key, mod_url, mod_content, classification)
+            if journal is not None:
+                journal.record_written(mod_url, notion_page_id)
+
+            result['status'] = 'ok'
+        except Exception as e:
+            logger.error("Erro em %s (etapa %s): %s", mod_url, stage, e)
+            result['status'] = 'error'
+            result['stage'] = stage
+            result['error'] = str(e)
+            if journal is not None:
+                journal.record_error(mod_url, notion_page_id, stage, str(e))
+        return result
+
+    def _already_done(self, mod_url: str, notion_page_id: Optional[str]) -> bool:
+        """True se o diário registra o mod como concluído numa execução anterior."""
+        return self.journal is not None and self.journal.is_done(mod_url, notion_page_id)
+
+    def run(self, items, output_path: str) -> Dict[str, int]:
+        """
+        Processa todos os itens, gravando cada resultado assim que termina.
+
+        Args:
+            items: Iterável de tuplas (url, page_id)
+            output_path: Arquivo JSONL de saída (um resultado por linha)
+
+        Returns:
+            Contadores {'total', 'ok', 'error', 'new', 'reclassified', 'skipped', 'resumed'}
+        """
+        counts = {'total': 0, 'ok': 0, 'error': 0, 'new': 0, 'reclassified': 0, 'skipped': 0,
+                  'resumed': 0}
+        self._warm_up()
+        max_workers = self.scrape_workers + self.llm_workers + self.notion_workers
+        # Limita quantos mods ficam "em voo" para não carregar o arquivo inteiro
+        in_flight = threading.BoundedSemaphore(max_workers * 2)
+
+        with open(output_path, 'a', encoding='utf-8') as out, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            def on_done(future):
+                result = future.result()
+                with self._write_lock:
+                    out.write(json.dumps(result, ensure_ascii=False) + '\n')
+                    out.flush()
+                    counts[result['status']] += 1
+                    if result.get('decision'):
+                        counts[result['decision']] += 1
+                    done = counts['ok'] + counts['error']
+                logger.info(
+                    "[%s] %s %s (%s)", done, result['status'].upper(), result['url'],
+                    result.get('decision', result.get('stage', ''))
+                )
+                in_flight.release()
+
+            for mod_url, notion_page_id in items:
+                counts['total'] += 1
+                if self._already_done(mod_url, notion_page_id):
+                    counts['resumed'] += 1
+                    continue
+                in_flight.acquire()
+                future = executor.submit(self._process_one, mod_url, notion_page_id)
+                future.add_done_callback(on_done)
+
+        logger.info(
+            "Lote concluído: %s ok, %s erros, %s já concluídos de %s mods",
+            counts['ok'], counts['error'], counts['resumed'], counts['total']
+        )
+        return counts
+
+    def run_provider_batch(self, items, output_path: str,
+                           poll_interval: float = 30.0) -> Dict[str, int]:
+        """
+        Processa os itens usando a API de lote do provedor LLM.
+
+        As páginas são extraídas em paralelo, todos os mods são enviados em
+        um único job de lote (LLMClient.classify_many) e, ao final, as
+        páginas do Notion são atualizadas.
+
+        Args:
+            items: Iterável de tuplas (url, page_id)
+            output_path: Arquivo JSONL de saída (um resultado por linha)
+            poll_interval: Intervalo entre consultas ao job (segundos)
+
+        Returns:
+            Contadores {'total', 'ok', 'error', 'new', 'reclassified', 'skipped', 'resumed'}
+
+        Raises:
+            ValueError: Se o pipeline usa cascata ou hedge (não suportados no lote)
+        """
+        from llm_client import get_llm_client
+
+        self._require_single_model('--provider-batch')
+
+        def classify(mod_contents):
+            return get_llm_client().classify_many(
+                mod_contents,
+                poll_interval=poll_interval,
+                use_cache=self.pipeline.use_cache,
+                spend_cap=getattr(self.pipeline, 'spend_cap', None)
+            )
+
+        return self._run_collected(items, output_path, classify, 'Classificação falhou no lote')
+
+    def run_packed(self, items, output_path: str, pack_size: int = 8) -> Dict[str, int]:
+        """
+        Processa os itens enviando vários mods curtos por requisição ao LLM.
+
+        Como em run_provider_batch, as páginas são extraídas primeiro; os
+        mods são então classificados em pacotes (LLMClient.classify_packed)
+        com até llm_workers requisições simultâneas.
+
+        Args:
+            items: Iterável de tuplas (url, page_id)
+            output_path: Arquivo JSONL de saída (um resultado por linha)
+            pack_size: Máximo de mods por requisição
+
+        Returns:
+            Contadores {'total', 'ok', 'error', 'new', 'reclassified', 'skipped', 'resumed'}
+
+        Raises:
+            ValueError: Se o pipeline usa cascata ou hedge (não suportados em pacotes)
+        """
+        from llm_client import get_llm_client
+
+        self._require_single_model('--pack')
+
+        def classify(mod_contents):
+            return get_llm_client().classify_packed(
+                mod_contents,
+                pack_size=pack_size,
+                workers=self.llm_workers,
+                use_cache=self.pipeline.use_cache,
+                spend_cap=getattr(self.pipeline, 'spend_cap', None)
+            )
+
+        return self._run_collected(items, output_path, classify, 'Classificação falhou')
+
+    def _require_single_model(self, mode: str) -> None:
+        """Recusa cascata e hedge nos modos em que uma requisição leva vários mods."""
+        from llm_client import get_llm_client
+
+        if getattr(self.pipeline, 'cascade', None) is not None:
+            raise ValueError(f"{mode} não suporta a cascata de modelos")
+        if get_llm_client().hedger() is not None:
+            raise ValueError(f"{mode} não suporta o hedge (LLM_HEDGE_MODEL)")
+
+    def _scrape_traced(self, mod_url: str) -> Tuple[Optional[Dict], List[Dict], Optional[Exception]]:
+        """
+        Etapa de extração de um mod, com os seus spans.
+
+        Returns:
+            Tupla (conteúdo ou None, spans, exceção ou None)
+        """
+        with trace() as spans:
+            try:
+                return self.pipeline.scrape(mod_url), spans, None
+            except Exception as e:
+                return None, spans, e
+
+    def _submit_scrape_traced(self, mod_url: str) -> Future:
+        """
+        Agenda a extração no AsyncFetcher; o span vai da submissão até a página chegar.
+
+        Returns:
+            Future com a tupla de _scrape_traced
+        """
+        started = time.perf_counter()
+        traced = Future()
+
+        def done(future):
+            error = future.exception()
+            attrs = {'error': type(error).__name__} if error is not None else {}
+            spans = [record_span('scrape', time.perf_counter() - started, **attrs)]
+            traced.set_result((None if error is not None else future.result(), spans, error))
+
+        self.pipeline.submit_scrape(mod_url).add_done_callback(done)
+        return traced
+
+    def _run_collected(self, items, output_path: str, classify,
+                       failure_message: str) -> Dict[str, int]:
+        """
+        Extrai todas as páginas, classifica os mods de uma vez e grava no Notion em lote.
+
+        O 'metrics' de cada resultado traz os spans da extração do mod e os
+        spans classify e notion do lote inteiro (com o número de mods em 'mods').
+
+        Args:
+            items: Iterável de tuplas (url, page_id)
+            output_path: Arquivo JSONL de saída
+            classify: Função que recebe a lista de conteúdos e retorna as
+                classificações na mesma ordem (None para as que falharam)
+            failure_message: Erro registrado para os mods sem classificação
+
+        Returns:
+            Contadores {'total', 'ok', 'error', 'new', 'reclassified', 'skipped', 'resumed'}
+        """
+        counts = {'total': 0, 'ok': 0, 'error': 0, 'new': 0, 'reclassified': 0, 'skipped': 0,
+                  'resumed': 0}
+        self._warm_up()
+        items = list(items)
+        counts['total'] = len(items)
+        journal = self.journal
+        items = [(url, page_id) for url, page_id in items if not self._already_done(url, page_id)]
+        counts['resumed'] = counts['total'] - len(items)
+        entries = {}
+        if journal is not None:
+            for mod_url, notion_page_id in items:
+                entry = journal.get(mod_url, notion_page_id)
+                if entry is not None and entry['state'] in (SCRAPED, CLASSIFIED):
+                    entries[(mod_url, notion_page_id)] = entry
+
+        with open(output_path, 'a', encoding='utf-8') as out:
+
+            def write(result):
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+                out.flush()
+                counts[result['status']] += 1
+                if result.get('decision'):
+                    counts[result['decision']] += 1
+
+            # Etapa 1: extração em paralelo (os mods retomados já têm o conteúdo no diário)
+            scraped = []
+            spans = {}
+            with ThreadPoolExecutor(max_workers=self.scrape_workers) as executor:
+                if getattr(self.pipeline, 'async_fetch', False):
+                    # Todas as páginas de uma vez: o AsyncFetcher aplica os limites por host
+                    submit = self._submit_scrape_traced
+                else:
+                    submit = functools.partial(executor.submit, self._scrape_traced)
+                futures = {item: submit(item[0]) for item in items if item not in entries}
+                for mod_url, notion_page_id in items:
+                    entry = entries.get((mod_url, notion_page_id))
+                    spans[(mod_url, notion_page_id)] = []
+                    if entry is not None:
+                        scraped.append((mod_url, notion_page_id, entry['content'], entry['decision']))
+                        continue
+                    mod_content, item_spans, error = futures[(mod_url, notion_page_id)].result()
+                    spans[(mod_url, notion_page_id)] = item_spans
+                    if error is not None:
+                        logger.error("Erro em %s (etapa scrape): %s", mod_url, error)
+                        if journal is not None:
+                            journal.record_error(mod_url, notion_page_id, 'scrape', str(error))
+                        write({'url': mod_url, 'page_id': notion_page_id, 'status': 'error',
+                               'stage': 'scrape', 'error': str(error), 'metrics': item_spans})
+                        continue
+
+                    # Fingerprint inalterado: não é enviado ao LLM
+                    decision, previous = self.pipeline.decide(notion_page_id or mod_url, mod_content,
+                                                              mod_url)
+                    if decision == 'skipped':
+                        self.pipeline.record_state(notion_page_id or mod_url, mod_url,
+                                                   mod_content, previous)
+                        if journal is not None:
+                            journal.record_written(mod_url, notion_page_id, previous, decision)
+                        write({'url': mod_url, 'page_id': notion_page_id, 'status': 'ok',
+                               'decision': decision, 'classification': previous,
+                               'metrics': item_spans})
+                        continue
+                    if journal is not None:
+                        journal.record_scraped(mod_url, notion_page_id, mod_content, decision)
+                    scraped.append((mod_url, notion_page_id, mod_content, decision))
+
+            # Etapa 2: classificação de todos os mods extraídos de uma vez
+            # (menos os que o diário já traz classificados)
+            pending = [item for item in scraped
+                       if entries.get(item[:2], {}).get('state') != CLASSIFIED]
+            mod_contents = [mod_content for _, _, mod_content, _ in pending]
+            pre_classifier = getattr(self.pipeline, 'pre_classifier', None)
+            started = time.perf_counter()
+            if pre_classifier is not None:
+                fresh = pre_classifier.classify_many(mod_contents, classify)
+            else:
+                fresh = classify(mod_contents)
+            fresh = dict(zip((item[:2] for item in pending), fresh))
+            if pending:
+                classify_span = record_span('classify', time.perf_counter() - started, mods=len(pending))
+                for item in pending:
+                    spans[item[:2]].append(classify_span)
+
+            # Etapa 3: gravação no Notion em lote (Notes pré-carregados, chamadas ritmadas)
+            results = []
+            contents = {}
+            write_ids = {}
+            for mod_url, notion_page_id, mod_content, decision in scraped:
+                result = {'url': mod_url, 'page_id': notion_page_id, 'decision': decision,
+                          'metrics': spans[(mod_url, notion_page_id)]}
+                contents[notion_page_id or mod_url] = mod_content
+                entry = entries.get((mod_url, notion_page_id))
+                if (mod_url, notion_page_id) in fresh:
+                    classification = fresh[(mod_url, notion_page_id)]
+                    if classification is not None and journal is not None:
+                        write_ids[(mod_url, notion_page_id)] = journal.record_classified(
+                            mod_url, notion_page_id, classification
+                        )
+                else:
+                    classification = entry['classification']
+                    write_ids[(mod_url, notion_page_id)] = entry['write_id']
+                if classification is None:
+                    result.update(status='error', stage='classify', error=failure_message)
+                    if journal is not None:
+                        journal.record_error(mod_url, notion_page_id, 'classify', failure_message)
+                else:
+                    result.update(status='ok', classification=classification)
+                    if not notion_page_id:
+                        self.pipeline.record_state(mod_url, mod_url, mod_content, classification)
+                results.append(result)
+
+            to_write = [r for r in results if r['status'] == 'ok' and r['page_id']]
+            if to_write and self.pipeline.notion_token:
+                from notion_updater import BulkNotionUpdater
+
+                started = time.perf_counter()
+                updater = BulkNotionUpdater(flush_size=len(to_write))
+                outcomes = {}
+                for result in to_write:
+                    outcomes.update(updater.enqueue(
+                        result['page_id'], result['classification'],
+                        write_ids.get((result['url'], result['page_id']))
+                    ))
+                outcomes.update(updater.flush())
+                updater.close()
+                notion_span = record_span('notion', time.perf_counter() - started, mods=len(to_write))
+                for result in to_write:
+                    result['metrics'].append(notion_span)
+                    outcome = outcomes.get(result['page_id'])
+                    if outcome is True:
+                        result['notion_updated'] = True
+                        self.pipeline.record_state(
+                            result['page_id'], result['url'], contents[result['page_id']],
+                            result['classification']
+                        )
+                    else:
+                        result.update(status='error', stage='notion', error=str(outcome))
+                        if journal is not None:
+                            journal.record_error(result['url'], result['page_id'], 'notion', str(outcome))
+
+            for result in results:
+                if journal is not None and result['status'] == 'ok':
+                    journal.record_written(result['url'], result['page_id'])
+                write(result)
+
+        logger.info(
+            "Lote concluído: %s ok, %s erros, %s já concluídos de %s mods",
+            counts['ok'], counts['error'], counts['resumed'], counts['total']
+        )
+        return counts
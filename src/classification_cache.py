@@ -0,0 +1,211 @@
+"""Classification Cache Module - Cache persistente (SQLite) de classificações do LLM."""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from client_registry import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = '.cache/classifications.sqlite3'
+
+# Campos de mod_content que definem o conteúdo classificado
+CONTENT_FIELDS = ('title', 'description', 'full_text')
+
+
+def _normalize(value) -> str:
+    """Normaliza espaços para que diferenças irrelevantes não mudem a chave."""
+    return ' '.join(str(value or '').split())
+
+
+class ClassificationCache:
+    """
+    Cache de classificações endereçado por conteúdo.
+
+    A chave é o hash do texto normalizado do mod, do prompt do
+    classificador e do modelo. Entradas expiram por TTL e, quando o
+    limite de entradas é atingido, as menos usadas recentemente (LRU)
+    são removidas. O número de entradas é contado uma vez na abertura e
+    mantido em memória; a tabela só é recontada ao passar do limite.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH,
+                 ttl_seconds: Optional[float] = 30 * 24 * 3600,
+                 max_entries: int = 50000):
+        """
+        Inicializa o cache.
+
+        Args:
+            path: Caminho do arquivo SQLite
+            ttl_seconds: Validade das entradas em segundos (None = sem expiração)
+            max_entries: Número máximo de entradas antes da remoção LRU
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS classifications (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                classification TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_classifications_access "
+            "ON classifications (last_access)"
+        )
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+
+    @staticmethod
+    def make_key(mod_content: Dict, prompt: str, model: str) -> str:
+        """
+        Calcula a chave de cache.
+
+        Args:
+            mod_content: Conteúdo extraído do mod
+            prompt: Texto do prompt do classificador
+            model: Nome do modelo
+
+        Returns:
+            Hash SHA-256 em hexadecimal
+        """
+        digest = hashlib.sha256()
+        for field in CONTENT_FIELDS:
+            digest.update(_normalize(mod_content.get(field)).encode('utf-8'))
+            digest.update(b'\x00')
+        digest.update(prompt.encode('utf-8'))
+        digest.update(b'\x00')
+        digest.update(model.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Busca uma classificação no cache.
+
+        Args:
+            key: Chave calculada por make_key()
+
+        Returns:
+            Classificação armazenada ou None (miss ou expirada)
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT classification, created_at FROM classifications WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM classifications WHERE key = ?", (key,))
+                self._conn.commit()
+                self._entries -= 1
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE classifications SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, model: str, classification: Dict) -> None:
+        """
+        Armazena uma classificação no cache.
+
+        Args:
+            key: Chave calculada por make_key()
+            model: Nome do modelo que gerou a classificação
+            classification: Classificação a armazenar
+        """
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM classifications WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classifications "
+                "(key, model, classification, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model, json.dumps(classification, ensure_ascii=False), now, now)
+            )
+            if not exists:
+                self._entries += 1
+            if self._entries > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Remove as entradas menos usadas além de max_entries."""
+        # Recontado na tabela: corrige a contagem se outro processo usa o mesmo arquivo
+        count = self._conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM classifications WHERE key IN ("
+                "SELECT key FROM classifications ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+            logger.debug("Cache: %s entradas removidas (LRU)", excess)
+        self._entries = min(count, self.max_entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna os contadores de hit/miss e o número de entradas."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+    def close(self) -> None:
+        """Fecha a conexão com o SQLite."""
+        with self._lock:
+            self._conn.close()
+
+
+def get_default_cache() -> Optional[ClassificationCache]:
+    """
+    Retorna o cache compartilhado configurado pelas variáveis de ambiente.
+
+    Variáveis:
+        LLM_CACHE              - "0" desabilita o cache (padrão: habilitado)
+        LLM_CACHE_PATH         - Caminho do SQLite (padrão: .cache/classifications.sqlite3)
+        LLM_CACHE_TTL_DAYS     - Validade das entradas em dias (padrão: 30, 0 = sem expiração)
+        LLM_CACHE_MAX_ENTRIES  - Limite de entradas LRU (padrão: 50000)
+
+    Returns:
+        ClassificationCache ou None se desabilitado
+    """
+    if os.getenv('LLM_CACHE', '1').lower() in ('0', 'false', 'no', 'off'):
+        return None
+
+    path = os.getenv('LLM_CACHE_PATH', DEFAULT_CACHE_PATH)
+    ttl_days = float(os.getenv('LLM_CACHE_TTL_DAYS', '30'))
+    max_entries = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '50000'))
+
+    return registry.get_or_create(
+        ('classification_cache', path),
+        lambda: ClassificationCache(
+            path=path,
+            ttl_seconds=ttl_days * 24 * 3600 if ttl_days > 0 else None,
+            max_entries=max_entries
+        )
+    )
@@ -0,0 +1,47 @@
+"""Classification Model Module - Modelo pydantic da classificação de um mod.
+
+Separado de classification_schema para que o pydantic só seja importado
+quando uma resposta do LLM precisa ser validada.
+"""
+
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+from classification_schema import consistency_errors
+
+
+class ModClassification(BaseModel):
+    """Classificação de um mod, no formato exigido do LLM."""
+
+    model_config = ConfigDict(extra='ignore')
+
+    priority: int = Field(ge=0, le=5)
+    priority_label: str
+    score: Optional[int] = Field(default=None, ge=0, le=8)
+    remocao: Optional[int] = Field(default=None, ge=0, le=4)
+    framework: Optional[int] = Field(default=None, ge=0, le=1)
+    essencial: Optional[int] = Field(default=None, ge=0, le=3)
+    sub_category: str = ''
+    sub_category_label: str = ''
+    mod_name: str = ''
+    creator: str = ''
+    notes_reason: str = Field(min_length=1)
+    confidence: Optional[float] = Field(default=None, ge=0, le=1)
+
+    @field_validator('sub_category', 'sub_category_label', 'mod_name', 'creator', mode='before')
+    @classmethod
+    def _empty_string(cls, value):
+        return '' if value is None else str(value).strip()
+
+    @field_validator('sub_category')
+    @classmethod
+    def _upper(cls, value: str) -> str:
+        return value.upper()
+
+    @model_validator(mode='after')
+    def _check_consistency(self):
+        errors = consistency_errors(self.model_dump())
+        if errors:
+            raise ValueError('; '.join(errors))
+        return self
@@ -0,0 +1,344 @@
+"""Classification Schema Module - Esquema da classificação, saída estruturada e parse incremental."""
+
+import json
+from typing import Callable, Dict, List, Optional
+
+from client_registry import import_lock
+
+PRIORITY_LABELS = {0: 'Cinza', 1: 'Vermelho', 2: 'Amarelo', 3: 'Verde', 4: 'Azul', 5: 'Roxo'}
+
+# Letras de sub-categoria válidas por prioridade (prioridades 0-2 não têm sub-categoria)
+SUB_CATEGORY_LETTERS = {3: 'ABCDEF', 4: 'ABCD', 5: 'ABCDE'}
+
+SUB_CATEGORIES = [
+    f"{priority}{letter}"
+    for priority, letters in SUB_CATEGORY_LETTERS.items()
+    for letter in letters
+]
+
+# Nome do esquema/ferramenta enviado aos provedores
+SCHEMA_NAME = 'classificacao_mod'
+
+
+def _nullable_int(maximum: int) -> Dict:
+    return {'type': ['integer', 'null'], 'minimum': 0, 'maximum': maximum}
+
+
+# Esquema JSON da classificação (modo estrito da OpenAI: todos os campos
+# obrigatórios, opcionais como null e sem propriedades extras)
+CLASSIFICATION_PROPERTIES = {
+    'priority': {'type': 'integer', 'enum': list(PRIORITY_LABELS)},
+    'priority_label': {'type': 'string', 'enum': list(PRIORITY_LABELS.values())},
+    'score': _nullable_int(8),
+    'remocao': _nullable_int(4),
+    'framework': _nullable_int(1),
+    'essencial': _nullable_int(3),
+    'sub_category': {'type': 'string', 'enum': [''] + SUB_CATEGORIES},
+    'sub_category_label': {'type': 'string'},
+    'mod_name': {'type': 'string'},
+    'creator': {'type': 'string'},
+    'notes_reason': {'type': 'string'},
+    # Só pedido ao primeiro nível da cascata de modelos (nos demais fica null)
+    'confidence': {'type': ['number', 'null'], 'minimum': 0, 'maximum': 1},
+}
+
+CLASSIFICATION_SCHEMA = {
+    'type': 'object',
+    'properties': CLASSIFICATION_PROPERTIES,
+    'required': list(CLASSIFICATION_PROPERTIES),
+    'additionalProperties': False,
+}
+
+# Resposta empacotada (vários mods por requisição, ver llm_packing)
+PACKED_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'classifications': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': dict({'id': {'type': 'string'}}, **CLASSIFICATION_PROPERTIES),
+                'required': ['id'] + list(CLASSIFICATION_PROPERTIES),
+                'additionalProperties': False,
+            },
+        },
+    },
+    'required': ['classifications'],
+    'additionalProperties': False,
+}
+
+# Esquemas de saída no formato do json_schema da OpenAI ({name, schema})
+CLASSIFICATION_OUTPUT = {'name': SCHEMA_NAME, 'schema': CLASSIFICATION_SCHEMA}
+PACKED_OUTPUT = {'name': 'classificacoes_mods', 'schema': PACKED_SCHEMA}
+
+REPAIR_PROMPT = f"""Você corrige respostas JSON de um classificador de mods de The Sims 4.
+Recebe uma resposta inválida e a lista de erros encontrados. Devolva APENAS o JSON
+corrigido, mantendo a classificação original sempre que possível e alterando só o
+necessário para resolver os erros. Regras:
+- priority é um inteiro de 0 a 5 e priority_label é a cor correspondente: {json.dumps(PRIORITY_LABELS, ensure_ascii=False)}
+- sub_category fica vazia ("") para priority 0, 1 e 2; para 3, 4 e 5 é obrigatória e começa
+  com o número da prioridade: {', '.join(SUB_CATEGORIES)}
+- score = remocao + framework + essencial
+- notes_reason é obrigatório e não pode ficar vazio"""
+
+
+class ClassificationError(ValueError):
+    """Resposta do LLM malformada ou inconsistente (pode ser corrigida com uma chamada de reparo)."""
+
+    def __init__(self, message: str, response: str = '', errors: Optional[List[str]] = None):
+        super().__init__(message)
+        self.response = response
+        self.errors = errors or [message]
+
+
+def consistency_errors(fields: Dict) -> List[str]:
+    """
+    Verifica a coerência entre prioridade, cor, sub-categoria e score.
+
+    Funciona com classificações parciais (durante o streaming): só as
+    regras cujos campos já estão presentes são avaliadas.
+
+    Args:
+        fields: Campos da classificação conhecidos até agora
+
+    Returns:
+        Lista de erros (vazia se coerente)
+    """
+    errors = []
+    priority = fields.get('priority')
+    if isinstance(priority, str) and priority.strip().isdigit():
+        priority = int(priority)
+    if 'priority' in fields and (not isinstance(priority, int) or priority not in PRIORITY_LABELS):
+        return [f"priority inválida: {priority!r}"]
+
+    label = fields.get('priority_label')
+    if priority is not None and label is not None and label != PRIORITY_LABELS[priority]:
+        errors.append(
+            f"priority_label {label!r} não corresponde à priority {priority} "
+            f"({PRIORITY_LABELS[priority]!r})"
+        )
+
+    if priority is not None and 'sub_category' in fields:
+        sub_category = (fields['sub_category'] or '').strip().upper()
+        if priority not in SUB_CATEGORY_LETTERS:
+            if sub_category:
+                errors.append(f"sub_category deve ficar vazia para priority {priority}")
+        elif not sub_category:
+            errors.append(f"sub_category é obrigatória para priority {priority}")
+        elif sub_category not in SUB_CATEGORIES or not sub_category.startswith(str(priority)):
+            errors.append(f"sub_category {sub_category!r} inválida para priority {priority}")
+
+    parts = [fields.get(name) for name in ('remocao', 'framework', 'essencial')]
+    score = fields.get('score')
+    if score is not None and all(isinstance(part, int) for part in parts) and score != sum(parts):
+        errors.append(f"score {score} diferente de remocao + framework + essencial ({sum(parts)})")
+    return errors
+
+
+def validate_classification(data, response: str = '') -> Dict:
+    """
+    Valida uma classificação contra ModClassification (pydantic é importado na primeira validação).
+
+    Args:
+        data: Objeto JSON retornado pelo LLM
+        response: Texto original da resposta (guardado no erro para o reparo)
+
+    Returns:
+        Classificação normalizada (dict)
+
+    Raises:
+        ClassificationError: Se faltar campo obrigatório ou houver incoerência
+    """
+    if not isinstance(data, dict):
+        raise ClassificationError(f"Resposta inválida do LLM: {str(data)[:200]}", response)
+    with import_lock:
+        from pydantic import ValidationError
+        from classification_model import ModClassification
+    try:
+        return ModClassification.model_validate(data).model_dump()
+    except ValidationError as e:
+        errors = [
+            f"{'.'.join(str(part) for part in error['loc']) or 'classificação'}: {error['msg']}"
+            for error in e.errors()
+        ]
+        raise ClassificationError('; '.join(errors), response or json.dumps(data, ensure_ascii=False), errors)
+
+
+def repair_message(error: ClassificationError) -> str:
+    """
+    Monta a mensagem da chamada de reparo (só a resposta e os erros, sem o conteúdo do mod).
+
+    Args:
+        error: Erro de parse/validação com a resposta original
+
+    Returns:
+        Mensagem do usuário para o reparo
+    """
+    errors = '\n'.join(f"- {item}" for item in error.errors)
+    return f"Erros encontrados:\n{errors}\n\nResposta a corrigir:\n{error.response}\n"
+
+
+def gemini_schema(schema: Dict) -> Dict:
+    """
+    Converte um esquema JSON para o subconjunto aceito pelo response_schema do Gemini.
+
+    Tipos com null viram "nullable", enums só são mantidos em strings
+    (e sem valor vazio) e additionalProperties/limites numéricos são removidos.
+    """
+    converted = {}
+    for key, value in schema.items():
+        if key in ('additionalProperties', 'minimum', 'maximum'):
+            continue
+        if key == 'type' and isinstance(value, list):
+            types = [item for item in value if item != 'null']
+            converted['type'] = types[0]
+            if 'null' in value:
+                converted['nullable'] = True
+        elif key == 'properties':
+            converted[key] = {name: gemini_schema(prop) for name, prop in value.items()}
+        elif key == 'items':
+            converted[key] = gemini_schema(value)
+        elif key == 'enum':
+            if schema.get('type') == 'string' and '' not in value:
+                converted[key] = value
+        else:
+            converted[key] = value
+    return converted
+
+
+class StreamingClassificationParser:
+    """
+    Parser incremental do objeto JSON da classificação.
+
+    Recebe os pedaços da resposta à medida que chegam do provedor (ou o
+    texto inteiro de uma vez) e, a cada campo de primeiro nível concluído,
+    verifica a coerência com os campos já recebidos (ex.: cor x
+    prioridade, sub-categoria x prioridade). Texto fora do objeto, como
+    cercas ```json, é ignorado; uma resposta truncada mantém os campos
+    completos recebidos até o corte.
+    """
+
+    def __init__(self, check: Optional[Callable[[Dict], List[str]]] = consistency_errors):
+        """
+        Args:
+            check: Função que recebe os campos parciais e retorna erros (None desativa)
+        """
+        self.check = check
+        self.fields: Dict = {}
+        self.errors: List[str] = []
+        self.done = False
+        self._buffer = ''
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._state = 'start'
+        self._key_start = 0
+        self._key = None
+        self._value_start = 0
+
+    @property
+    def text(self) -> str:
+        """Texto recebido até agora."""
+        return self._buffer
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Processa um pedaço da resposta.
+
+        Returns:
+            Erros novos encontrados neste pedaço
+        """
+        if not chunk:
+            return []
+        known = len(self.errors)
+        offset = len(self._buffer)
+        self._buffer += chunk
+        for index in range(offset, len(self._buffer)):
+            if self.done:
+                break
+            self._step(index, self._buffer[index])
+        return self.errors[known:]
+
+    def finish(self) -> Dict:
+        """
+        Conclui o parse e valida a classificação completa.
+
+        Returns:
+            Classificação normalizada
+
+        Raises:
+            ClassificationError: Se o JSON estiver incompleto, malformado ou incoerente
+        """
+        if not self.done:
+            errors = self.errors + ["JSON incompleto ou ausente na resposta"]
+            raise ClassificationError('; '.join(errors), self._buffer, errors)
+        if self.errors:
+            raise ClassificationError('; '.join(self.errors), self._buffer, list(self.errors))
+        return validate_classification(self.fields, self._buffer)
+
+    def _step(self, index: int, char: str) -> None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == '\\':
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1 and self._state == 'key':
+                    self._key = json.loads(self._buffer[self._key_start:index + 1])
+                    self._state = 'colon'
+                elif self._depth == 1 and self._state == 'value':
+                    self._complete(index + 1)
+            return
+
+        if self._state == 'start':
+            # Ignora texto antes do objeto (ex.: cerca ```json)
+            if char == '{':
+                self._depth = 1
+                self._state = 'key'
+            return
+
+        if char == '"':
+            self._in_string = True
+            if self._depth == 1 and self._state == 'key':
+                self._key_start = index
+            elif self._depth == 1 and self._state == 'before_value':
+                self._value_start = index
+                self._state = 'value'
+            return
+
+        if char in '{[':
+            if self._depth == 1 and self._state == 'before_value':
+                self._value_start = index
+                self._state = 'value'
+            self._depth += 1
+        elif char in '}]':
+            self._depth -= 1
+            if self._depth == 1 and self._state == 'value':
+                self._complete(index + 1)
+            elif self._depth == 0:
+                if self._state == 'value':
+                    self._complete(index)
+                self.done = True
+        elif self._depth == 1:
+            if self._state == 'colon' and char == ':':
+                self._state = 'before_value'
+            elif self._state == 'before_value' and not char.isspace():
+                self._value_start = index
+                self._state = 'value'
+            elif self._state == 'value' and (char == ',' or char.isspace()):
+                self._complete(index)
+
+    def _complete(self, end: int) -> None:
+        """Registra o valor de primeiro nível que terminou em end e verifica a coerência."""
+        self._state = 'key'
+        raw = self._buffer[self._value_start:end].strip()
+        try:
+            self.fields[self._key] = json.loads(raw)
+        except json.JSONDecodeError:
+            self.errors.append(f"{self._key}: valor JSON inválido ({raw[:50]})")
+            return
+        if self.check is not None:
+            for error in self.check(self.fields):
+                if error not in self.errors:
+                    self.errors.append(error)
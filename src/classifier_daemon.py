@@ -0,0 +1,238 @@
+"""Classifier Daemon Module - Serviço local que mantém o pipeline aquecido entre classificações."""
+
+import json
+import signal
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from batch_runner import BatchRunner
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8787
+
+# Jobs concluídos guardados para consulta (os mais antigos são descartados)
+DEFAULT_MAX_FINISHED = 10000
+
+# Sugestão de espera (segundos) devolvida no Retry-After quando a fila está cheia
+RETRY_AFTER_SECONDS = 5
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class QueueFullError(Exception):
+    """A fila do daemon está cheia; o cliente deve tentar de novo mais tarde."""
+
+
+class ClassifierDaemon:
+    """
+    Fila de jobs de classificação processados por um pool limitado.
+
+    Cada job passa pelas mesmas etapas do modo lote (BatchRunner), com os
+    mesmos limites por etapa; os clientes HTTP, o LLMClient e os caches
+    ficam vivos entre os jobs. Quando há max_pending jobs esperando ou em
+    execução, novas submissões são recusadas (QueueFullError) em vez de
+    acumular sem limite. Um mod já na fila (mesma URL e page_id) não é
+    enfileirado de novo: a submissão recebe o id do job existente.
+    """
+
+    def __init__(self, pipeline, scrape_workers: int = 4, llm_workers: int = 2,
+                 notion_workers: int = 1, max_pending: Optional[int] = None,
+                 max_finished: int = DEFAULT_MAX_FINISHED):
+        """
+        Args:
+            pipeline: Instância de ModClassifierPipeline
+            scrape_workers: Máximo de extrações simultâneas
+            llm_workers: Máximo de chamadas simultâneas ao LLM
+            notion_workers: Máximo de gravações simultâneas no Notion
+            max_pending: Máximo de jobs na fila + em execução (padrão: 4x o pool)
+            max_finished: Quantos jobs concluídos ficam disponíveis para consulta
+        """
+        self.runner = BatchRunner(
+            pipeline, scrape_workers=scrape_workers,
+            llm_workers=llm_workers, notion_workers=notion_workers
+        )
+        workers = scrape_workers + llm_workers + notion_workers
+        self.max_pending = max_pending or workers * 4
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='daemon')
+        self._jobs: Dict[str, Dict] = {}
+        self._active: Dict[Tuple[str, Optional[str]], str] = {}
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._counts = {'submitted': 0, 'deduplicated': 0, 'rejected': 0, 'ok': 0, 'error': 0}
+
+    def warm_up(self) -> None:
+        """Cria os clientes compartilhados antes do primeiro job."""
+        self.runner._warm_up()
+
+    def submit(self, mod_url: str, notion_page_id: Optional[str] = None) -> Dict:
+        """
+        Enfileira a classificação de um mod.
+
+        Args:
+            mod_url: URL da página do mod
+            notion_page_id: ID da página no Notion (opcional)
+
+        Returns:
+            Cópia do job (id, status 'queued'/'running', ...)
+
+        Raises:
+            QueueFullError: Se a fila estiver cheia ou o daemon encerrando
+        """
+        key = (mod_url, notion_page_id)
+        with self._lock:
+            if self._closed:
+                raise QueueFullError("Daemon encerrando")
+            job_id = self._active.get(key)
+            if job_id is not None:
+                self._counts['deduplicated'] += 1
+                return dict(self._jobs[job_id])
+            if len(self._active) >= self.max_pending:
+                self._counts['rejected'] += 1
+                raise QueueFullError(f"{len(self._active)} jobs pendentes (limite {self.max_pending})")
+            job_id = uuid.uuid4().hex
+            job = {'id': job_id, 'url': mod_url, 'page_id': notion_page_id,
+                   'status': 'queued', 'submitted_at': time.time()}
+            self._jobs[job_id] = job
+            self._active[key] = job_id
+            self._counts['submitted'] += 1
+            snapshot = dict(job)
+        self._executor.submit(self._run, job_id)
+        return snapshot
+
+    def _run(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+        result = self.runner._process_one(job['url'], job['page_id'])
+        with self._lock:
+            job['status'] = result.pop('status')
+            job['finished_at'] = time.time()
+            for name in ('decision', 'classification', 'notion_updated', 'stage', 'error', 'metrics'):
+                if name in result:
+                    job[name] = result[name]
+            self._counts[job['status']] += 1
+            del self._active[(job['url'], job['page_id'])]
+            self._finished[job_id] = None
+            while len(self._finished) > self.max_finished:
+                old_id, _ = self._finished.popitem(last=False)
+                del self._jobs[old_id]
+        logger.info("Job %s %s %s (%s)", job_id, job['status'].upper(), job['url'],
+                    job.get('decision', job.get('stage', '')))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Retorna uma cópia do job, ou None se não existir (ou já tiver sido descartado)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self) -> Dict:
+        """Contadores do daemon (submetidos, deduplicados, recusados, ok, erros, pendentes)."""
+        with self._lock:
+            return dict(self._counts, pending=len(self._active), max_pending=self.max_pending)
+
+    def close(self, wait: bool = True) -> None:
+        """Para de aceitar jobs e espera (ou não) os que estão na fila."""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """
+    API HTTP do daemon.
+
+    POST /jobs        {"url": ..., "page_id": ...} -> 202 {"id", "status", ...}
+                      (429 com Retry-After se a fila estiver cheia)
+    GET  /jobs/<id>   -> 200 com o job (status queued, running, ok ou error)
+    GET  /health      -> 200 com os contadores do daemon
+    GET  /metrics     -> 200 com as métricas por etapa no formato do Prometheus
+    """
+
+    protocol_version = 'HTTP/1.1'
+    classifier: ClassifierDaemon = None
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def _send(self, status: int, body, headers: Optional[Dict[str, str]] = None,
+              content_type: str = 'application/json; charset=utf-8') -> None:
+        if isinstance(body, str):
+            data = body.encode('utf-8')
+        else:
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            return self._send(200, self.classifier.stats())
+        if self.path == '/metrics':
+            return self._send(200, get_metrics().to_prometheus(),
+                              content_type='text/plain; version=0.0.4; charset=utf-8')
+        if self.path.startswith('/jobs/'):
+            job = self.classifier.get(self.path[len('/jobs/'):])
+            if job is None:
+                return self._send(404, {'error': 'job não encontrado'})
+            return self._send(200, job)
+        self._send(404, {'error': 'rota não encontrada'})
+
+    def do_POST(self):
+        if self.path != '/jobs':
+            return self._send(404, {'error': 'rota não encontrada'})
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return self._send(413, {'error': 'corpo da requisição muito grande'})
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            mod_url = str(body['url']).strip()
+        except (ValueError, KeyError, TypeError):
+            return self._send(400, {'error': 'esperado JSON com "url" (e "page_id" opcional)'})
+        if not mod_url.startswith(('http://', 'https://')):
+            return self._send(400, {'error': f'URL inválida: {mod_url}'})
+        try:
+            job = self.classifier.submit(mod_url, body.get('page_id') or None)
+        except QueueFullError as e:
+            return self._send(429, {'error': str(e)}, {'Retry-After': str(RETRY_AFTER_SECONDS)})
+        self._send(202, job, {'Location': f"/jobs/{job['id']}"})
+
+
+def serve(daemon: ClassifierDaemon, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    """
+    Atende a API HTTP até Ctrl+C ou SIGTERM; ao sair, termina os jobs já aceitos.
+
+    Args:
+        daemon: ClassifierDaemon que processa os jobs
+        host: Endereço de escuta (padrão: só a máquina local)
+        port: Porta TCP
+    """
+    handler = type('Handler', (DaemonRequestHandler,), {'classifier': daemon})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    logger.info("Daemon ouvindo em http://%s:%s (até %s jobs pendentes)",
+                host, server.server_port, daemon.max_pending)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Encerrando daemon; aguardando os jobs pendentes...")
+    finally:
+        server.server_close()
+        daemon.close(wait=True)
@@ -0,0 +1,97 @@
+"""Client Registry Module - Reaproveita clientes (LLM, scraper, Notion) no processo."""
+
+import atexit
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """
+    Registro de clientes compartilhados no processo.
+
+    Cada cliente é criado uma única vez por chave (ex.: provedor, modelo e
+    API key) e reaproveitado nas chamadas seguintes, mantendo os pools de
+    conexão HTTP aquecidos. Os clientes são fechados em close_all(),
+    chamado automaticamente ao final do processo.
+
+    Cada chave tem seu próprio lock de criação: uma fábrica pode obter
+    outros clientes do registro (ex.: o cache de classificações, o rate
+    limiter) sem bloquear a criação das demais chaves.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Hashable, Any] = {}
+        self._creating: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Retorna o cliente registrado para a chave, criando-o se necessário.
+
+        Args:
+            key: Chave que identifica o cliente
+            factory: Função sem argumentos que cria o cliente
+
+        Returns:
+            Instância do cliente
+        """
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            creating = self._creating.setdefault(key, threading.Lock())
+        with creating:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                with self._lock:
+                    self._clients[key] = client
+                logger.debug("Cliente criado no registro: %s", key[0] if isinstance(key, tuple) else key)
+            return client
+
+    def close(self, key: Hashable) -> None:
+        """Fecha e remove um cliente específico do registro."""
+        with self._lock:
+            client = self._clients.pop(key, None)
+        self._close_client(client)
+
+    def close_all(self) -> None:
+        """Fecha todos os clientes registrados."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            self._close_client(client)
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    @staticmethod
+    def _close_client(client: Any) -> None:
+        close = getattr(client, 'close', None)
+        if close is None:
+            return
+        try:
+            close()
+        except Exception as e:
+            logger.warning("Erro ao fechar cliente %s: %s", type(client).__name__, e)
+
+
+# Registro global do processo
+registry = ClientRegistry()
+atexit.register(registry.close_all)
+
+# Imports adiados (SDKs, requests, lxml, pydantic) feitos por várias threads
+# ao mesmo tempo podem enxergar dependências comuns (ex.: httpx, usado pela
+# openai e pelo notion_client) parcialmente inicializadas; esses imports
+# passam um de cada vez por este lock
+import_lock = threading.RLock()
+
+
+def shutdown() -> None:
+    """Fecha todos os clientes compartilhados (ex.: ao encerrar um worker)."""
+    registry.close_all()
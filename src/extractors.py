@@ -0,0 +1,497 @@
+"""Extractors Module - Regras de extração de conteúdo por site (modthesims, CurseForge, Patreon)."""
+
+import re
+import logging
+from urllib.parse import urlparse
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tags cujo conteúdo é sempre descartado
+SKIP_TAGS = {'script', 'style', 'nav', 'footer', 'header', 'noscript', 'template'}
+
+# Tags que podem iniciar uma subseção (ex.: "Requirements", "Changelog")
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'strong', 'b', 'summary'}
+
+# Rótulos das seções no texto enviado ao LLM
+SECTION_LABELS = {
+    'description': 'Descrição',
+    'requirements': 'Requisitos e conflitos',
+    'changelog': 'Changelog',
+}
+
+# Títulos que redirecionam o texto seguinte para outra seção
+DEFAULT_HEADINGS = {
+    'requirements': re.compile(
+        r'requ|requisit|conflit|conflict|depend|incompat|needs?\b|packs? needed', re.IGNORECASE
+    ),
+    'changelog': re.compile(
+        r'change ?log|update|atualiza|version history|hist[óo]rico|patch notes', re.IGNORECASE
+    ),
+}
+
+CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+def normalize(text: str) -> str:
+    """Colapsa espaços múltiplos."""
+    return ' '.join(text.split())
+
+
+def sniff_encoding(head: bytes) -> str:
+    """Codificação declarada em <meta charset> no início do HTML (padrão UTF-8)."""
+    match = CHARSET_RE.search(head[:4096])
+    return match.group(1).decode('ascii') if match else 'utf-8'
+
+
+class Selector:
+    """
+    Seletor CSS simples de um único elemento.
+
+    Suporta tag, #id, .classe e [atributo] / [atributo=valor], combinados
+    (ex.: div.description, [data-tag="post-content"]). Não há combinadores
+    de descendência: o parser é incremental e só vê um elemento por vez.
+    """
+
+    _TOKEN_RE = re.compile(r'#([\w-]+)|\.([\w-]+)|\[([\w-]+)(?:=["\']?([^"\'\]]*)["\']?)?\]|([\w-]+)')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tag: Optional[str] = None
+        self.id: Optional[str] = None
+        self.classes: Tuple[str, ...] = ()
+        self.attrs: Dict[str, Optional[str]] = {}
+
+        classes = []
+        for id_, cls, attr, value, tag in self._TOKEN_RE.findall(text.strip()):
+            if id_:
+                self.id = id_
+            elif cls:
+                classes.append(cls)
+            elif attr:
+                self.attrs[attr] = value if value != '' else None
+            elif tag:
+                self.tag = tag.lower()
+        self.classes = tuple(classes)
+
+    def matches(self, tag: str, attrib, classes: Sequence[str]) -> bool:
+        """Indica se o elemento (tag, atributos, classes) casa com o seletor."""
+        if self.tag is not None and tag != self.tag:
+            return False
+        if self.id is not None and attrib.get('id') != self.id:
+            return False
+        if any(c not in classes for c in self.classes):
+            return False
+        for name, value in self.attrs.items():
+            if name not in attrib or (value is not None and attrib[name] != value):
+                return False
+        return True
+
+    def __repr__(self):
+        return f"Selector({self.text!r})"
+
+
+class SelectorIndex:
+    """
+    Índice de seletores para consulta em O(1) a cada tag aberta.
+
+    Cada seletor é indexado pela parte mais seletiva (id, depois a primeira
+    classe, depois o atributo e por fim a tag); a consulta só testa por
+    completo os poucos seletores que compartilham essa chave com o elemento.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, object]]):
+        """
+        Monta o índice.
+
+        Args:
+            entries: Pares (seletor, valor associado)
+        """
+        self._by_id: Dict[str, List[Tuple[Selector, object]]] = {}
+        self._by_class: Dict[str, List[Tuple[Selector, object]]] = {}
+        self._by_attr: Dict[str, List[Tuple[Selector, object]]] = {}
+        self._by_tag: Dict[str, List[Tuple[Selector, object]]] = {}
+
+        for text, value in entries:
+            selector = Selector(text)
+            if selector.id is not None:
+                bucket, key = self._by_id, selector.id
+            elif selector.classes:
+                bucket, key = self._by_class, selector.classes[0]
+            elif selector.attrs:
+                bucket, key = self._by_attr, next(iter(selector.attrs))
+            elif selector.tag is not None:
+                bucket, key = self._by_tag, selector.tag
+            else:
+                raise ValueError(f"Seletor inválido: {text!r}")
+            bucket.setdefault(key, []).append((selector, value))
+
+    def match(self, tag: str, attrib) -> List[object]:
+        """
+        Retorna os valores dos seletores que casam com o elemento.
+
+        Args:
+            tag: Nome da tag
+            attrib: Atributos do elemento
+
+        Returns:
+            Lista de valores na ordem de registro por chave
+        """
+        candidates = list(self._by_tag.get(tag, ()))
+        element_id = attrib.get('id')
+        if element_id and self._by_id:
+            candidates.extend(self._by_id.get(element_id, ()))
+        classes: Sequence[str] = ()
+        if self._by_class:
+            class_attr = attrib.get('class')
+            if class_attr:
+                classes = class_attr.split()
+                for cls in classes:
+                    candidates.extend(self._by_class.get(cls, ()))
+        for name, entries in self._by_attr.items():
+            if name in attrib:
+                candidates.extend(entries)
+
+        if not candidates:
+            return []
+        if not classes and attrib.get('class'):
+            classes = attrib['class'].split()
+        return [value for selector, value in candidates if selector.matches(tag, attrib, classes)]
+
+
+class Extractor:
+    """
+    Regras de extração de um site.
+
+    As seções são lidas do primeiro elemento que casa com cada seletor. No
+    modo first_only (caminho genérico) vale só a primeira seção, na ordem
+    declarada, que tiver texto; nos extratores de site todas as seções são
+    combinadas com rótulos. Dentro de uma seção, um título que casa com
+    `headings` (ex.: "Requirements") envia o texto seguinte para a seção
+    correspondente. Os seletores de `skip` descartam comentários, listas
+    de download, barras laterais etc.
+    """
+
+    def __init__(self, name: str, sections: Sequence[Tuple[str, Sequence[str]]],
+                 domains: Sequence[str] = (), skip: Sequence[str] = (),
+                 first_only: bool = False,
+                 headings: Optional[Dict[str, Pattern]] = None,
+                 version: int = 1):
+        """
+        Inicializa o extrator.
+
+        Args:
+            name: Nome do extrator
+            sections: Pares (nome da seção, seletores) em ordem de preferência
+            domains: Domínios atendidos (subdomínios incluídos)
+            skip: Seletores cujo conteúdo é descartado
+            first_only: Usa só a primeira seção com texto
+            headings: Regex de títulos por seção de destino
+            version: Versão das regras (invalida extrações em cache)
+        """
+        self.name = name
+        self.sections = [name for name, _ in sections]
+        self.domains = tuple(domains)
+        self.first_only = first_only
+        self.headings = headings or {}
+        self.version = version
+        self.index = SelectorIndex(
+            [(selector, ('section', section)) for section, selectors in sections for selector in selectors]
+            + [(selector, ('skip', None)) for selector in skip]
+        )
+
+    @property
+    def id(self) -> str:
+        """Identificador nome@versão gravado junto da extração."""
+        return f"{self.name}@{self.version}"
+
+    def handler(self, max_text_chars: int) -> 'ContentHandler':
+        """Cria o handler do parser lxml para uma página."""
+        return ContentHandler(self, max_text_chars)
+
+
+class ContentHandler:
+    """
+    Handler SAX (target do parser lxml) que extrai o conteúdo durante o parse.
+
+    Recebe os eventos start/data/end conforme os bytes chegam, sem montar a
+    árvore do documento. Guarda o título, as meta tags, o primeiro h1 e o
+    primeiro parágrafo, e o texto de cada seção do extrator e do body,
+    cada um limitado a max_text_chars. `done` indica que as seções
+    necessárias já foram lidas e o download pode parar.
+    """
+
+    def __init__(self, extractor: Extractor, max_text_chars: int):
+        self.extractor = extractor
+        self.max_text_chars = max_text_chars
+        self.done = False
+        self.meta: Dict[str, str] = {}
+        self.title_parts: List[str] = []
+        self.h1_parts: List[str] = []
+        self.first_p_parts: List[str] = []
+        names = extractor.sections + [n for n in extractor.headings if n not in extractor.sections]
+        self.texts: Dict[str, List[str]] = {name: [] for name in names + ['body']}
+        self.lengths: Dict[str, int] = {name: 0 for name in self.texts}
+        self._finished = set()
+        self._open: Dict[str, int] = {}  # seção -> profundidade em que abriu
+        self._depth = 0
+        self._skip_depth = None
+        self._in_title = False
+        self._h1_state = 'pending'
+        self._p_state = 'pending'
+        self._heading_depth = None
+        self._heading_tag = None
+        self._heading_parts: List[str] = []
+        self._route: Optional[str] = None  # seção de destino após um título reconhecido
+        self._route_depth = None
+
+    def start(self, tag, attrib):
+        self._depth += 1
+        if self._skip_depth is not None:
+            return
+        if tag in SKIP_TAGS:
+            self._skip_depth = self._depth
+            return
+
+        matches = self.extractor.index.match(tag, attrib)
+        if ('skip', None) in matches:
+            self._skip_depth = self._depth
+            return
+        self._separate()
+
+        if tag == 'title':
+            self._in_title = True
+        elif tag == 'meta':
+            key = attrib.get('property') or attrib.get('name')
+            if key and attrib.get('content') and key not in self.meta:
+                self.meta[key] = attrib['content']
+        elif tag == 'h1' and self._h1_state == 'pending':
+            self._h1_state = self._depth
+        elif tag == 'p' and self._p_state == 'pending':
+            self._p_state = self._depth
+
+        if tag in HEADING_TAGS and self._heading_depth is None and self.extractor.headings \
+                and any(name != 'body' for name in self._open):
+            self._heading_depth = self._depth
+            self._heading_tag = tag
+            self._heading_parts = []
+
+        if tag == 'body':
+            self._open.setdefault('body', self._depth)
+        for kind, name in matches:
+            # Só a primeira ocorrência de cada seção conta (como select_one)
+            if name not in self._finished and name not in self._open:
+                self._open[name] = self._depth
+
+    def end(self, tag):
+        if self._skip_depth is not None:
+            if self._depth == self._skip_depth:
+                self._skip_depth = None
+            self._depth -= 1
+            return
+
+        self._separate()
+        if tag == 'title':
+            self._in_title = False
+        if self._h1_state == self._depth:
+            self._h1_state = 'done'
+        if self._p_state == self._depth:
+            self._p_state = 'done'
+        if self._heading_depth == self._depth:
+            self._heading_depth = None
+            self._route_heading(self._heading_tag, normalize(''.join(self._heading_parts)))
+
+        for name, depth in list(self._open.items()):
+            if depth == self._depth:
+                del self._open[name]
+                self._finished.add(name)
+        if self._route_depth is not None and self._route_depth >= self._depth:
+            self._route = self._route_depth = None
+        self._depth -= 1
+        self._update_done()
+
+    def data(self, data):
+        # O lxml pode entregar um mesmo trecho de texto em vários pedaços,
+        # então o texto é guardado cru e os espaços normalizados no final
+        if self._skip_depth is not None:
+            return
+
+        if self._in_title:
+            self.title_parts.append(data)
+        if isinstance(self._h1_state, int):
+            self.h1_parts.append(data)
+        if isinstance(self._p_state, int):
+            self.first_p_parts.append(data)
+        if self._heading_depth is not None:
+            # O destino do título só é conhecido quando ele fecha
+            self._heading_parts.append(data)
+            return
+
+        self._append(data)
+
+    def _append(self, data: str) -> None:
+        """Acrescenta texto às seções abertas, respeitando o limite."""
+        if not data.strip():
+            return
+        for name in self._targets():
+            if self.lengths[name] < self.max_text_chars:
+                self.texts[name].append(data)
+                self.lengths[name] += len(data)
+        self._update_done()
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return self
+
+    def _targets(self) -> List[str]:
+        """Seções que recebem o texto atual (com o redirecionamento por título)."""
+        if self._route is None:
+            return list(self._open)
+        return [self._route if name != 'body' else name for name in self._open]
+
+    def _route_heading(self, tag: str, heading: str) -> None:
+        """
+        Redireciona o texto seguinte conforme o título lido.
+
+        O redirecionamento vale até fechar a seção que contém o título ou
+        até um h1-h6 que não case com nenhuma seção (negrito no meio do
+        texto não interrompe).
+        """
+        if heading and len(heading) <= 80:
+            for name, pattern in self.extractor.headings.items():
+                if pattern.search(heading):
+                    self._route = name
+                    self._route_depth = max(d for n, d in self._open.items() if n != 'body')
+                    # O título vai para o body (fallback), não para a seção
+                    if self.lengths['body'] < self.max_text_chars:
+                        self.texts['body'].append(f' {heading} ')
+                    return
+            if self._route is not None and tag.startswith('h'):
+                self._route = self._route_depth = None
+        self._append(heading)
+
+    def _separate(self):
+        """Separa o texto de elementos vizinhos (como get_text(separator=' '))."""
+        for name in self._targets():
+            if self.lengths[name] < self.max_text_chars:
+                self.texts[name].append(' ')
+
+    def _complete(self, name: str) -> bool:
+        return name in self._finished or self.lengths[name] >= self.max_text_chars
+
+    def _update_done(self):
+        sections = self.extractor.sections
+        if self.extractor.first_only:
+            # A primeira seção completa encerra o parse, se nenhuma preferida estiver aberta
+            for position, name in enumerate(sections):
+                if self._complete(name) and self.lengths[name]:
+                    if not any(p in self._open for p in sections[:position]):
+                        self.done = True
+                    return
+        elif all(self._complete(name) for name in sections):
+            self.done = True
+
+    def section_texts(self) -> Dict[str, str]:
+        """Texto normalizado de cada seção com conteúdo."""
+        return {
+            name: normalize(''.join(parts))[:self.max_text_chars]
+            for name, parts in self.texts.items()
+            if name != 'body' and self.lengths[name]
+        }
+
+    def main_text(self) -> str:
+        """Texto a classificar: seções do extrator ou, se vazias, o body inteiro."""
+        sections = self.section_texts()
+        if self.extractor.first_only:
+            for name in self.extractor.sections:
+                if name in sections:
+                    return sections[name]
+        elif sections:
+            return '\n\n'.join(
+                f"{SECTION_LABELS.get(name, name)}: {text}" for name, text in sections.items()
+            )
+        return normalize(''.join(self.texts['body']))[:self.max_text_chars]
+
+
+# Caminho genérico: primeiro candidato a conteúdo principal, ou o body
+GENERIC = Extractor(
+    'generic',
+    sections=[(s, [s]) for s in ('article', 'main', '[role="main"]', '.content', '#content')],
+    first_only=True,
+)
+
+MODTHESIMS = Extractor(
+    'modthesims',
+    domains=['modthesims.info'],
+    sections=[
+        ('description', ['#description', '.download-description', '.downloaddescription']),
+        ('requirements', ['#requirements', '.required-packs', '.requirements']),
+        ('changelog', ['#changelog', '.changelog']),
+    ],
+    skip=['#comments', '.comments', '#downloadfiles', '.download-files', '.sidebar',
+          '.related-downloads', '.thanks-list', '.tags', '.share-buttons'],
+    headings=DEFAULT_HEADINGS,
+)
+
+CURSEFORGE = Extractor(
+    'curseforge',
+    domains=['curseforge.com'],
+    sections=[
+        ('description', ['.project-description', '.tab-content.description', '#description']),
+        ('requirements', ['.project-relations', '#dependencies', '.dependencies']),
+        ('changelog', ['.changelog', '#changelog']),
+    ],
+    skip=['aside', '.comments', '#comments', '.project-files', '.related-projects',
+          '.ad-container', '.project-members'],
+    headings=DEFAULT_HEADINGS,
+)
+
+PATREON = Extractor(
+    'patreon',
+    domains=['patreon.com'],
+    sections=[
+        ('description', ['[data-tag="post-content"]']),
+    ],
+    skip=['aside', '[data-tag="comment-row"]', '[data-tag="post-tags"]',
+          '[data-tag="post-details"]', '[data-tag="post-attachments"]'],
+    headings=DEFAULT_HEADINGS,
+)
+
+# Registro de extratores por domínio
+_REGISTRY: Dict[str, Extractor] = {}
+
+
+def register_extractor(extractor: Extractor) -> None:
+    """
+    Registra um extrator para os seus domínios (substitui registros anteriores).
+
+    Args:
+        extractor: Extrator com `domains` preenchido
+    """
+    for domain in extractor.domains:
+        _REGISTRY[domain.lower()] = extractor
+
+
+for _extractor in (MODTHESIMS, CURSEFORGE, PATREON):
+    register_extractor(_extractor)
+
+
+def get_extractor(url: str) -> Extractor:
+    """
+    Escolhe o extrator pelo domínio da URL (subdomínios incluídos).
+
+    Args:
+        url: URL da página
+
+    Returns:
+        Extrator do site ou GENERIC
+    """
+    host = (urlparse(url).hostname or '').lower()
+    parts = host.split('.')
+    for i in range(len(parts) - 1):
+        extractor = _REGISTRY.get('.'.join(parts[i:]))
+        if extractor is not None:
+            return extractor
+    return GENERIC
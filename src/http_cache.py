@@ -0,0 +1,185 @@
+"""HTTP Cache Module - Armazena páginas baixadas e validadores (ETag/Last-Modified) em disco."""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from client_registry import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = '.cache/http'
+
+
+class HTTPCache:
+    """
+    Cache em disco de respostas HTTP para requisições condicionais.
+
+    Para cada URL são gravados o corpo da resposta (<hash>.body) e um
+    arquivo de metadados (<hash>.json) com ETag, Last-Modified e o
+    resultado já extraído da página. O tamanho total é limitado: ao
+    ultrapassar max_bytes, as entradas acessadas há mais tempo são removidas.
+    O total é somado uma vez na inicialização e atualizado a cada gravação;
+    o diretório só é percorrido de novo quando o limite é ultrapassado.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = 200 * 1024 * 1024):
+        """
+        Inicializa o cache.
+
+        Args:
+            directory: Diretório onde os arquivos são gravados
+            max_bytes: Tamanho máximo do cache em bytes
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total = sum(size for _, size, _ in self._scan())
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.directory / f'{key}.json', self.directory / f'{key}.body'
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Retorna os metadados armazenados para a URL.
+
+        Args:
+            url: URL da página
+
+        Returns:
+            Dict com etag, last_modified, extracted, complete, ... ou None
+        """
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not body_path.exists():
+            return None
+        return meta
+
+    def get_body(self, url: str) -> Optional[bytes]:
+        """Retorna o corpo armazenado para a URL (ou None)."""
+        _, body_path = self._paths(url)
+        try:
+            return body_path.read_bytes()
+        except OSError:
+            return None
+
+    def put(self, url: str, body: bytes, etag: Optional[str],
+            last_modified: Optional[str], extracted: Dict, complete: bool = True) -> None:
+        """
+        Grava corpo, validadores e resultado extraído da URL.
+
+        Args:
+            url: URL da página
+            body: Corpo bruto da resposta
+            etag: Cabeçalho ETag (se houver)
+            last_modified: Cabeçalho Last-Modified (se houver)
+            extracted: Resultado de WebScraper para esta página
+            complete: False se o corpo é só o início da página (parse com
+                parada antecipada); um novo parse dele exige baixar a página de novo
+        """
+        meta_path, body_path = self._paths(url)
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': time.time(),
+            'size': len(body),
+            'complete': complete,
+            'extracted': extracted,
+        }
+        with self._lock:
+            try:
+                self._total -= body_path.stat().st_size
+            except OSError:
+                pass
+            self._atomic_write(body_path, body)
+            self._atomic_write(
+                meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8')
+            )
+            self._total += len(body)
+            if self._total > self.max_bytes:
+                self._enforce_limit()
+
+    def touch(self, url: str) -> None:
+        """Marca a entrada como usada agora (para a remoção LRU)."""
+        for path in self._paths(url):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        tmp_path = path.with_suffix(path.suffix + f'.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _scan(self):
+        """Lista (mtime, tamanho, caminho) dos corpos gravados no diretório."""
+        entries = []
+        for body_path in self.directory.glob('*.body'):
+            try:
+                stat = body_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, body_path))
+        return entries
+
+    def _enforce_limit(self) -> None:
+        """Remove as entradas mais antigas até o cache caber em max_bytes."""
+        # Recontado do disco: corrige o total se outro processo usa o mesmo diretório
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        self._total = total
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        removed = 0
+        for _, size, body_path in entries:
+            if total <= self.max_bytes:
+                break
+            for path in (body_path, body_path.with_suffix('.json')):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        self._total = total
+        logger.debug("Cache HTTP: %s entradas removidas para respeitar o limite", removed)
+
+
+def get_default_http_cache() -> Optional[HTTPCache]:
+    """
+    Retorna o cache HTTP compartilhado configurado pelas variáveis de ambiente.
+
+    Variáveis:
+        HTTP_CACHE         - "0" desabilita o cache (padrão: habilitado)
+        HTTP_CACHE_DIR     - Diretório do cache (padrão: .cache/http)
+        HTTP_CACHE_MAX_MB  - Tamanho máximo em MB (padrão: 200)
+
+    Returns:
+        HTTPCache ou None se desabilitado
+    """
+    if os.getenv('HTTP_CACHE', '1').lower() in ('0', 'false', 'no', 'off'):
+        return None
+
+    directory = os.getenv('HTTP_CACHE_DIR', DEFAULT_CACHE_DIR)
+    max_bytes = int(float(os.getenv('HTTP_CACHE_MAX_MB', '200')) * 1024 * 1024)
+    return registry.get_or_create(
+        ('http_cache', directory),
+        lambda: HTTPCache(directory=directory, max_bytes=max_bytes)
+    )
@@ -0,0 +1,218 @@
+"""Job Journal Module - Diário (SQLite/WAL) das etapas de cada mod para retomar execuções."""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = '.cache/job_journal.sqlite3'
+
+# Estados de um mod na execução, na ordem em que avançam
+PENDING = 'pending'          # falhou antes de qualquer etapa
+SCRAPED = 'scraped'          # conteúdo extraído guardado
+CLASSIFIED = 'classified'    # classificação guardada, com o id da gravação no Notion
+WRITTEN = 'written'          # Notion (ou só o registro local) gravado: mod concluído
+
+
+def _page_key(page_id: Optional[str]) -> str:
+    return (page_id or '').replace('-', '').lower()
+
+
+class JobJournal:
+    """
+    Diário de uma execução em lote.
+
+    Cada mod (URL + página do Notion) avança por scraped -> classified ->
+    written, e o diário guarda os artefatos de cada etapa (conteúdo
+    extraído, classificação). Se a execução cair ou parar no meio (quota,
+    limite de gasto, Ctrl+C), rodá-la de novo com o mesmo run_id pula os
+    mods concluídos e retoma os outros da última etapa gravada, sem
+    repetir extração nem chamada ao LLM.
+
+    A classificação recebe um write_id ao ser guardada; o NotionUpdater
+    escreve esse id no bloco do Notes e não anexa de novo um bloco que já
+    está lá. Assim uma queda entre a gravação no Notion e o registro no
+    diário não duplica a classificação na página.
+
+    O SQLite fica em modo WAL com synchronous=NORMAL: cada etapa concluída
+    sobrevive à queda do processo sem um fsync por escrita.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH, run_id: str = 'default'):
+        """
+        Inicializa o diário.
+
+        Args:
+            path: Caminho do arquivo SQLite
+            run_id: Identifica a execução (ex.: o arquivo de entrada do lote)
+        """
+        self.path = path
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                run_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                page_id TEXT NOT NULL,
+                state TEXT NOT NULL,
+                decision TEXT,
+                content TEXT,
+                classification TEXT,
+                write_id TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_id, url, page_id)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, url: str, page_id: Optional[str]) -> Optional[Dict]:
+        """
+        Retorna o andamento do mod nesta execução.
+
+        Args:
+            url: URL do mod
+            page_id: ID da página no Notion (ou None)
+
+        Returns:
+            Dict com state, decision, content, classification, write_id,
+            error e attempts, ou None se o mod ainda não foi visto
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, decision, content, classification, write_id, error, attempts "
+                "FROM jobs WHERE run_id = ? AND url = ? AND page_id = ?",
+                (self.run_id, url, _page_key(page_id))
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'state': row[0],
+            'decision': row[1],
+            'content': json.loads(row[2]) if row[2] else None,
+            'classification': json.loads(row[3]) if row[3] else None,
+            'write_id': row[4],
+            'error': row[5],
+            'attempts': row[6],
+        }
+
+    def is_done(self, url: str, page_id: Optional[str]) -> bool:
+        """True se o mod já foi concluído nesta execução."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM jobs WHERE run_id = ? AND url = ? AND page_id = ?",
+                (self.run_id, url, _page_key(page_id))
+            ).fetchone()
+        return row is not None and row[0] == WRITTEN
+
+    def record_scraped(self, url: str, page_id: Optional[str], mod_content: Dict,
+                       decision: str) -> None:
+        """Guarda o conteúdo extraído e a decisão do fingerprint (new/reclassified)."""
+        self._upsert(url, page_id, SCRAPED, decision=decision,
+                     content=json.dumps(mod_content, ensure_ascii=False))
+
+    def record_classified(self, url: str, page_id: Optional[str], classification: Dict) -> str:
+        """
+        Guarda a classificação e gera o id da gravação no Notion.
+
+        Returns:
+            write_id a passar para o NotionUpdater
+        """
+        write_id = uuid.uuid4().hex[:12]
+        self._upsert(url, page_id, CLASSIFIED, write_id=write_id,
+                     classification=json.dumps(classification, ensure_ascii=False))
+        return write_id
+
+    def record_written(self, url: str, page_id: Optional[str],
+                       classification: Optional[Dict] = None, decision: Optional[str] = None) -> None:
+        """Marca o mod como concluído (o conteúdo extraído deixa de ser guardado)."""
+        fields = {'content': None}
+        if classification is not None:
+            fields['classification'] = json.dumps(classification, ensure_ascii=False)
+        if decision is not None:
+            fields['decision'] = decision
+        self._upsert(url, page_id, WRITTEN, **fields)
+
+    def record_error(self, url: str, page_id: Optional[str], stage: str, error: str) -> None:
+        """Registra a falha sem perder a última etapa concluída (retomada na próxima execução)."""
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE jobs SET error = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE run_id = ? AND url = ? AND page_id = ?",
+                (f'{stage}: {error}', time.time(), self.run_id, url, _page_key(page_id))
+            ).rowcount
+            if not updated:
+                # Falhou antes de qualquer etapa: fica registrado, mas sem estado a retomar
+                self._conn.execute(
+                    "INSERT INTO jobs (run_id, url, page_id, state, error, attempts, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, 1, ?)",
+                    (self.run_id, url, _page_key(page_id), PENDING, f'{stage}: {error}', time.time())
+                )
+            self._conn.commit()
+
+    def _upsert(self, url: str, page_id: Optional[str], state: str, **fields) -> None:
+        columns = ['state', 'error', 'updated_at'] + list(fields)
+        values = [state, None, time.time()] + list(fields.values())
+        assignments = ', '.join(f"{column} = excluded.{column}" for column in columns)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs (run_id, url, page_id, {', '.join(columns)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (run_id, url, page_id) DO UPDATE SET {assignments}",
+                [self.run_id, url, _page_key(page_id)] + values
+            )
+            self._conn.commit()
+
+    def counts(self) -> Dict[str, int]:
+        """Mods desta execução por estado (pending, scraped, classified, written)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY state", (self.run_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def clear(self) -> int:
+        """
+        Descarta o andamento desta execução (a próxima começa do zero).
+
+        Returns:
+            Quantos mods foram descartados
+        """
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM jobs WHERE run_id = ?", (self.run_id,)).rowcount
+            self._conn.commit()
+        return removed
+
+    def close(self) -> None:
+        """Fecha a conexão com o SQLite."""
+        with self._lock:
+            self._conn.close()
+
+
+def get_job_journal(run_id: str, path: Optional[str] = None) -> JobJournal:
+    """
+    Abre o diário de uma execução (caminho em JOB_JOURNAL_PATH).
+
+    Args:
+        run_id: Identifica a execução
+        path: Arquivo SQLite (opcional, usa JOB_JOURNAL_PATH ou o padrão)
+
+    Returns:
+        JobJournal da execução
+    """
+    path = path or os.getenv('JOB_JOURNAL_PATH', DEFAULT_JOURNAL_PATH)
+    return JobJournal(path, run_id)
@@ -0,0 +1,257 @@
+"""LLM Batch Module - Classificação em lote pelas APIs de batch da OpenAI e Anthropic."""
+
+import io
+import json
+import time
+import logging
+from typing import Dict, List, Optional
+
+from classification_cache import ClassificationCache
+from llm_client import anthropic_text, extract_usage
+from prompt_builder import BATCH_DISCOUNT, BudgetExceededError, SpendingCap
+
+logger = logging.getLogger(__name__)
+
+# Provedores com API de lote assíncrona
+BATCH_PROVIDERS = ('openai', 'anthropic')
+
+OPENAI_BATCH_ENDPOINT = '/v1/chat/completions'
+OPENAI_FINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+def _custom_id(index: int) -> str:
+    return f'mod-{index}'
+
+
+def _wait_for(fetch_status, is_done, poll_interval: float, timeout: float):
+    """Consulta o status do job até que termine ou o timeout seja atingido."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = fetch_status()
+        if is_done(job):
+            return job
+        if time.monotonic() >= deadline:
+            raise TimeoutError("Job de lote não terminou dentro do tempo limite")
+        time.sleep(poll_interval)
+
+
+def _cancel(cancel, batch_id: str, provider: str) -> None:
+    """Cancela um job de lote abandonado para que o provedor não o processe (nem cobre)."""
+    try:
+        cancel(batch_id)
+        logger.info("Job de lote %s %s cancelado", provider, batch_id)
+    except Exception as e:
+        logger.warning("Não foi possível cancelar o job de lote %s %s: %s", provider, batch_id, e)
+
+
+def _submit_openai(client, messages: Dict[str, str],
+                   poll_interval: float, timeout: float) -> Dict[str, str]:
+    """
+    Envia um job para a Batch API da OpenAI e retorna as respostas brutas.
+
+    Args:
+        client: LLMClient com provedor openai
+        messages: {custom_id: mensagem do usuário}
+        poll_interval: Intervalo entre consultas (segundos)
+        timeout: Tempo máximo de espera (segundos)
+
+    Returns:
+        {custom_id: texto da resposta} apenas para os itens bem-sucedidos
+    """
+    lines = [
+        json.dumps({
+            'custom_id': custom_id,
+            'method': 'POST',
+            'url': OPENAI_BATCH_ENDPOINT,
+            'body': client.openai_request_body(user_message),
+        }, ensure_ascii=False)
+        for custom_id, user_message in messages.items()
+    ]
+    payload = io.BytesIO(('\n'.join(lines) + '\n').encode('utf-8'))
+
+    input_file = client.client.files.create(file=('batch.jsonl', payload), purpose='batch')
+    batch = client.client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=OPENAI_BATCH_ENDPOINT,
+        completion_window='24h'
+    )
+    logger.info("Job de lote OpenAI enviado: %s (%s mods)", batch.id, len(lines))
+
+    batch_id = batch.id
+    try:
+        batch = _wait_for(
+            lambda: client.client.batches.retrieve(batch_id),
+            lambda job: job.status in OPENAI_FINAL_STATUSES,
+            poll_interval, timeout
+        )
+    except Exception:
+        # Timeout ou falha na consulta: os mods vão para o fallback individual
+        _cancel(client.client.batches.cancel, batch_id, 'OpenAI')
+        raise
+    logger.info("Job de lote OpenAI %s terminou com status: %s", batch.id, batch.status)
+
+    responses = {}
+    if not batch.output_file_id:
+        return responses
+
+    output = client.client.files.content(batch.output_file_id).text
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        response = item.get('response') or {}
+        if item.get('error') or response.get('status_code') != 200:
+            logger.warning("Item %s falhou no lote: %s", item.get('custom_id'), item.get('error'))
+            continue
+        body = response['body']
+        client.record_usage(extract_usage('openai', body.get('usage')), discount=BATCH_DISCOUNT)
+        responses[item['custom_id']] = body['choices'][0]['message']['content']
+    return responses
+
+
+def _anthropic_batches(sdk_client):
+    """Retorna o recurso de batches do SDK da Anthropic (GA ou beta)."""
+    batches = getattr(sdk_client.messages, 'batches', None)
+    if batches is None:
+        batches = sdk_client.beta.messages.batches
+    return batches
+
+
+def _submit_anthropic(client, messages: Dict[str, str],
+                      poll_interval: float, timeout: float) -> Dict[str, str]:
+    """
+    Envia um job para a Message Batches API da Anthropic e retorna as respostas brutas.
+
+    Args:
+        client: LLMClient com provedor anthropic
+        messages: {custom_id: mensagem do usuário}
+        poll_interval: Intervalo entre consultas (segundos)
+        timeout: Tempo máximo de espera (segundos)
+
+    Returns:
+        {custom_id: texto da resposta} apenas para os itens bem-sucedidos
+    """
+    batches = _anthropic_batches(client.client)
+    batch = batches.create(requests=[
+        {'custom_id': custom_id, 'params': client.anthropic_request_params(user_message)}
+        for custom_id, user_message in messages.items()
+    ])
+    logger.info("Job de lote Anthropic enviado: %s (%s mods)", batch.id, len(messages))
+
+    try:
+        _wait_for(
+            lambda: batches.retrieve(batch.id),
+            lambda job: job.processing_status == 'ended',
+            poll_interval, timeout
+        )
+    except Exception:
+        # Timeout ou falha na consulta: os mods vão para o fallback individual
+        _cancel(batches.cancel, batch.id, 'Anthropic')
+        raise
+    logger.info("Job de lote Anthropic %s terminou", batch.id)
+
+    responses = {}
+    for entry in batches.results(batch.id):
+        if entry.result.type != 'succeeded':
+            logger.warning("Item %s falhou no lote: %s", entry.custom_id, entry.result.type)
+            continue
+        client.record_usage(
+            extract_usage('anthropic', entry.result.message.usage), discount=BATCH_DISCOUNT
+        )
+        responses[entry.custom_id] = anthropic_text(entry.result.message)
+    return responses
+
+
+def classify_many(client, mod_contents: List[Dict[str, str]],
+                  poll_interval: float = 30.0,
+                  timeout: float = 24 * 3600,
+                  use_cache: bool = True,
+                  spend_cap: Optional[SpendingCap] = None) -> List[Optional[Dict]]:
+    """
+    Classifica vários mods com um único job de lote do provedor.
+
+    Mods já presentes no cache não são enviados. Itens que falham no lote
+    (erro do provedor ou JSON inválido) são reclassificados um a um com
+    classify_mod(); provedores sem API de lote usam sempre esse caminho. Se
+    o job não termina a tempo ou a consulta falha, ele é cancelado antes do
+    fallback, e a reserva no spend_cap dos itens que o lote não respondeu é
+    devolvida (o fallback reserva o custo da chamada individual).
+
+    Args:
+        client: Instância de LLMClient
+        mod_contents: Lista de conteúdos de mods
+        poll_interval: Intervalo entre consultas ao status do job (segundos)
+        timeout: Tempo máximo de espera pelo job (segundos)
+        use_cache: Se False, ignora o cache de classificações
+        spend_cap: Limite de gasto; mods que o ultrapassariam não são enviados
+
+    Returns:
+        Lista de classificações na mesma ordem da entrada (None se falhou)
+    """
+    results: List[Optional[Dict]] = [None] * len(mod_contents)
+    cache = client.cache if use_cache else None
+    cache_keys = {}
+    pending = {}
+
+    for index, mod_content in enumerate(mod_contents):
+        if cache is not None:
+            key = ClassificationCache.make_key(mod_content, client.classifier_prompt, client.model)
+            cached = cache.get(key)
+            if cached is not None:
+                results[index] = cached
+                continue
+            cache_keys[index] = key
+        pending[_custom_id(index)] = index
+
+    charged: Dict[int, float] = {}
+    if pending and client.provider in BATCH_PROVIDERS:
+        messages = {}
+        for custom_id, index in list(pending.items()):
+            user_message = client.build_user_message(mod_contents[index])
+            try:
+                charged[index] = client.charge_prediction(user_message, spend_cap, batch=True)['usd']
+            except BudgetExceededError as e:
+                logger.warning("%s fora do lote: %s", custom_id, e)
+                del pending[custom_id]
+                continue
+            messages[custom_id] = user_message
+        submit = _submit_openai if client.provider == 'openai' else _submit_anthropic
+        responses = {}
+        if messages:
+            try:
+                responses = submit(client, messages, poll_interval, timeout)
+            except Exception as e:
+                logger.error("Erro no job de lote (%s): %s", client.provider, e)
+
+        for custom_id, response in responses.items():
+            index = pending.get(custom_id)
+            if index is None:
+                continue
+            # Respondido (e cobrado) pelo lote: a reserva fica
+            charged.pop(index, None)
+            try:
+                # Resposta inválida: chamada de reparo curta antes de reclassificar
+                results[index] = client.parse_or_repair(response)
+            except Exception as e:
+                logger.warning("Resposta inválida para %s: %s", custom_id, e)
+                continue
+            if index in cache_keys:
+                cache.set(cache_keys[index], client.model, results[index])
+    elif pending:
+        logger.info("Provedor %s sem API de lote, classificando um a um", client.provider)
+
+    # Fallback: classificação individual do que não veio do lote
+    failed = [index for index in pending.values() if results[index] is None]
+    if failed and client.provider in BATCH_PROVIDERS:
+        logger.info("Reclassificando individualmente %s mods que falharam no lote", len(failed))
+    for index in failed:
+        if spend_cap is not None and index in charged:
+            spend_cap.refund(charged[index])
+        try:
+            results[index] = client.classify_mod(
+                mod_contents[index], use_cache=use_cache, spend_cap=spend_cap
+            )
+        except Exception as e:
+            logger.error("Falha ao classificar mod %s: %s", index, e)
+
+    return results
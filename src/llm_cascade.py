@@ -0,0 +1,182 @@
+"""LLM Cascade Module - Modelo barato primeiro, escalando os casos incertos."""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from llm_client import get_llm_client
+from prompt_builder import BudgetExceededError, SpendingCap
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_CONFIDENCE = 0.7
+
+# Nas fronteiras 2/3 e 4/5 um erro muda a ordem de checagem nos patches,
+# então a confiança exigida para não escalar é maior
+DEFAULT_BOUNDARY_CONFIDENCE = 0.85
+
+# Pares de prioridades vizinhas e os scores colados no corte entre elas
+# (score 5 -> Priority 2, score 4 -> Priority 3; a 4/5 não é decidida por score)
+BOUNDARIES = {(2, 3): (4, 5), (4, 5): ()}
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ModelCascade:
+    """
+    Cascata de modelos: o mais barato classifica primeiro.
+
+    O primeiro nível responde também com uma confiança (0-1). O mod sobe
+    para o próximo nível quando a confiança é baixa, quando a prioridade
+    cai numa fronteira sensível (2/3 ou 4/5) sem confiança alta, ou
+    quando o score fica colado no corte 2/3. O último nível sempre decide.
+    Latência, custo e taxa de escalonamento são registrados por nível.
+    """
+
+    def __init__(self, models: List[str],
+                 min_confidence: Optional[float] = None,
+                 boundary_confidence: Optional[float] = None):
+        """
+        Args:
+            models: Modelos do mais barato ao mais forte (ex.: ["gpt-4o-mini", "gpt-4o"])
+            min_confidence: Confiança mínima para aceitar a resposta de um nível
+                (padrão: LLM_CASCADE_MIN_CONFIDENCE ou 0.7)
+            boundary_confidence: Confiança mínima nas fronteiras 2/3 e 4/5
+                (padrão: LLM_CASCADE_BOUNDARY_CONFIDENCE ou 0.85)
+        """
+        if not models:
+            raise ValueError("A cascata precisa de pelo menos um modelo")
+        self.models = models
+        if min_confidence is None:
+            min_confidence = float(os.getenv('LLM_CASCADE_MIN_CONFIDENCE', DEFAULT_MIN_CONFIDENCE))
+        if boundary_confidence is None:
+            boundary_confidence = float(
+                os.getenv('LLM_CASCADE_BOUNDARY_CONFIDENCE', DEFAULT_BOUNDARY_CONFIDENCE)
+            )
+        self.min_confidence = min_confidence
+        self.boundary_confidence = boundary_confidence
+        self._lock = threading.Lock()
+        self._tiers = [
+            {'model': model, 'calls': 0, 'errors': 0, 'escalated': 0, 'latencies': []}
+            for model in models
+        ]
+
+    def escalation_reason(self, classification: Dict) -> Optional[str]:
+        """
+        Decide se a classificação de um nível intermediário precisa subir.
+
+        Args:
+            classification: Classificação com o campo "confidence"
+
+        Returns:
+            Motivo do escalonamento, ou None se a resposta pode ser aceita
+        """
+        confidence = classification.get('confidence')
+        if confidence is None:
+            return "sem confiança na resposta"
+        if confidence < self.min_confidence:
+            return f"confiança {confidence:.2f}"
+        priority = classification['priority']
+        for pair, edge_scores in BOUNDARIES.items():
+            if priority not in pair:
+                continue
+            if classification.get('score') in edge_scores:
+                return f"score {classification['score']} no corte {pair[0]}/{pair[1]}"
+            if confidence < self.boundary_confidence:
+                return f"fronteira {pair[0]}/{pair[1]} com confiança {confidence:.2f}"
+        return None
+
+    def classify(self, mod_content: Dict, use_cache: bool = True, refresh_cache: bool = False,
+                 spend_cap: Optional[SpendingCap] = None) -> Dict:
+        """
+        Classifica o mod subindo na cascata até uma resposta confiável.
+
+        Args:
+            mod_content: Conteúdo extraído do mod
+            use_cache: Se False, ignora o cache de classificações
+            refresh_cache: Se True, reclassifica e sobrescreve o cache
+            spend_cap: Limite de gasto do lote (opcional)
+
+        Returns:
+            Classificação do nível que decidiu, com a chave 'model'
+        """
+        last = len(self.models) - 1
+        for level, model in enumerate(self.models):
+            tier = self._tiers[level]
+            started = time.perf_counter()
+            try:
+                classification = get_llm_client(model=model).classify_mod(
+                    mod_content, use_cache=use_cache, refresh_cache=refresh_cache,
+                    spend_cap=spend_cap, ask_confidence=level < last
+                )
+            except BudgetExceededError:
+                raise
+            except Exception as e:
+                self._record(tier, started, error=True)
+                if level == last:
+                    raise
+                logger.warning("Cascata: %s falhou (%s); escalando", model, e)
+                self._record(tier, None, escalated=True)
+                continue
+            self._record(tier, started)
+
+            reason = self.escalation_reason(classification) if level < last else None
+            if reason is None:
+                return dict(classification, model=model)
+            logger.info("Cascata: %s -> %s (%s)", model, self.models[level + 1], reason)
+            self._record(tier, None, escalated=True)
+
+    def _record(self, tier: Dict, started: Optional[float],
+                error: bool = False, escalated: bool = False) -> None:
+        with self._lock:
+            if started is not None:
+                tier['calls'] += 1
+                tier['latencies'].append(time.perf_counter() - started)
+            if error:
+                tier['errors'] += 1
+            if escalated:
+                tier['escalated'] += 1
+
+    def stats(self) -> List[Dict]:
+        """
+        Retorna as métricas de cada nível.
+
+        Returns:
+            Lista (na ordem da cascata) de dicts com model, calls, errors,
+            escalated, escalation_rate, latência p50/p95 em segundos e usd
+            (custo pelos tokens informados pelo provedor)
+        """
+        stats = []
+        with self._lock:
+            tiers = [dict(tier, latencies=list(tier['latencies'])) for tier in self._tiers]
+        for tier in tiers:
+            latencies = tier.pop('latencies')
+            tier['escalation_rate'] = tier['escalated'] / tier['calls'] if tier['calls'] else 0.0
+            tier['p50'] = _percentile(latencies, 50)
+            tier['p95'] = _percentile(latencies, 95)
+            tier['usd'] = get_llm_client(model=tier['model']).usage_stats()['usd']
+            stats.append(tier)
+        return stats
+
+
+def cascade_from_env(value: Optional[str] = None) -> Optional[ModelCascade]:
+    """
+    Cria a cascata a partir de uma lista de modelos separados por vírgula.
+
+    Args:
+        value: Ex.: "gpt-4o-mini,gpt-4o" (padrão: LLM_CASCADE)
+
+    Returns:
+        ModelCascade, ou None se a lista estiver vazia
+    """
+    value = value if value is not None else os.getenv('LLM_CASCADE', '')
+    models = [model.strip() for model in value.split(',') if model.strip()]
+    return ModelCascade(models) if models else None
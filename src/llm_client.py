@@ -1,88 +1,288 @@
 """LLM Client Module - Integração com vários provedores de LLM."""
 
 import os
+import time
 import logging
 import json
-from typing import Dict, Optional
+import hashlib
+import threading
+import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
 from pathlib import Path
 
+from tenacity import Retrying
+
+from client_registry import import_lock, registry
+from classification_schema import (
+    CLASSIFICATION_OUTPUT, REPAIR_PROMPT, ClassificationError, StreamingClassificationParser,
+    consistency_errors, gemini_schema, repair_message, validate_classification as validate_schema,
+)
+from classification_cache import ClassificationCache, get_default_cache
+from llm_hedging import Hedger, check_cancelled
+from metrics import annotate, get_metrics, span
+from prompt_builder import (
+    BATCH_DISCOUNT, CONFIDENCE_INSTRUCTION, EXPECTED_OUTPUT_TOKENS, PromptBuilder, SpendingCap,
+    get_token_counter, model_prices, usage_cost,
+)
+from rate_limit import get_provider_limiter, retry_policy
+
 logger = logging.getLogger(__name__)
 
+PROMPT_FILENAME = 'classificador-mods-ts4-prompt.md'
+
+# Validade do cache de contexto do Gemini (o prompt do sistema fica armazenado no provedor)
+GEMINI_CACHE_TTL_SECONDS = 3600
+
+
+def _field(obj, name: str, default=0):
+    """Lê um campo de objeto do SDK ou de dict (respostas da API de lote)."""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        value = obj.get(name, default)
+    else:
+        value = getattr(obj, name, default)
+    return default if value is None else value
+
+
+def extract_usage(provider: str, usage) -> Dict[str, int]:
+    """
+    Normaliza o uso de tokens informado por cada provedor.
+    
+    Args:
+        provider: 'openai', 'anthropic' ou 'google'
+        usage: Objeto/dict de uso da resposta (usage ou usage_metadata)
+        
+    Returns:
+        Dict com input_tokens (total), cached_tokens (lidos do cache de
+        prompt), cache_write_tokens (gravados no cache) e output_tokens
+    """
+    if provider == 'openai':
+        details = _field(usage, 'prompt_tokens_details', None)
+        return {
+            'input_tokens': _field(usage, 'prompt_tokens'),
+            'cached_tokens': _field(details, 'cached_tokens'),
+            'cache_write_tokens': 0,
+            'output_tokens': _field(usage, 'completion_tokens'),
+        }
+    if provider == 'anthropic':
+        # input_tokens da Anthropic não inclui o que foi lido/gravado no cache
+        cached = _field(usage, 'cache_read_input_tokens')
+        written = _field(usage, 'cache_creation_input_tokens')
+        return {
+            'input_tokens': _field(usage, 'input_tokens') + cached + written,
+            'cached_tokens': cached,
+            'cache_write_tokens': written,
+            'output_tokens': _field(usage, 'output_tokens'),
+        }
+    return {
+        'input_tokens': _field(usage, 'prompt_token_count'),
+        'cached_tokens': _field(usage, 'cached_content_token_count'),
+        'cache_write_tokens': 0,
+        'output_tokens': _field(usage, 'candidates_token_count'),
+    }
+
+
+def anthropic_text(message) -> str:
+    """
+    Extrai o texto de uma resposta da Anthropic.
+    
+    Com saída estruturada a classificação vem como entrada da ferramenta
+    (bloco tool_use), devolvida aqui serializada em JSON.
+    """
+    for block in message.content:
+        if getattr(block, 'type', '') == 'tool_use':
+            return json.dumps(block.input, ensure_ascii=False)
+    return ''.join(getattr(block, 'text', '') for block in message.content)
+
+
+def provider_api_key(provider: str) -> Optional[str]:
+    """
+    API key de um provedor: LLM_API_KEY_<PROVEDOR> (ex.: LLM_API_KEY_ANTHROPIC) ou LLM_API_KEY.
+    
+    Permite misturar provedores (cascata de modelos, fan-out) na mesma execução.
+    """
+    return os.getenv(f'LLM_API_KEY_{provider.upper()}') or os.getenv('LLM_API_KEY')
+
+
+def detect_provider(model: str) -> str:
+    """
+    Detecta o provedor baseado no nome do modelo.
+    
+    Args:
+        model: Nome do modelo (ex.: gpt-4o, claude-3-opus, gemini-pro)
+        
+    Returns:
+        'openai', 'anthropic' ou 'google'
+    """
+    model_lower = model.lower()
+    
+    if any(x in model_lower for x in ['gpt', 'openai']):
+        return 'openai'
+    elif any(x in model_lower for x in ['claude', 'anthropic']):
+        return 'anthropic'
+    elif any(x in model_lower for x in ['gemini', 'google']):
+        return 'google'
+    else:
+        logger.warning("Provedor desconhecido para modelo %s, usando OpenAI", model)
+        return 'openai'
+
+
+@lru_cache(maxsize=None)
+def load_classifier_prompt() -> Optional[str]:
+    """
+    Carrega o prompt do classificador uma única vez por processo.
+    
+    Returns:
+        Conteúdo do prompt ou None se o arquivo não for encontrado
+    """
+    prompt_paths = [
+        Path(__file__).resolve().parent.parent / 'prompts' / PROMPT_FILENAME,
+        Path('prompts') / PROMPT_FILENAME,
+        Path('../prompts') / PROMPT_FILENAME,
+        Path('../../prompts') / PROMPT_FILENAME
+    ]
+    
+    for path in prompt_paths:
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+    
+    return None
+
 
 class LLMClient:
     """Cliente unificado para múltiplos provedores de LLM."""
     
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None,
+                 cache: Optional[ClassificationCache] = None,
+                 base_url: Optional[str] = None):
         """
         Inicializa o cliente LLM.
         
         Args:
-            api_key: API key do provedor (opcional, usa env var)
+            api_key: API key do provedor (opcional, usa LLM_API_KEY_<PROVEDOR> ou LLM_API_KEY)
             model: Nome do modelo (opcional, usa env var)
+            cache: Cache de classificações (opcional; None desabilita)
+            base_url: URL base da API (opcional, usa LLM_BASE_URL; útil para servidores locais)
         """
-        self.api_key = api_key or os.getenv('LLM_API_KEY')
         self.model = model or os.getenv('LLM_MODEL', 'gpt-4o')
+        self.api_key = api_key or provider_api_key(detect_provider(self.model))
+        self.base_url = base_url or os.getenv('LLM_BASE_URL') or None
+        self.max_output_tokens = 2048
+        self.cache = cache
+        # Cache de prefixo do prompt no provedor (LLM_PROMPT_CACHE=0 desativa)
+        self.prompt_cache = os.getenv('LLM_PROMPT_CACHE', '1').lower() not in ('0', 'false', 'no')
+        # Saída estruturada com o esquema da classificação (LLM_STRUCTURED_OUTPUT=0 desativa)
+        self.structured_output = (
+            os.getenv('LLM_STRUCTURED_OUTPUT', '1').lower() not in ('0', 'false', 'no')
+        )
+        # Respostas em streaming, validadas campo a campo enquanto chegam
+        self.stream = os.getenv('LLM_STREAM', '0').lower() in ('1', 'true', 'yes')
+        # Modelo de outro provedor para hedge quando o primário demora (LLM_HEDGE_MODEL)
+        self.hedge_model = os.getenv('LLM_HEDGE_MODEL') or None
+        self._hedger = None
+        self._hedger_lock = threading.Lock()
+        self._usage = {'calls': 0, 'input_tokens': 0, 'cached_tokens': 0,
+                       'cache_write_tokens': 0, 'output_tokens': 0, 'repairs': 0, 'usd': 0.0}
+        self._usage_lock = threading.Lock()
+        # Tokens da última chamada ao provedor em cada thread (ver call_within_quota)
+        self._call_usage = threading.local()
+        self._google_model = None
+        self._google_cache = None
+        self._google_model_expires = 0.0
+        self._google_lock = threading.Lock()
         
         if not self.api_key:
             raise ValueError("API key não fornecida")
         
         # Detecta provedor pelo modelo
         self.provider = self._detect_provider()
-        self.client = self._init_client()
+        # O SDK do provedor é importado e instanciado na primeira chamada (ver client)
+        self._client = None
+        self._client_lock = threading.Lock()
         
         # Carrega prompt do classificador
         self.classifier_prompt = self._load_classifier_prompt()
+        self.prompt_version = hashlib.sha256(self.classifier_prompt.encode('utf-8')).hexdigest()[:12]
+        
+        # Limites de requisições/tokens por minuto compartilhados por provedor
+        self.rate_limiter = get_provider_limiter(self.provider)
+        
+        # Contagem local de tokens e orçamento da mensagem do usuário
+        self.token_counter = get_token_counter(self.provider, self.model)
+        self.prompt_builder = PromptBuilder(self.token_counter)
+        self.system_tokens = self.token_counter.count(self.classifier_prompt)
     
     def _detect_provider(self) -> str:
         """Detecta o provedor baseado no nome do modelo."""
-        model_lower = self.model.lower()
-        
-        if any(x in model_lower for x in ['gpt', 'openai']):
-            return 'openai'
-        elif any(x in model_lower for x in ['claude', 'anthropic']):
-            return 'anthropic'
-        elif any(x in model_lower for x in ['gemini', 'google']):
-            return 'google'
-        else:
-            logger.warning(f"Provedor desconhecido para modelo {self.model}, usando OpenAI")
-            return 'openai'
+        return detect_provider(self.model)
+    
+    @property
+    def client(self):
+        """Cliente do SDK do provedor, criado (e importado) no primeiro uso."""
+        return self.ensure_client()
+    
+    def ensure_client(self):
+        """
+        Importa o SDK do provedor e cria o cliente, se ainda não existir.
+        
+        Chamado pelo warm-up do pipeline na thread principal, para que as
+        threads de trabalho não importem o SDK ao mesmo tempo.
+        
+        Returns:
+            Cliente do SDK do provedor
+        """
+        if self._client is None:
+            with self._client_lock, import_lock:
+                if self._client is None:
+                    self._client = self._init_client()
+        return self._client
     
     def _init_client(self):
         """Inicializa o cliente do provedor específico."""
         try:
             if self.provider == 'openai':
                 from openai import OpenAI
-                return OpenAI(api_key=self.api_key)
+                # Retries ficam a cargo de retry_policy() (Retry-After + backoff)
+                return OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
             elif self.provider == 'anthropic':
                 from anthropic import Anthropic
-                return Anthropic(api_key=self.api_key)
+                return Anthropic(api_key=self.api_key, base_url=self.base_url, max_retries=0)
             elif self.provider == 'google':
                 import google.generativeai as genai
-                genai.configure(api_key=self.api_key)
+                if self.base_url:
+                    # Servidor compatível só com a API REST (ex.: o falso dos benchmarks)
+                    genai.configure(api_key=self.api_key, transport='rest',
+                                    client_options={'api_endpoint': self.base_url})
+                else:
+                    genai.configure(api_key=self.api_key)
                 return genai
             else:
                 raise ValueError(f"Provedor {self.provider} não suportado")
         except ImportError as e:
-            logger.error(f"Biblioteca do provedor não instalada: {e}")
+            logger.error("Biblioteca do provedor não instalada: %s", e)
             raise
     
     def _load_classifier_prompt(self) -> str:
-        """Carrega o prompt do classificador de mods."""
-        # Tenta encontrar o arquivo do prompt
-        prompt_paths = [
-            Path('prompts/classificador-mods-ts4-prompt.md'),
-            Path('../prompts/classificador-mods-ts4-prompt.md'),
-            Path('../../prompts/classificador-mods-ts4-prompt.md')
-        ]
-        
-        for path in prompt_paths:
-            if path.exists():
-                with open(path, 'r', encoding='utf-8') as f:
-                    return f.read()
+        """Carrega o prompt do classificador de mods (lido do disco uma vez por processo)."""
+        prompt = load_classifier_prompt()
+        if prompt is not None:
+            return prompt
         
         logger.warning("Arquivo de prompt não encontrado, usando prompt padrão")
         return self._get_default_prompt()
     
+    def close(self):
+        """Fecha o cliente HTTP do provedor (se suportado pelo SDK)."""
+        self._delete_google_cache()
+        if self._hedger is not None:
+            self._hedger.close()
+        close = getattr(self._client, 'close', None)
+        if callable(close):
+            close()
+    
     def _get_default_prompt(self) -> str:
         """Retorna um prompt padrão simplificado."""
         return """
@@ -106,125 +306,670 @@ Retorne APENAS um JSON válido com:
 }
 """
     
-    def classify_mod(self, mod_content: Dict[str, str]) -> Dict:
+    def build_user_message(self, mod_content: Dict[str, str]) -> str:
+        """
+        Monta a mensagem do usuário com o conteúdo do mod.
+        
+        O tamanho é limitado em tokens (LLM_INPUT_TOKENS) pelo PromptBuilder:
+        título, descrição e requisitos/conflitos têm prioridade sobre o
+        restante do texto, e boilerplate é removido antes de cortar.
+        
+        Args:
+            mod_content: Dicionário com title, description, full_text
+            
+        Returns:
+            Texto da mensagem enviada ao LLM
+        """
+        plan = self.prompt_builder.build(mod_content)
+        if plan['truncated'] or plan['dropped']:
+            logger.debug(
+                "Mensagem limitada a %s tokens (cortadas: %s; %s frases de boilerplate removidas)",
+                plan['tokens'], ', '.join(plan['truncated']) or 'nenhuma', plan['dropped']
+            )
+        return plan['message']
+    
+    def predict_cost(self, user_message: str, batch: bool = False, outputs: int = 1) -> Dict:
+        """
+        Prevê os tokens e o custo de uma classificação.
+        
+        Args:
+            user_message: Mensagem do usuário
+            batch: Se True, aplica o desconto da API de lote
+            outputs: Classificações esperadas na resposta (mods empacotados)
+            
+        Returns:
+            Dict com input_tokens, output_tokens e usd
+        """
+        input_tokens = self.system_tokens + self.token_counter.count(user_message)
+        output_tokens = EXPECTED_OUTPUT_TOKENS * outputs
+        price_in, price_out = model_prices(self.model)
+        usd = (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+        if batch:
+            usd *= BATCH_DISCOUNT
+        return {'input_tokens': input_tokens, 'output_tokens': output_tokens, 'usd': usd}
+    
+    def charge_prediction(self, user_message: str, spend_cap: Optional[SpendingCap] = None,
+                          batch: bool = False, outputs: int = 1) -> Dict:
+        """
+        Registra no log o custo previsto e o reserva no limite de gasto.
+        
+        Args:
+            user_message: Mensagem do usuário
+            spend_cap: Limite de gasto do lote (opcional)
+            batch: Se True, aplica o desconto da API de lote
+            outputs: Classificações esperadas na resposta (mods empacotados)
+            
+        Returns:
+            Custo previsto (ver predict_cost)
+            
+        Raises:
+            BudgetExceededError: Se o limite de gasto seria ultrapassado
+        """
+        cost = self.predict_cost(user_message, batch=batch, outputs=outputs)
+        logger.debug(
+            "Custo previsto: %s tokens de entrada + ~%s de saída (US$ %.5f)",
+            cost['input_tokens'], cost['output_tokens'], cost['usd']
+        )
+        if spend_cap is not None:
+            spend_cap.charge(cost['usd'])
+        return cost
+    
+    def classify_mod(self, mod_content: Dict[str, str],
+                     use_cache: bool = True, refresh_cache: bool = False,
+                     spend_cap: Optional[SpendingCap] = None,
+                     ask_confidence: bool = False) -> Dict:
         """
         Classifica um mod usando LLM.
         
+        Se houver cache configurado, uma classificação já feita para o mesmo
+        conteúdo, prompt e modelo é retornada sem chamar o provedor (ver
+        cache_key).
+        
         Args:
             mod_content: Dicionário com title, description, full_text
+            use_cache: Se False, ignora o cache (não lê nem grava)
+            refresh_cache: Se True, chama o LLM e sobrescreve a entrada do cache
+            spend_cap: Limite de gasto do lote (opcional)
+            ask_confidence: Se True, pede também o campo "confidence" (0-1)
             
         Returns:
             Classificação estruturada
+            
+        Raises:
+            BudgetExceededError: Se o custo previsto ultrapassar spend_cap
         """
         try:
+            cache_key = self.cache_key(mod_content, ask_confidence) if use_cache else None
+            if cache_key is not None and not refresh_cache:
+                cached = self.cached_classification(cache_key)
+                if cached is not None:
+                    return cached
+            
             # Monta o prompt completo
-            user_message = f"""
-Título: {mod_content.get('title', 'N/A')}
-
-Descrição: {mod_content.get('description', 'N/A')}
-
-Conteúdo:
-{mod_content.get('full_text', '')[:8000]}  # Limita tamanho
+            user_message = self.classification_message(mod_content, ask_confidence)
+            
+            logger.debug("Classificando mod com %s: %s", self.provider, self.model)
+            self.charge_prediction(user_message, spend_cap)
 
-Classifique este mod seguindo as instruções.
-"""
+            hedger = self.hedger()
+            if hedger is not None:
+                result = hedger.classify(user_message, spend_cap)
+            else:
+                result = self.request_classification(user_message)
+            logger.debug("Classificação concluída: Priority %s", result['priority'])
+            
+            if cache_key is not None:
+                self.cache.set(cache_key, self.model, result)
+            return result
+            
+        except Exception as e:
+            logger.error("Erro ao classificar mod: %s", e)
+            raise
+    
+    def cache_key(self, mod_content: Dict[str, str], ask_confidence: bool = False) -> Optional[str]:
+        """
+        Chave do mod no cache de classificações (None sem cache).
+        
+        Com ask_confidence a instrução de confiança entra na chave: uma
+        classificação sem o campo "confidence" não serve à cascata.
+        """
+        if self.cache is None:
+            return None
+        prompt = self.classifier_prompt
+        if ask_confidence:
+            prompt += CONFIDENCE_INSTRUCTION
+        return ClassificationCache.make_key(mod_content, prompt, self.model)
+    
+    def cached_classification(self, cache_key: str) -> Optional[Dict]:
+        """Busca a classificação no cache, registrando hit/miss nas métricas."""
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            get_metrics().increment('llm_cache_total', result='miss', model=self.model)
+            return None
+        logger.debug("Classificação obtida do cache: Priority %s", cached['priority'])
+        annotate(llm_cache='hit')
+        get_metrics().increment('llm_cache_total', result='hit', model=self.model)
+        return cached
+    
+    def classification_message(self, mod_content: Dict[str, str],
+                               ask_confidence: bool = False) -> str:
+        """Mensagem do usuário da classificação (com o pedido de confiança, se for o caso)."""
+        user_message = self.build_user_message(mod_content)
+        if ask_confidence:
+            user_message += CONFIDENCE_INSTRUCTION
+        return user_message
+    
+    def request_classification(self, user_message: str) -> Dict:
+        """
+        Envia a mensagem ao provedor e valida a resposta (sem cache nem hedge).
+        
+        Args:
+            user_message: Mensagem do usuário já montada
+            
+        Returns:
+            Classificação validada
+        """
+        # Chama o provedor respeitando o rate limit, com retry em 429/5xx
+        for attempt in Retrying(**retry_policy()):
+            with attempt:
+                response = self.call_within_quota(
+                    user_message, self.estimate_request_tokens(user_message)
+                )
+        retries = attempt.retry_state.attempt_number - 1
+        if retries:
+            annotate(retries=retries)
+            get_metrics().increment('llm_retries_total', retries, provider=self.provider)
+        
+        # Parse JSON response (resposta inválida -> chamada de reparo)
+        return self.parse_or_repair(response)
+    
+    def hedger(self) -> Optional[Hedger]:
+        """Hedger do cliente, ou None se LLM_HEDGE_MODEL não estiver configurado."""
+        if not self.hedge_model or self.hedge_model == self.model:
+            return None
+        with self._hedger_lock:
+            if self._hedger is None:
+                self._hedger = Hedger(self, self.hedge_model)
+            return self._hedger
+    
+    def hedge_stats(self) -> Optional[Dict]:
+        """Contadores do hedge (None se o hedge estiver desativado)."""
+        hedger = self.hedger()
+        return hedger.stats() if hedger is not None else None
+    
+    def classify_many(self, mod_contents: List[Dict[str, str]],
+                      poll_interval: float = 30.0,
+                      timeout: float = 24 * 3600,
+                      use_cache: bool = True,
+                      spend_cap: Optional[SpendingCap] = None) -> List[Optional[Dict]]:
+        """
+        Classifica vários mods de uma vez pela API de lote do provedor.
+        
+        OpenAI e Anthropic recebem um único job de lote (mais barato e com
+        maior vazão); provedores sem API de lote são classificados um a um.
+        
+        Args:
+            mod_contents: Lista de conteúdos de mods
+            poll_interval: Intervalo entre consultas ao status do job (segundos)
+            timeout: Tempo máximo de espera pelo job (segundos)
+            use_cache: Se False, ignora o cache de classificações
+            spend_cap: Limite de gasto do lote (opcional)
             
-            logger.info(f"Classificando mod com {self.provider}: {self.model}")
+        Returns:
+            Lista de classificações na mesma ordem da entrada (None se falhou)
+        """
+        from llm_batch import classify_many
+        return classify_many(
+            self, mod_contents,
+            poll_interval=poll_interval, timeout=timeout, use_cache=use_cache,
+            spend_cap=spend_cap
+        )
+    
+    def classify_packed(self, mod_contents: List[Dict[str, str]],
+                        pack_size: int = 8,
+                        workers: int = 1,
+                        use_cache: bool = True,
+                        spend_cap: Optional[SpendingCap] = None) -> List[Optional[Dict]]:
+        """
+        Classifica mods curtos em grupos, vários por requisição.
+        
+        Reduz o número de requisições e os tokens repetidos do prompt do
+        sistema em bibliotecas com muitos mods pequenos (CAS, Build). Mods
+        longos e itens que falham no pacote são classificados um a um.
+        
+        Args:
+            mod_contents: Lista de conteúdos de mods
+            pack_size: Máximo de mods por requisição
+            workers: Requisições simultâneas
+            use_cache: Se False, ignora o cache de classificações
+            spend_cap: Limite de gasto do lote (opcional)
             
-            # Chama o provedor específico
+        Returns:
+            Lista de classificações na mesma ordem da entrada (None se falhou)
+        """
+        from llm_packing import classify_packed
+        return classify_packed(
+            self, mod_contents, pack_size=pack_size, workers=workers,
+            use_cache=use_cache, spend_cap=spend_cap
+        )
+    
+    def _call_provider(self, user_message: str, max_tokens: Optional[int] = None,
+                       output: Dict = CLASSIFICATION_OUTPUT, system: Optional[str] = None) -> str:
+        """
+        Chama o provedor específico e retorna o texto da resposta.
+        
+        Args:
+            user_message: Mensagem do usuário
+            max_tokens: Teto de tokens de saída (padrão: max_output_tokens)
+            output: Esquema de saída estruturada ({name, schema})
+            system: Prompt do sistema alternativo (padrão: prompt do classificador)
+        """
+        with span('llm', provider=self.provider, model=self.model):
             if self.provider == 'openai':
-                response = self._call_openai(user_message)
+                return self._call_openai(user_message, output=output, system=system)
             elif self.provider == 'anthropic':
-                response = self._call_anthropic(user_message)
+                return self._call_anthropic(user_message, max_tokens=max_tokens, output=output, system=system)
             elif self.provider == 'google':
-                response = self._call_google(user_message)
-            else:
-                raise ValueError(f"Provedor {self.provider} não implementado")
+                return self._call_google(user_message, output=output, system=system)
+            raise ValueError(f"Provedor {self.provider} não implementado")
+    
+    def call_within_quota(self, user_message: str, reserved: int, **kwargs) -> str:
+        """
+        Chama o provedor depois de obter cota no rate limiter.
+        
+        A reserva de tokens/min conta o máximo de saída (max_output_tokens);
+        quando o provedor informa o uso real, a diferença volta ao bucket
+        para que a cota não fique subutilizada. Chamadas que falham mantêm
+        a reserva.
+        
+        Args:
+            user_message: Mensagem do usuário
+            reserved: Tokens a reservar (ver estimate_request_tokens)
+            **kwargs: Repassados a _call_provider (max_tokens, output, system)
             
-            # Parse JSON response
-            result = self._parse_response(response)
-            logger.info(f"Classificação concluída: Priority {result['priority']}")
-            return result
+        Returns:
+            Texto da resposta
+        """
+        with span('rate_limit'):
+            self.rate_limiter.acquire(reserved)
+        self._call_usage.tokens = None
+        response = self._call_provider(user_message, **kwargs)
+        used = self._call_usage.tokens
+        if used is not None and used < reserved:
+            self.rate_limiter.refund_tokens(reserved - used)
+        return response
+    
+    def estimate_request_tokens(self, user_message: str) -> int:
+        """
+        Estima os tokens consumidos por uma requisição (para o limite de tokens/min).
+        
+        Args:
+            user_message: Mensagem do usuário
             
-        except Exception as e:
-            logger.error(f"Erro ao classificar mod: {str(e)}")
-            raise
+        Returns:
+            Estimativa de tokens de entrada + máximo de saída
+        """
+        return self.system_tokens + self.token_counter.count(user_message) + self.max_output_tokens
     
-    def _call_openai(self, user_message: str) -> str:
-        """Chama API da OpenAI."""
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": self.classifier_prompt},
+    def openai_request_body(self, user_message: str, output: Dict = CLASSIFICATION_OUTPUT,
+                            system: Optional[str] = None) -> Dict:
+        """
+        Monta o corpo da requisição de chat completions da OpenAI.
+        
+        O prompt do sistema vem sempre primeiro e idêntico, para o cache
+        automático de prefixo da OpenAI (prompts com 1024+ tokens). Com saída
+        estruturada, a resposta é restrita ao esquema em modo estrito.
+        """
+        if self.structured_output:
+            response_format = {'type': 'json_schema', 'json_schema': dict(output, strict=True)}
+        else:
+            response_format = {"type": "json_object"}
+        return {
+            'model': self.model,
+            'messages': [
+                {"role": "system", "content": system or self.classifier_prompt},
                 {"role": "user", "content": user_message}
             ],
-            temperature=0.3,
-            response_format={"type": "json_object"}
-        )
-        return response.choices[0].message.content
+            'temperature': 0.3,
+            'response_format': response_format
+        }
     
-    def _call_anthropic(self, user_message: str) -> str:
-        """Chama API da Anthropic."""
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=2048,
-            system=self.classifier_prompt,
-            messages=[
+    def anthropic_request_params(self, user_message: str, max_tokens: Optional[int] = None,
+                                 output: Dict = CLASSIFICATION_OUTPUT,
+                                 system: Optional[str] = None) -> Dict:
+        """
+        Monta os parâmetros da requisição de messages da Anthropic.
+        
+        O prompt do classificador é marcado com cache_control para ser lido
+        do cache de prompt nas chamadas seguintes. Com saída estruturada, o
+        modelo é obrigado a responder chamando uma ferramenta cujo
+        input_schema é o esquema da classificação.
+        """
+        system_prompt = system or self.classifier_prompt
+        if self.prompt_cache and system is None:
+            system_prompt = [{
+                'type': 'text',
+                'text': self.classifier_prompt,
+                'cache_control': {'type': 'ephemeral'},
+            }]
+        params = {
+            'model': self.model,
+            'max_tokens': max_tokens or self.max_output_tokens,
+            'system': system_prompt,
+            'messages': [
                 {"role": "user", "content": user_message}
             ],
-            temperature=0.3
+            'temperature': 0.3
+        }
+        if self.structured_output:
+            params['tools'] = [{
+                'name': output['name'],
+                'description': 'Registra a classificação no formato exigido.',
+                'input_schema': output['schema'],
+            }]
+            params['tool_choice'] = {'type': 'tool', 'name': output['name']}
+        return params
+    
+    def google_generation_config(self, output: Dict = CLASSIFICATION_OUTPUT) -> Dict:
+        """Monta o generation_config do Gemini (JSON restrito ao esquema com saída estruturada)."""
+        config = {'temperature': 0.3}
+        if self.structured_output:
+            config['response_mime_type'] = 'application/json'
+            config['response_schema'] = gemini_schema(output['schema'])
+        return config
+    
+    def stream_parser(self, output: Dict = CLASSIFICATION_OUTPUT) -> StreamingClassificationParser:
+        """Cria o parser incremental (com checagem de coerência só para classificações únicas)."""
+        check = consistency_errors if output is CLASSIFICATION_OUTPUT else None
+        return StreamingClassificationParser(check=check)
+    
+    def _feed_stream(self, parser: StreamingClassificationParser, chunk: str) -> None:
+        """Entrega um pedaço do streaming ao parser e registra incoerências assim que surgem."""
+        check_cancelled()
+        for error in parser.feed(chunk):
+            logger.warning("Resposta incoerente no streaming: %s", error)
+    
+    def _call_openai(self, user_message: str, output: Dict = CLASSIFICATION_OUTPUT,
+                     system: Optional[str] = None) -> str:
+        """Chama API da OpenAI."""
+        body = self.openai_request_body(user_message, output=output, system=system)
+        if not self.stream:
+            response = self.client.chat.completions.create(**body)
+            self.record_usage(extract_usage('openai', response.usage))
+            return response.choices[0].message.content
+        
+        parser = self.stream_parser(output)
+        stream = self.client.chat.completions.create(
+            **body, stream=True, stream_options={'include_usage': True}
         )
-        return response.content[0].text
-    
-    def _call_google(self, user_message: str) -> str:
-        """Chama API do Google Gemini."""
-        model = self.client.GenerativeModel(self.model)
-        full_prompt = f"{self.classifier_prompt}\n\n{user_message}"
-        response = model.generate_content(
-            full_prompt,
-            generation_config={'temperature': 0.3}
+        with stream:
+            for chunk in stream:
+                if chunk.usage is not None:
+                    self.record_usage(extract_usage('openai', chunk.usage))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    self._feed_stream(parser, chunk.choices[0].delta.content)
+        return parser.text
+    
+    def _call_anthropic(self, user_message: str, max_tokens: Optional[int] = None,
+                        output: Dict = CLASSIFICATION_OUTPUT, system: Optional[str] = None) -> str:
+        """Chama API da Anthropic."""
+        params = self.anthropic_request_params(
+            user_message, max_tokens=max_tokens, output=output, system=system
         )
-        return response.text
+        if not self.stream:
+            response = self.client.messages.create(**params)
+            self.record_usage(extract_usage('anthropic', response.usage))
+            return anthropic_text(response)
+        
+        parser = self.stream_parser(output)
+        with self.client.messages.stream(**params) as stream:
+            for event in stream:
+                if event.type != 'content_block_delta':
+                    continue
+                if event.delta.type == 'input_json_delta':
+                    self._feed_stream(parser, event.delta.partial_json)
+                elif event.delta.type == 'text_delta':
+                    self._feed_stream(parser, event.delta.text)
+            self.record_usage(extract_usage('anthropic', stream.get_final_message().usage))
+        return parser.text
+    
+    def _call_google(self, user_message: str, output: Dict = CLASSIFICATION_OUTPUT,
+                     system: Optional[str] = None) -> str:
+        """Chama API do Google Gemini (prompt do sistema fora da mensagem do usuário)."""
+        if system is None:
+            model = self.google_model()
+        else:
+            model = self.client.GenerativeModel(self.model, system_instruction=system)
+        config = self.google_generation_config(output)
+        if not self.stream:
+            response = model.generate_content(user_message, generation_config=config)
+            self.record_usage(extract_usage('google', getattr(response, 'usage_metadata', None)))
+            return response.text
+        
+        parser = self.stream_parser(output)
+        response = model.generate_content(user_message, generation_config=config, stream=True)
+        for chunk in response:
+            self._feed_stream(parser, chunk.text)
+        self.record_usage(extract_usage('google', getattr(response, 'usage_metadata', None)))
+        return parser.text
+    
+    def google_model(self):
+        """
+        Retorna o GenerativeModel do Gemini com o prompt do sistema separado.
+        
+        Com LLM_PROMPT_CACHE ativo, tenta guardar o prompt como cached
+        content no provedor (renovado ao expirar); se o modelo ou o tamanho
+        do prompt não permitirem, usa system_instruction, que mantém o
+        prefixo idêntico entre chamadas para o cache implícito.
+        """
+        with self._google_lock:
+            if self._google_model is not None and time.monotonic() < self._google_model_expires:
+                return self._google_model
+            
+            genai = self.client
+            self._delete_google_cache()
+            model = None
+            expires = float('inf')
+            if self.prompt_cache:
+                try:
+                    self._google_cache = genai.caching.CachedContent.create(
+                        model=self.model,
+                        display_name=f'ts4-classifier-{self.prompt_version}',
+                        system_instruction=self.classifier_prompt,
+                        ttl=datetime.timedelta(seconds=GEMINI_CACHE_TTL_SECONDS),
+                    )
+                    model = genai.GenerativeModel.from_cached_content(cached_content=self._google_cache)
+                    # Renova um pouco antes de o provedor descartar o cache
+                    expires = time.monotonic() + GEMINI_CACHE_TTL_SECONDS * 0.9
+                    logger.info("Prompt do sistema armazenado no cache de contexto do Gemini")
+                except Exception as e:
+                    self._google_cache = None
+                    logger.info("Cache de contexto do Gemini indisponível (%s); usando system_instruction", e)
+            if model is None:
+                model = genai.GenerativeModel(self.model, system_instruction=self.classifier_prompt)
+            self._google_model = model
+            self._google_model_expires = expires
+            return model
+    
+    def _delete_google_cache(self) -> None:
+        """Remove o cached content do Gemini criado por este cliente."""
+        cached, self._google_cache = self._google_cache, None
+        if cached is None:
+            return
+        try:
+            cached.delete()
+        except Exception as e:
+            logger.debug("Não foi possível remover o cache de contexto do Gemini: %s", e)
+    
+    def record_usage(self, usage: Dict[str, int], discount: float = 1.0) -> None:
+        """
+        Registra o uso de tokens de uma chamada (com a parte lida do cache de prompt).
+        
+        Args:
+            usage: Dict retornado por extract_usage()
+            discount: Multiplicador do preço (ex.: BATCH_DISCOUNT na API de lote)
+        """
+        usd = usage_cost(self.model, usage, discount)
+        self._call_usage.tokens = usage['input_tokens'] + usage['output_tokens']
+        with self._usage_lock:
+            self._usage['calls'] += 1
+            for key in ('input_tokens', 'cached_tokens', 'cache_write_tokens', 'output_tokens'):
+                self._usage[key] += usage.get(key, 0)
+            self._usage['usd'] += usd
+        metrics = get_metrics()
+        for key in ('input_tokens', 'cached_tokens', 'output_tokens'):
+            metrics.increment('tokens_total', usage.get(key, 0), kind=key[:-len('_tokens')], model=self.model)
+        metrics.increment('cost_usd_total', usd, model=self.model)
+        annotate(input_tokens=usage['input_tokens'], cached_tokens=usage['cached_tokens'],
+                 output_tokens=usage['output_tokens'], usd=usd)
+        logger.debug(
+            "Tokens de entrada: %s (%s do cache, %s gravados no cache), saída: %s",
+            usage['input_tokens'], usage['cached_tokens'], usage.get('cache_write_tokens', 0),
+            usage['output_tokens']
+        )
+    
+    def usage_stats(self) -> Dict[str, int]:
+        """
+        Retorna o uso de tokens acumulado desde a criação do cliente.
+        
+        Returns:
+            Dict com calls, input_tokens, cached_tokens, cache_write_tokens,
+            output_tokens, repairs (chamadas de reparo de respostas inválidas)
+            e usd (custo pelos tokens informados pelo provedor)
+        """
+        with self._usage_lock:
+            return dict(self._usage)
     
     def _parse_response(self, response: str) -> Dict:
-        """Parse da resposta JSON do LLM."""
+        """
+        Parse da resposta JSON do LLM, validada contra ModClassification.
+        
+        Raises:
+            ClassificationError: Se o JSON estiver malformado, incompleto ou incoerente
+        """
+        parser = StreamingClassificationParser()
+        parser.feed(response or '')
+        return parser.finish()
+    
+    def parse_or_repair(self, response: str) -> Dict:
+        """
+        Faz o parse da resposta e, se for inválida, tenta uma chamada de reparo.
+        
+        Args:
+            response: Texto da resposta do LLM
+            
+        Returns:
+            Classificação validada
+        """
         try:
-            # Remove markdown code blocks se presente
-            if '```json' in response:
-                response = response.split('```json')[1].split('```')[0]
-            elif '```' in response:
-                response = response.split('```')[1].split('```')[0]
+            return self._parse_response(response)
+        except ClassificationError as e:
+            return self.repair_response(e)
+    
+    def repair_response(self, error: ClassificationError) -> Dict:
+        """
+        Pede ao LLM apenas a correção de uma resposta inválida.
+        
+        A chamada de reparo leva só a resposta original e a lista de erros,
+        com um prompt curto, em vez de repetir a classificação do mod
+        (prompt do classificador + conteúdo da página).
+        
+        Args:
+            error: Erro de parse/validação com a resposta original
             
-            # Parse JSON
-            result = json.loads(response.strip())
+        Returns:
+            Classificação corrigida
             
-            # Valida campos obrigatórios
-            required_fields = ['priority', 'priority_label', 'notes_reason']
-            for field in required_fields:
-                if field not in result:
-                    raise ValueError(f"Campo obrigatório ausente: {field}")
+        Raises:
+            ClassificationError: Se a resposta corrigida continuar inválida
+        """
+        logger.warning("Resposta inválida do LLM (%s); pedindo correção", error)
+        result = self._parse_response(self.request_repair(error))
+        logger.info("Resposta corrigida: Priority %s", result['priority'])
+        return result
+    
+    def request_repair(self, error: ClassificationError, system: str = REPAIR_PROMPT, **kwargs) -> str:
+        """
+        Faz a chamada de reparo e retorna o texto corrigido (sem validar).
+        
+        Args:
+            error: Erro de parse/validação com a resposta original
+            system: Prompt do sistema do reparo
+            **kwargs: Repassados a _call_provider (max_tokens, output)
             
-            return result
+        Returns:
+            Texto da resposta corrigida
+        """
+        message = repair_message(error)
+        with self._usage_lock:
+            self._usage['repairs'] += 1
+        tokens = self.token_counter.count(system + message) + kwargs.get('max_tokens', self.max_output_tokens)
+        for attempt in Retrying(**retry_policy()):
+            with attempt:
+                fixed = self.call_within_quota(message, tokens, system=system, **kwargs)
+        return fixed
+    
+    @staticmethod
+    def validate_classification(result: Dict) -> Dict:
+        """
+        Valida uma classificação contra o esquema (campos e coerência).
+        
+        Args:
+            result: Objeto JSON retornado pelo LLM
+            
+        Returns:
+            Classificação normalizada
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Erro ao fazer parse do JSON: {e}")
-            logger.error(f"Resposta recebida: {response}")
-            raise ValueError(f"Resposta inválida do LLM: {response[:200]}")
+        Raises:
+            ClassificationError: Se faltar campo obrigatório ou houver incoerência
+        """
+        return validate_schema(result)
 
 
 def classify_with_llm(mod_content: Dict[str, str], 
                       api_key: Optional[str] = None,
-                      model: Optional[str] = None) -> Dict:
+                      model: Optional[str] = None,
+                      use_cache: bool = True,
+                      refresh_cache: bool = False,
+                      spend_cap: Optional[SpendingCap] = None) -> Dict:
     """
     Função de conveniência para classificar com LLM.
     
+    Reaproveita o LLMClient do registro do processo para o mesmo
+    (provedor, modelo, api_key), evitando recriar o cliente do SDK.
+    
     Args:
         mod_content: Conteúdo do mod
         api_key: API key (opcional)
         model: Nome do modelo (opcional)
+        use_cache: Se False, ignora o cache de classificações
+        refresh_cache: Se True, reclassifica e atualiza o cache
+        spend_cap: Limite de gasto do lote (opcional)
         
     Returns:
         Classificação estruturada
     """
-    client = LLMClient(api_key=api_key, model=model)
-    return client.classify_mod(mod_content)
+    client = get_llm_client(api_key=api_key, model=model)
+    return client.classify_mod(
+        mod_content, use_cache=use_cache, refresh_cache=refresh_cache, spend_cap=spend_cap
+    )
+
+
+def get_llm_client(api_key: Optional[str] = None,
+                   model: Optional[str] = None) -> LLMClient:
+    """
+    Retorna o LLMClient compartilhado para (provedor, modelo, api_key).
+    
+    Args:
+        api_key: API key (opcional, usa env var)
+        model: Nome do modelo (opcional, usa env var)
+        
+    Returns:
+        Instância compartilhada de LLMClient
+    """
+    model = model or os.getenv('LLM_MODEL', 'gpt-4o')
+    api_key = api_key or provider_api_key(detect_provider(model))
+    key = ('llm', detect_provider(model), model, api_key)
+    return registry.get_or_create(
+        key, lambda: LLMClient(api_key=api_key, model=model, cache=get_default_cache())
+    )
@@ -0,0 +1,213 @@
+"""LLM Hedging Module - Requisições com hedge em um provedor secundário."""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+from typing import Dict, Optional
+
+from metrics import current_trace, use_trace
+from prompt_builder import BudgetExceededError, SpendingCap
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEDGE_PERCENTILE = 95.0
+
+# Prazo usado enquanto não há latências suficientes do provedor primário
+DEFAULT_HEDGE_DELAY = 15.0
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 500
+
+# Cancelamento da requisição perdedora (checado a cada pedaço do streaming)
+_local = threading.local()
+
+
+class HedgeCancelled(Exception):
+    """A requisição perdeu o hedge e foi interrompida."""
+
+
+def check_cancelled() -> None:
+    """
+    Interrompe a requisição da thread atual se ela já perdeu o hedge.
+
+    Chamado pelo LLMClient a cada pedaço recebido em streaming; sem
+    streaming a resposta perdedora chega inteira e é descartada.
+
+    Raises:
+        HedgeCancelled: Se a outra requisição já venceu
+    """
+    cancel = getattr(_local, 'cancel', None)
+    if cancel is not None and cancel.is_set():
+        raise HedgeCancelled()
+
+
+class Hedger:
+    """
+    Envia a mesma classificação a um provedor secundário quando o primário demora.
+
+    O prazo é o percentil (LLM_HEDGE_PERCENTILE, padrão p95) das latências
+    recentes do primário; se ele não responder até lá, ou falhar antes, a
+    mensagem vai também ao modelo secundário. A primeira resposta que
+    passa na validação vence e a outra é cancelada. As duas requisições
+    rodam em threads do hedge que continuam o trace() de quem chamou.
+    """
+
+    def __init__(self, client, secondary_model: str,
+                 percentile: Optional[float] = None,
+                 initial_delay: Optional[float] = None,
+                 max_workers: int = 16):
+        """
+        Args:
+            client: LLMClient primário
+            secondary_model: Modelo de outro provedor usado no hedge
+            percentile: Percentil das latências do primário que define o prazo
+                (padrão: LLM_HEDGE_PERCENTILE ou 95)
+            initial_delay: Prazo em segundos até haver MIN_SAMPLES latências
+                (padrão: LLM_HEDGE_DELAY ou 15)
+            max_workers: Requisições simultâneas (primárias + hedges)
+        """
+        self.client = client
+        self.secondary_model = secondary_model
+        if percentile is None:
+            percentile = float(os.getenv('LLM_HEDGE_PERCENTILE', DEFAULT_HEDGE_PERCENTILE))
+        if initial_delay is None:
+            initial_delay = float(os.getenv('LLM_HEDGE_DELAY', DEFAULT_HEDGE_DELAY))
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+        self._stats = {'requests': 0, 'hedged': 0, 'failover': 0, 'secondary_wins': 0,
+                       'saved_seconds': 0.0, 'saved_samples': 0}
+
+    def deadline(self) -> float:
+        """Prazo em segundos antes de disparar o hedge."""
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return self.initial_delay
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(round(self.percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def secondary(self):
+        """LLMClient do modelo secundário (compartilhado pelo registro)."""
+        from llm_client import get_llm_client
+        return get_llm_client(model=self.secondary_model)
+
+    def classify(self, user_message: str, spend_cap: Optional[SpendingCap] = None) -> Dict:
+        """
+        Classifica a mensagem com hedge no provedor secundário.
+
+        Args:
+            user_message: Mensagem do usuário (o custo do primário já foi reservado)
+            spend_cap: Limite de gasto; sem orçamento para o hedge, só o primário é aguardado
+
+        Returns:
+            Classificação validada da primeira resposta válida
+        """
+        started = time.perf_counter()
+        state = {'winner_at': None}
+        context = current_trace()
+        primary_cancel = threading.Event()
+        primary = self._executor.submit(self._run, self.client, user_message, primary_cancel, context)
+        primary.add_done_callback(lambda future: self._primary_done(future, started, state))
+        self._count('requests')
+
+        primary_failed = False
+        try:
+            return primary.result(timeout=self.deadline())
+        except TimeoutError:
+            reason = 'prazo'
+        except HedgeCancelled:
+            raise
+        except Exception as e:
+            reason = f'falha: {e}'
+            primary_failed = True
+            self._count('failover')
+        waited = time.perf_counter() - started
+
+        secondary = self.secondary()
+        try:
+            secondary.charge_prediction(user_message, spend_cap)
+        except BudgetExceededError as e:
+            logger.warning("Hedge sem orçamento (%s); aguardando só o primário", e)
+            return primary.result()
+        # O primário pode ter respondido enquanto o cliente secundário era criado
+        if not primary_failed and primary.done() and primary.exception() is None:
+            return primary.result()
+
+        logger.info(
+            "Hedge: %s sem resposta válida (%s) após %.1fs; enviando também para %s",
+            self.client.model, reason, waited, self.secondary_model
+        )
+        self._count('hedged')
+        hedge_cancel = threading.Event()
+        hedge = self._executor.submit(self._run, secondary, user_message, hedge_cancel, context)
+        cancels = {hedge: hedge_cancel}
+        if not primary_failed:
+            cancels[primary] = primary_cancel
+
+        pending = set(cancels)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                state['winner_at'] = time.perf_counter()
+                for other, cancel in cancels.items():
+                    if other is not future:
+                        cancel.set()
+                        other.cancel()
+                result = future.result()
+                if future is hedge:
+                    self._count('secondary_wins')
+                    result = dict(result, model=self.secondary_model)
+                return result
+        raise error
+
+    @staticmethod
+    def _run(client, user_message: str, cancel: threading.Event, context) -> Dict:
+        _local.cancel = cancel
+        try:
+            with use_trace(context):
+                return client.request_classification(user_message)
+        finally:
+            _local.cancel = None
+
+    def _primary_done(self, future, started: float, state: Dict) -> None:
+        """Registra a latência do primário (também quando chega depois do hedge)."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        finished = time.perf_counter()
+        with self._lock:
+            self._latencies.append(finished - started)
+            if state['winner_at'] is not None and finished > state['winner_at']:
+                self._stats['saved_seconds'] += finished - state['winner_at']
+                self._stats['saved_samples'] += 1
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> Dict:
+        """
+        Retorna os contadores do hedge.
+
+        Returns:
+            Dict com requests, hedged, hedge_rate, failover (primário falhou),
+            secondary_wins, saved_seconds (soma do tempo poupado nos casos em
+            que a resposta atrasada do primário chegou) e deadline atual
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['hedge_rate'] = stats['hedged'] / stats['requests'] if stats['requests'] else 0.0
+        stats['deadline'] = self.deadline()
+        return stats
+
+    def close(self) -> None:
+        """Encerra as threads do hedge."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
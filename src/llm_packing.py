@@ -0,0 +1,253 @@
+"""LLM Packing Module - Classificação de vários mods curtos em uma única requisição."""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from tenacity import Retrying
+
+from classification_cache import ClassificationCache
+from classification_schema import (
+    PACKED_OUTPUT, REPAIR_PROMPT, ClassificationError, StreamingClassificationParser,
+    validate_classification,
+)
+from prompt_builder import BudgetExceededError, EXPECTED_OUTPUT_TOKENS, SpendingCap
+from rate_limit import retry_policy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PACK_SIZE = 8
+
+# Mods cuja mensagem não cabe nesse orçamento são classificados sozinhos
+DEFAULT_MAX_ITEM_TOKENS = 600
+
+# Teto de tokens de saída de uma requisição empacotada
+MAX_PACK_OUTPUT_TOKENS = 8192
+
+PACK_INSTRUCTIONS = """Classifique CADA um dos {count} mods abaixo seguindo as instruções, de forma independente.
+Responda APENAS com um objeto JSON no formato
+{{"classifications": [{{"id": "<id do mod>", "priority": ..., "priority_label": ..., ...}}]}}
+com exatamente um item por mod, o mesmo "id" do cabeçalho de cada mod e os mesmos campos
+da classificação individual."""
+
+PACKED_REPAIR_PROMPT = REPAIR_PROMPT + """
+- a resposta é um objeto {"classifications": [...]} com um item por mod, cada um com o "id"
+  do mod; mantenha os itens que não têm erro exatamente como estão"""
+
+
+def build_packed_message(messages: Sequence[Tuple[str, str]]) -> str:
+    """
+    Junta as mensagens de vários mods em uma única mensagem do usuário.
+
+    Args:
+        messages: Pares (id, mensagem do mod sem a instrução final)
+
+    Returns:
+        Mensagem empacotada
+    """
+    parts = [PACK_INSTRUCTIONS.format(count=len(messages))]
+    for item_id, message in messages:
+        parts.append(f"=== Mod id={item_id} ===\n{message.strip()}")
+    return '\n\n'.join(parts) + '\n'
+
+
+def parse_packed_response(response: str, ids: Sequence[str]) -> Tuple[Dict[str, Dict], List[str]]:
+    """
+    Valida cada classificação de uma resposta empacotada.
+
+    O objeto {"classifications": [...]} é lido com o parser incremental
+    (que ignora cercas ```json) e cada item é validado contra
+    ModClassification. Os itens são casados pelo "id"; sem id
+    reconhecível, pela posição (apenas se o array tiver exatamente um
+    item por mod).
+
+    Args:
+        response: Texto da resposta
+        ids: Ids dos mods enviados, na ordem
+
+    Returns:
+        Tupla ({id: classificação} dos itens válidos, erros dos demais itens)
+
+    Raises:
+        ClassificationError: Se a resposta não tiver a lista de classificações
+    """
+    parser = StreamingClassificationParser(check=None)
+    parser.feed(response or '')
+    items = parser.fields.get('classifications') if parser.done else None
+    if not isinstance(items, list):
+        errors = parser.errors + ['"classifications" ausente ou não é uma lista de classificações']
+        raise ClassificationError('; '.join(errors), response or '', errors)
+
+    results: Dict[str, Dict] = {}
+    errors: List[str] = []
+    invalid = set()
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append(f"classifications[{position}]: o item não é um objeto")
+            continue
+        item_id = str(item.get('id', '')).strip()
+        if item_id not in ids:
+            if len(items) != len(ids):
+                errors.append(f"classifications[{position}]: id {item_id!r} não é de nenhum mod enviado")
+                continue
+            item_id = ids[position]
+        if item_id in results or item_id in invalid:
+            continue
+        fields = {key: value for key, value in item.items() if key != 'id'}
+        try:
+            results[item_id] = validate_classification(fields)
+        except ClassificationError as e:
+            invalid.add(item_id)
+            errors.extend(f"mod id={item_id}: {error}" for error in e.errors)
+    errors.extend(
+        f"mod id={item_id}: classificação ausente"
+        for item_id in ids if item_id not in results and item_id not in invalid
+    )
+    return results, errors
+
+
+def _repair_pack(client, response: str, ids: Sequence[str], errors: List[str],
+                 max_tokens: int) -> Dict[str, Dict]:
+    """
+    Pede uma única correção da resposta empacotada com os erros de todos os itens.
+
+    Returns:
+        {id: classificação} dos itens válidos na resposta corrigida (vazio se o reparo falhar)
+    """
+    logger.warning("Resposta empacotada com %d erro(s); pedindo correção", len(errors))
+    error = ClassificationError('; '.join(errors), response, errors)
+    try:
+        fixed = client.request_repair(
+            error, system=PACKED_REPAIR_PROMPT, max_tokens=max_tokens, output=PACKED_OUTPUT
+        )
+        repaired, remaining = parse_packed_response(fixed, ids)
+    except Exception as e:
+        logger.warning("Correção da resposta empacotada falhou: %s", e)
+        return {}
+    if remaining:
+        logger.warning("Resposta empacotada corrigida ainda com erros: %s", '; '.join(remaining))
+    return repaired
+
+
+def _classify_pack(client, pack: List[Tuple[int, str]],
+                   spend_cap: Optional[SpendingCap]) -> Dict[int, Dict]:
+    """Faz uma requisição empacotada e retorna {índice: classificação} dos itens válidos."""
+    ids = [str(n) for n in range(1, len(pack) + 1)]
+    message = build_packed_message([(item_id, text) for item_id, (_, text) in zip(ids, pack)])
+    client.charge_prediction(message, spend_cap, outputs=len(pack))
+    max_tokens = min(MAX_PACK_OUTPUT_TOKENS, len(pack) * EXPECTED_OUTPUT_TOKENS * 2)
+
+    for attempt in Retrying(**retry_policy()):
+        with attempt:
+            response = client.call_within_quota(
+                message, client.estimate_request_tokens(message),
+                max_tokens=max_tokens, output=PACKED_OUTPUT
+            )
+
+    try:
+        parsed, errors = parse_packed_response(response, ids)
+    except ClassificationError as e:
+        parsed, errors = {}, e.errors
+    if errors:
+        # Os itens já válidos prevalecem sobre os da resposta corrigida
+        parsed = dict(_repair_pack(client, response, ids, errors, max_tokens), **parsed)
+    return {index: parsed[item_id] for item_id, (index, _) in zip(ids, pack) if item_id in parsed}
+
+
+def classify_packed(client, mod_contents: List[Dict[str, str]],
+                    pack_size: int = DEFAULT_PACK_SIZE,
+                    max_item_tokens: int = DEFAULT_MAX_ITEM_TOKENS,
+                    workers: int = 1,
+                    use_cache: bool = True,
+                    spend_cap: Optional[SpendingCap] = None) -> List[Optional[Dict]]:
+    """
+    Classifica mods curtos em grupos de pack_size por requisição.
+
+    Cada mod cuja mensagem cabe em max_item_tokens entra em um pacote;
+    os maiores são classificados um a um. A resposta é validada item a
+    item; se houver itens ausentes ou inválidos, uma chamada de reparo
+    corrige a resposta do pacote, e só os que continuarem falhando são
+    reclassificados individualmente com classify_mod().
+
+    Args:
+        client: Instância de LLMClient
+        mod_contents: Lista de conteúdos de mods
+        pack_size: Máximo de mods por requisição
+        max_item_tokens: Orçamento de tokens de cada mod empacotado
+        workers: Requisições simultâneas
+        use_cache: Se False, ignora o cache de classificações
+        spend_cap: Limite de gasto do lote (opcional)
+
+    Returns:
+        Lista de classificações na mesma ordem da entrada (None se falhou)
+    """
+    results: List[Optional[Dict]] = [None] * len(mod_contents)
+    cache = client.cache if use_cache else None
+    cache_keys = {}
+    short: List[Tuple[int, str]] = []
+    single: List[int] = []
+
+    for index, mod_content in enumerate(mod_contents):
+        if cache is not None:
+            key = ClassificationCache.make_key(mod_content, client.classifier_prompt, client.model)
+            cached = cache.get(key)
+            if cached is not None:
+                results[index] = cached
+                continue
+            cache_keys[index] = key
+        plan = client.prompt_builder.build(mod_content, budget=max_item_tokens, instruction=False)
+        if plan['truncated']:
+            single.append(index)
+        else:
+            short.append((index, plan['message']))
+
+    packs = [short[i:i + pack_size] for i in range(0, len(short), pack_size)]
+    # Pacote de um mod só não economiza nada
+    if packs and len(packs[-1]) == 1:
+        single.append(packs.pop()[0][0])
+
+    def run_pack(pack):
+        try:
+            return _classify_pack(client, pack, spend_cap)
+        except BudgetExceededError:
+            raise
+        except Exception as e:
+            logger.warning("Requisição empacotada com %s mods falhou: %s", len(pack), e)
+            return {}
+
+    retried = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(run_pack, pack) for pack in packs]
+        for pack, future in zip(packs, futures):
+            try:
+                classified = future.result()
+            except BudgetExceededError as e:
+                logger.warning("Pacote com %s mods fora do lote: %s", len(pack), e)
+                continue
+            for index, classification in classified.items():
+                results[index] = classification
+                if index in cache_keys:
+                    cache.set(cache_keys[index], client.model, classification)
+            failed = [index for index, _ in pack if results[index] is None]
+            retried += len(failed)
+            single.extend(failed)
+
+        def run_single(index):
+            try:
+                return client.classify_mod(
+                    mod_contents[index], use_cache=use_cache, spend_cap=spend_cap
+                )
+            except Exception as e:
+                logger.error("Falha ao classificar mod %s: %s", index, e)
+                return None
+
+        single.sort()
+        for index, classification in zip(single, executor.map(run_single, single)):
+            results[index] = classification
+
+    logger.info(
+        "Empacotamento: %s mods em %s requisições; %s classificados individualmente "
+        "(%s após falha no pacote)",
+        sum(len(pack) for pack in packs), len(packs), len(single), retried
+    )
+    return results
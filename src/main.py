@@ -11,32 +11,63 @@ Este script automatiza o processo de classificação de prioridade de mods do Th
 import os
 import sys
 import logging
-from dotenv import load_dotenv
-
-# Importa os módulos implementados
-from web_scraper import extract_mod_content
-from llm_client import classify_with_llm
-from notion_updater import update_notion_page
-
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+
+# Scraper, LLM (e o SDK do provedor) e Notion são importados no primeiro uso:
+# quem roda só o cache, o resumo ou a ajuda não paga o import desses pacotes
+from classification_cache import get_default_cache
+from client_registry import import_lock
+from metrics import get_metrics, span, trace
+from mod_state import content_hash, get_default_state_store
+
 logger = logging.getLogger(__name__)
 
-# Carregar variáveis de ambiente
-load_dotenv()
+
+def setup() -> None:
+    """Configura o logging e carrega o .env (apenas ao rodar como script)."""
+    from dotenv import load_dotenv
+    
+    logging.basicConfig(
+        level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    load_dotenv()
 
 
 class ModClassifierPipeline:
     """Pipeline principal para classificação de mods."""
     
-    def __init__(self):
+    def __init__(self, use_cache: bool = True, refresh_cache: bool = False,
+                 state_store=None, force: bool = False, spend_cap=None,
+                 pre_classifier=None, cascade=None, async_fetch: bool = False,
+                 forced_keys=None, async_llm: bool = False):
         """
         Inicializa o pipeline.
         Verifica se as variáveis de ambiente necessárias estão configuradas.
+        
+        Args:
+            use_cache: Se False, ignora o cache de classificações
+            refresh_cache: Se True, reclassifica e sobrescreve o cache
+            state_store: ModStateStore com os fingerprints das classificações (opcional)
+            force: Se True, reclassifica mesmo quando o fingerprint não mudou
+            spend_cap: SpendingCap com o gasto máximo previsto da execução (opcional)
+            pre_classifier: PreClassifier que decide os casos óbvios sem o LLM (opcional)
+            cascade: ModelCascade (modelo barato primeiro) no lugar de LLM_MODEL (opcional)
+            async_fetch: Se True, baixa as páginas pelo AsyncFetcher (limites por host, robots.txt)
+            forced_keys: Chaves (page_id/URL) reclassificadas mesmo com fingerprint
+                inalterado, como as linhas do sync sem Priority (opcional)
+            async_llm: Se True, classifica pelo AsyncLLMClient (clientes async dos SDKs)
         """
+        self.use_cache = use_cache
+        self.refresh_cache = refresh_cache
+        self.state_store = state_store
+        self.force = force
+        self.spend_cap = spend_cap
+        self.pre_classifier = pre_classifier
+        self.cascade = cascade
+        self.async_fetch = async_fetch
+        self.forced_keys = forced_keys if forced_keys is not None else set()
+        self.async_llm = async_llm
+        
         # Verifica variáveis essenciais
         self.notion_token = os.getenv('NOTION_API_KEY') or os.getenv('NOTION_TOKEN')
         self.notion_database_id = os.getenv('NOTION_DATABASE_ID') or os.getenv('NOTION_DB_ID')
@@ -49,7 +80,200 @@ class ModClassifierPipeline:
         if not self.llm_api_key:
             logger.warning("LLM_API_KEY não configurada - classificação LLM será desabilitada")
         
-        logger.info(f"Pipeline inicializado com modelo: {self.llm_model}")
+        logger.info("Pipeline inicializado com modelo: %s", self.llm_model)
+    
+    def warm_up(self) -> None:
+        """
+        Importa os SDKs e cria os clientes das etapas antes de abrir as threads.
+        
+        O SDK da OpenAI consulta sys.modules['httpx'] a cada requisição; se
+        outra thread estiver importando o httpx nesse momento (notion_client,
+        SDK da Anthropic), a requisição enxerga o módulo pela metade.
+        """
+        with import_lock:
+            from llm_client import get_llm_client
+            from web_scraper import get_scraper
+            get_scraper()
+            if self.async_fetch:
+                from async_fetcher import get_async_fetcher
+                get_async_fetcher()
+            if self.llm_api_key and self.async_llm:
+                from async_llm_client import get_async_llm_client
+                client = get_async_llm_client()
+                client.ensure_client()
+                client.ensure_async_client()
+            elif self.llm_api_key:
+                models = self.cascade.models if self.cascade is not None else [None]
+                for model in models:
+                    client = get_llm_client(model=model)
+                    client.ensure_client()
+                    hedger = client.hedger()
+                    if hedger is not None:
+                        hedger.secondary().ensure_client()
+            if self.notion_token:
+                from notion_updater import get_notion_updater
+                get_notion_updater()
+    
+    def scrape(self, mod_url: str) -> dict:
+        """
+        Etapa 1: extrai o conteúdo da página do mod.
+        
+        Args:
+            mod_url: URL da página do mod
+            
+        Returns:
+            dict: Conteúdo extraído (title, description, full_text, ...)
+        """
+        if self.async_fetch:
+            with span('scrape'):
+                return self.submit_scrape(mod_url).result()
+        with import_lock:
+            from web_scraper import extract_mod_content
+        with span('scrape'):
+            return extract_mod_content(mod_url)
+    
+    def submit_scrape(self, mod_url: str):
+        """
+        Agenda a etapa 1 no AsyncFetcher, sem esperar o resultado.
+        
+        Args:
+            mod_url: URL da página do mod
+            
+        Returns:
+            concurrent.futures.Future com o conteúdo extraído
+        """
+        with import_lock:
+            from async_fetcher import get_async_fetcher
+        return get_async_fetcher().submit(mod_url)
+    
+    def classify(self, mod_content: dict) -> dict:
+        """
+        Etapa 2: classifica o conteúdo extraído com o LLM.
+        
+        Com o pré-classificador ativo, os casos óbvios são decididos
+        localmente e só os ambíguos vão ao LLM.
+        
+        Args:
+            mod_content: Conteúdo retornado por scrape()
+            
+        Returns:
+            dict: Classificação do mod
+        """
+        with span('classify'):
+            if self.pre_classifier is not None:
+                return self.pre_classifier.classify(mod_content, self.classify_with_llm)
+            return self.classify_with_llm(mod_content)
+    
+    def classify_with_llm(self, mod_content: dict) -> dict:
+        """Classifica o conteúdo sempre com o LLM (sem o pré-classificador)."""
+        if self.async_llm:
+            # A thread da etapa só espera; a chamada roda no event loop do cliente
+            with import_lock:
+                from async_llm_client import get_async_llm_client
+            return get_async_llm_client().submit(
+                mod_content, use_cache=self.use_cache, refresh_cache=self.refresh_cache,
+                spend_cap=self.spend_cap
+            ).result()
+        if self.cascade is not None:
+            return self.cascade.classify(
+                mod_content, use_cache=self.use_cache, refresh_cache=self.refresh_cache,
+                spend_cap=self.spend_cap
+            )
+        with import_lock:
+            from llm_client import classify_with_llm
+        return classify_with_llm(
+            mod_content, use_cache=self.use_cache, refresh_cache=self.refresh_cache,
+            spend_cap=self.spend_cap
+        )
+    
+    def update_notion(self, notion_page_id: str, classification: dict,
+                      write_id: str = None) -> bool:
+        """
+        Etapa 3: atualiza a página do Notion (APPEND ao Notes).
+        
+        Args:
+            notion_page_id: ID da página no Notion
+            classification: Classificação retornada por classify()
+            write_id: Id da gravação no diário; com ele, um bloco já gravado não é repetido
+            
+        Returns:
+            bool: True se a página foi atualizada, False se a etapa foi pulada
+        """
+        if not notion_page_id or not self.notion_token:
+            return False
+        with import_lock:
+            from notion_updater import update_notion_page
+        with span('notion'):
+            return update_notion_page(notion_page_id, classification, write_id=write_id)
+    
+    def _fingerprint_context(self) -> tuple:
+        """
+        Retorna (modelo, versão do prompt) da classificação em uso.
+        
+        Com a cascata, o "modelo" é a lista de níveis (ex.: "gpt-4o-mini,gpt-4o"):
+        trocar qualquer nível invalida os fingerprints gravados.
+        """
+        with import_lock:
+            from llm_client import get_llm_client
+        client = get_llm_client()
+        if self.cascade is not None:
+            return ','.join(self.cascade.models), client.prompt_version
+        return client.model, client.prompt_version
+    
+    def decide(self, mod_key: str, mod_content: dict, mod_url: str = None) -> tuple:
+        """
+        Decide se o mod precisa ser (re)classificado comparando fingerprints.
+        
+        O fingerprint é o hash do texto extraído + versão do prompt + modelo;
+        uma URL diferente da registrada ou uma chave em forced_keys também
+        levam à reclassificação.
+        
+        Args:
+            mod_key: ID da página no Notion (ou a URL, para mods sem página)
+            mod_content: Conteúdo extraído do mod
+            mod_url: URL de onde o conteúdo veio (opcional)
+            
+        Returns:
+            tuple: (decisão, classificação anterior). Decisão é 'new',
+            'reclassified' ou 'skipped'; a classificação só vem em 'skipped'
+        """
+        if self.state_store is None:
+            return 'new', None
+        
+        previous = self.state_store.get(mod_key)
+        if previous is None:
+            return 'new', None
+        
+        model, prompt_version = self._fingerprint_context()
+        unchanged = (
+            previous['content_hash'] == content_hash(mod_content)
+            and previous['prompt_version'] == prompt_version
+            and previous['model'] == model
+            and previous['classification'] is not None
+            and (mod_url is None or previous['url'] == mod_url)
+        )
+        if unchanged and not self.force and mod_key not in self.forced_keys:
+            return 'skipped', previous['classification']
+        return 'reclassified', None
+    
+    def record_state(self, mod_key: str, mod_url: str, mod_content: dict,
+                     classification: dict = None) -> None:
+        """
+        Registra o fingerprint da classificação gravada para o mod.
+        
+        Args:
+            mod_key: ID da página no Notion (ou a URL, para mods sem página)
+            mod_url: URL do mod
+            mod_content: Conteúdo que foi classificado
+            classification: Classificação gravada
+        """
+        if self.state_store is None or not mod_key:
+            return
+        model, prompt_version = self._fingerprint_context()
+        self.state_store.record(
+            mod_key, mod_url, mod_content,
+            prompt_version=prompt_version, model=model, classification=classification
+        )
     
     def process_mod(self, mod_url: str, notion_page_id: str = None) -> dict:
         """
@@ -60,91 +284,574 @@ class ModClassifierPipeline:
             notion_page_id: ID da página no Notion (opcional)
             
         Returns:
-            dict: Classificação do mod
+            dict: Classificação do mod, com a chave 'decision'
+            ('new', 'reclassified' ou 'skipped') e 'metrics' (spans de cada etapa)
         """
+        with trace() as spans:
+            result = self._process_mod(mod_url, notion_page_id)
+        return dict(result, metrics=spans)
+    
+    def _process_mod(self, mod_url: str, notion_page_id: str = None) -> dict:
         try:
             logger.info("="*70)
-            logger.info(f"Iniciando processamento do mod: {mod_url}")
+            logger.info("Iniciando processamento do mod: %s", mod_url)
             logger.info("="*70)
             
             # PASSO 1: Extrair conteúdo da página
             logger.info("[1/3] Extraindo conteúdo da página...")
-            mod_content = extract_mod_content(mod_url)
-            logger.info(f"     ✓ Extraído: {mod_content['title']}")
-            logger.info(f"     Total de palavras: {mod_content['word_count']}")
+            mod_content = self.scrape(mod_url)
+            logger.info("     ✓ Extraído: %s", mod_content['title'])
+            logger.info("     Total de palavras: %s", mod_content['word_count'])
+            
+            # Fingerprint: pula LLM e Notion se conteúdo, prompt e modelo não mudaram
+            mod_key = notion_page_id or mod_url
+            decision, previous = self.decide(mod_key, mod_content, mod_url)
+            if decision == 'skipped':
+                self.record_state(mod_key, mod_url, mod_content, previous)
+                logger.info("     = Conteúdo, prompt e modelo inalterados - pulando LLM e Notion")
+                logger.info("="*70)
+                return dict(previous, decision=decision)
             
             # PASSO 2: Classificar com LLM
-            logger.info("[2/3] Classificando mod com LLM...")
-            classification = classify_with_llm(mod_content)
-            logger.info(f"     ✓ Priority: {classification['priority']} ({classification.get('priority_label', '')})")
+            logger.info("[2/3] Classificando mod com LLM (%s)...", decision)
+            classification = self.classify(mod_content)
+            logger.info("     ✓ Priority: %s (%s)", classification['priority'], classification.get('priority_label', ''))
             if classification.get('sub_category'):
-                logger.info(f"     ✓ Sub: {classification['sub_category']} - {classification.get('sub_category_label', '')}")
+                logger.info("     ✓ Sub: %s - %s", classification['sub_category'], classification.get('sub_category_label', ''))
             
             # PASSO 3: Atualizar Notion (se page_id fornecido)
             if notion_page_id and self.notion_token:
-                logger.info(f"[3/3] Atualizando Notion page {notion_page_id}...")
-                update_notion_page(notion_page_id, classification)
+                logger.info("[3/3] Atualizando Notion page %s...", notion_page_id)
+                self.update_notion(notion_page_id, classification)
+                self.record_state(mod_key, mod_url, mod_content, classification)
                 logger.info("     ✓ Página do Notion atualizada com sucesso (APPEND ao Notes)")
             elif notion_page_id and not self.notion_token:
                 logger.warning("     ⚠ NOTION_API_KEY não configurada - pulando atualização")
             else:
+                self.record_state(mod_key, mod_url, mod_content, classification)
                 logger.info("     - Notion page ID não fornecido, pulando atualização")
             
             logger.info("="*70)
             logger.info("✅ Processamento concluído com sucesso!")
             logger.info("="*70)
             
-            return classification
+            return dict(classification, decision=decision)
             
         except Exception as e:
-            logger.error(f"❌ Erro ao processar mod: {str(e)}")
+            logger.error("❌ Erro ao processar mod: %s", e)
             logger.exception(e)
             raise
 
 
+def add_cache_args(parser) -> None:
+    """Adiciona as flags de controle do cache de classificações e do fingerprint."""
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignora o cache de classificações (não lê nem grava)')
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help='Reclassifica com o LLM e sobrescreve o cache')
+    parser.add_argument('--max-cost', type=float, default=None, metavar='USD',
+                        help='Gasto máximo previsto com o LLM nesta execução (em USD)')
+    parser.add_argument('--force', action='store_true',
+                        help='Reclassifica e grava no Notion mesmo com fingerprint inalterado')
+    parser.add_argument('--cascade', default=os.getenv('LLM_CASCADE', ''), metavar='MODELOS',
+                        help='Cascata de modelos, do mais barato ao mais forte '
+                             '(ex.: gpt-4o-mini,gpt-4o); só os casos incertos sobem')
+    parser.add_argument('--pre-classify', action='store_true',
+                        default=os.getenv('PRECLASSIFIER', '0') == '1',
+                        help='Decide localmente os casos óbvios (CAS, reshades, frameworks...) sem o LLM')
+    parser.add_argument('--async-fetch', action='store_true',
+                        default=os.getenv('SCRAPER_ASYNC', '0') == '1',
+                        help='Baixa as páginas em paralelo com limites por host, crawl delay e robots.txt')
+    parser.add_argument('--metrics-out', default=os.getenv('METRICS_OUT') or None, metavar='ARQUIVO',
+                        help='Grava as métricas da execução (.prom: texto do Prometheus; '
+                             'outro: JSON lines)')
+
+
+def add_journal_args(parser) -> None:
+    """Adiciona as flags do diário de jobs (retomada de execuções interrompidas)."""
+    parser.add_argument('--journal', default=None, metavar='ARQUIVO',
+                        help='Diário SQLite das etapas de cada mod '
+                             '(padrão: JOB_JOURNAL_PATH ou .cache/job_journal.sqlite3)')
+    parser.add_argument('--run-id', default=None,
+                        help='Identifica a execução a retomar (padrão: derivado da entrada)')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Descarta o andamento salvo desta execução e começa do zero')
+    parser.add_argument('--no-journal', action='store_true',
+                        help='Não registra nem retoma o andamento da execução')
+
+
+def make_journal(args, default_run_id: str):
+    """Abre o JobJournal da execução (ou None com --no-journal)."""
+    if args.no_journal:
+        return None
+    from job_journal import get_job_journal
+    journal = get_job_journal(args.run_id or default_run_id, path=args.journal)
+    if args.fresh:
+        journal.clear()
+    counts = journal.counts()
+    if counts:
+        print("Retomando execução " + journal.run_id + ": " +
+              ", ".join(f"{count} {state}" for state, count in sorted(counts.items())))
+    return journal
+
+
+def finish_journal(journal, counts: dict) -> None:
+    """Descarta o diário de uma execução sem erros; senão, ele fica para a retomada."""
+    if journal is None:
+        return
+    if counts['error'] == 0:
+        journal.clear()
+    else:
+        print(f"Diário mantido em {journal.path}: {counts['error']} mods pendentes "
+              f"(rode o mesmo comando para retomar)")
+    journal.close()
+
+
+def make_spend_cap(args):
+    """Cria o SpendingCap de --max-cost (ou None, sem limite)."""
+    if args.max_cost is None:
+        return None
+    from prompt_builder import SpendingCap
+    return SpendingCap(args.max_cost)
+
+
+def make_pre_classifier(args):
+    """Cria o PreClassifier de --pre-classify (ou None, desativado)."""
+    if not args.pre_classify:
+        return None
+    from pre_classifier import PreClassifier
+    return PreClassifier()
+
+
+def make_cascade(args):
+    """Cria o ModelCascade de --cascade (ou None, modelo único)."""
+    if not args.cascade:
+        return None
+    from llm_cascade import cascade_from_env
+    return cascade_from_env(args.cascade)
+
+
+def print_cascade(cascade) -> None:
+    """Mostra latência, custo e taxa de escalonamento de cada nível da cascata."""
+    if cascade is None:
+        return
+    for tier in cascade.stats():
+        print(f"Cascata {tier['model']}: {tier['calls']} chamadas, "
+              f"p50 {tier['p50']:.2f}s, p95 {tier['p95']:.2f}s, US$ {tier['usd']:.4f}, "
+              f"escalados {tier['escalated']} ({100 * tier['escalation_rate']:.0f}%)")
+
+
+def print_pre_classifier(pre_classifier) -> None:
+    """Mostra quantos mods o pré-classificador decidiu e a concordância com o LLM."""
+    if pre_classifier is None:
+        return
+    stats = pre_classifier.stats()
+    line = f"Pré-classificador: {stats['local']} decididos localmente, {stats['llm']} enviados ao LLM"
+    for key, label in (('audited', 'conferidos'), ('guessed', 'abaixo do limiar')):
+        if stats[key]:
+            line += f"; {label}: {100 * stats[f'{key}_agreement']:.0f}% de concordância ({stats[key]})"
+    print(line)
+
+
+def print_spending(spend_cap) -> None:
+    """Mostra o gasto previsto acumulado e quantos mods ficaram sem orçamento."""
+    if spend_cap is None:
+        return
+    print(f"Gasto previsto: US$ {spend_cap.spent:.4f} de US$ {spend_cap.max_usd:.4f}"
+          f"{f'  Sem orçamento: {spend_cap.refused}' if spend_cap.refused else ''}")
+
+
+def print_token_usage(async_llm: bool = False) -> None:
+    """Mostra os tokens de entrada lidos do cache de prompt do provedor."""
+    if not os.getenv('LLM_API_KEY'):
+        return
+    if async_llm:
+        from async_llm_client import get_async_llm_client as get_llm_client
+    else:
+        from llm_client import get_llm_client
+    stats = get_llm_client().usage_stats()
+    if not stats['calls']:
+        return
+    share = 100 * stats['cached_tokens'] / stats['input_tokens'] if stats['input_tokens'] else 0
+    print(f"Tokens de entrada: {stats['input_tokens']} em {stats['calls']} chamadas, "
+          f"{stats['cached_tokens']} do cache de prompt ({share:.0f}%); "
+          f"saída: {stats['output_tokens']}")
+    if stats.get('repairs'):
+        print(f"Chamadas de reparo de respostas inválidas: {stats['repairs']}")
+
+
+def print_hedging(cascade=None) -> None:
+    """Mostra a taxa de hedge e o tempo poupado em cada modelo primário."""
+    if not os.getenv('LLM_HEDGE_MODEL'):
+        return
+    from llm_client import get_llm_client
+    for model in (cascade.models if cascade is not None else [None]):
+        client = get_llm_client(model=model)
+        stats = client.hedge_stats()
+        if not stats or not stats['requests']:
+            continue
+        saved = stats['saved_seconds'] / stats['saved_samples'] if stats['saved_samples'] else 0.0
+        print(f"Hedge {client.model} -> {client.hedge_model}: {stats['hedged']} de "
+              f"{stats['requests']} requisições ({100 * stats['hedge_rate']:.0f}%), "
+              f"{stats['secondary_wins']} vencidas pelo secundário, {stats['failover']} após falha; "
+              f"prazo atual {stats['deadline']:.2f}s; tempo poupado {stats['saved_seconds']:.1f}s "
+              f"(média {saved:.2f}s)")
+
+
+def print_fetcher(pipeline) -> None:
+    """Mostra páginas baixadas, novas tentativas e bloqueios do AsyncFetcher."""
+    if not pipeline.async_fetch:
+        return
+    from async_fetcher import get_async_fetcher
+    stats = get_async_fetcher().stats()
+    print(f"Download assíncrono: {stats['fetched']} páginas, {stats['not_modified']} não modificadas, "
+          f"{stats['retried']} novas tentativas (429/503/conexão), "
+          f"{stats['redirected']} redirecionamentos, "
+          f"{stats['robots_blocked']} bloqueadas pelo robots.txt")
+
+
+def print_metrics(args) -> None:
+    """Mostra p50/p95/p99 de cada etapa e grava as métricas em --metrics-out."""
+    rows = [row for row in get_metrics().summary() if row['name'] == 'stage_seconds']
+    for row in rows:
+        print(f"Etapa {row['labels']['stage']}: {row['count']}x, p50 {1000 * row['p50']:.0f} ms, "
+              f"p95 {1000 * row['p95']:.0f} ms, p99 {1000 * row['p99']:.0f} ms")
+    if args.metrics_out:
+        get_metrics().write(args.metrics_out)
+        print(f"Métricas gravadas em {args.metrics_out}")
+
+
+def print_decisions(counts: dict) -> None:
+    """Exibe quantos mods foram novos, reclassificados, pulados ou retomados."""
+    print(f"Novos: {counts.get('new', 0)}  Reclassificados: {counts.get('reclassified', 0)}  "
+          f"Pulados (inalterados): {counts.get('skipped', 0)}")
+    if counts.get('resumed'):
+        print(f"Já concluídos em execução anterior (retomada): {counts['resumed']}")
+
+
+def run_batch(argv) -> int:
+    """
+    Executa o modo lote: classifica vários mods a partir de um CSV/JSONL.
+    
+    Args:
+        argv: Argumentos após o subcomando "batch"
+        
+    Returns:
+        int: Código de saída do processo
+    """
+    import argparse
+    from batch_runner import BatchRunner, read_batch_input
+    
+    parser = argparse.ArgumentParser(
+        prog='main.py batch',
+        description='Classifica vários mods a partir de um arquivo CSV ou JSONL'
+    )
+    parser.add_argument('input', help='Arquivo .csv (url,page_id) ou .jsonl ({"url", "page_id"})')
+    parser.add_argument('-o', '--output', default='results.jsonl',
+                        help='Arquivo JSONL de saída (padrão: results.jsonl)')
+    parser.add_argument('--scrape-workers', type=int, default=4,
+                        help='Extrações simultâneas (padrão: 4)')
+    parser.add_argument('--llm-workers', type=int, default=2,
+                        help='Chamadas simultâneas ao LLM (padrão: 2)')
+    parser.add_argument('--notion-workers', type=int, default=1,
+                        help='Gravações simultâneas no Notion (padrão: 1)')
+    parser.add_argument('--provider-batch', action='store_true',
+                        help='Usa a API de lote do provedor (OpenAI/Anthropic): mais barato, '
+                             'resultado em até 24h')
+    parser.add_argument('--poll-interval', type=float, default=30.0,
+                        help='Intervalo entre consultas ao job de lote em segundos (padrão: 30)')
+    parser.add_argument('--pack', type=int, default=None, metavar='N',
+                        help='Envia até N mods curtos por requisição ao LLM (ex.: CAS/Build)')
+    parser.add_argument('--async-llm', action='store_true',
+                        default=os.getenv('LLM_ASYNC', '0') == '1',
+                        help='Classifica pelos clientes assíncronos dos SDKs (um event loop '
+                             'em vez de uma thread bloqueada por chamada)')
+    add_cache_args(parser)
+    add_journal_args(parser)
+    args = parser.parse_args(argv)
+    if args.pack is not None and args.provider_batch:
+        parser.error('--pack não pode ser usado com --provider-batch')
+    if (args.pack is not None or args.provider_batch) and (args.cascade or os.getenv('LLM_HEDGE_MODEL')):
+        # Pacotes e jobs de lote são uma requisição para vários mods, com um único modelo
+        parser.error('--pack e --provider-batch não suportam a cascata (--cascade) '
+                     'nem o hedge (LLM_HEDGE_MODEL)')
+    if args.async_llm:
+        if args.pack is not None or args.provider_batch:
+            parser.error('--async-llm não pode ser usado com --pack nem com --provider-batch')
+        if args.cascade or os.getenv('LLM_HEDGE_MODEL'):
+            parser.error('--async-llm não suporta a cascata (--cascade) nem o hedge (LLM_HEDGE_MODEL)')
+    
+    pipeline = ModClassifierPipeline(
+        use_cache=not args.no_cache, refresh_cache=args.refresh_cache,
+        state_store=get_default_state_store(), force=args.force,
+        spend_cap=make_spend_cap(args), pre_classifier=make_pre_classifier(args),
+        cascade=make_cascade(args), async_fetch=args.async_fetch, async_llm=args.async_llm
+    )
+    journal = make_journal(args, 'batch:' + os.path.abspath(args.input))
+    runner = BatchRunner(
+        pipeline,
+        scrape_workers=args.scrape_workers,
+        llm_workers=args.llm_workers,
+        notion_workers=args.notion_workers,
+        journal=journal
+    )
+    if args.provider_batch:
+        counts = runner.run_provider_batch(
+            read_batch_input(args.input), args.output, poll_interval=args.poll_interval
+        )
+    elif args.pack:
+        counts = runner.run_packed(read_batch_input(args.input), args.output, pack_size=args.pack)
+    else:
+        counts = runner.run(read_batch_input(args.input), args.output)
+    
+    print(f"\nResultados gravados em {args.output}")
+    print(f"OK: {counts['ok']}  Erros: {counts['error']}  Total: {counts['total']}")
+    print_decisions(counts)
+    finish_journal(journal, counts)
+    print_spending(pipeline.spend_cap)
+    print_token_usage(pipeline.async_llm)
+    print_pre_classifier(pipeline.pre_classifier)
+    print_cascade(pipeline.cascade)
+    print_hedging(pipeline.cascade)
+    print_fetcher(pipeline)
+    print_metrics(args)
+    
+    cache = get_default_cache() if not args.no_cache else None
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Cache de classificações: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entradas")
+    
+    from web_scraper import get_scraper
+    scraper = get_scraper()
+    if scraper.cache is not None:
+        stats = scraper.cache_stats()
+        print(f"Cache HTTP: {stats['hit']} hits (304), {stats['revalidate']} revalidados, "
+              f"{stats['miss']} misses")
+    print()
+    return 0 if counts['error'] == 0 else 2
+
+
+def run_sync(argv) -> int:
+    """
+    Executa o modo sync: classifica as linhas pendentes da database do Notion.
+    
+    Args:
+        argv: Argumentos após o subcomando "sync"
+        
+    Returns:
+        int: Código de saída do processo
+    """
+    import argparse
+    from batch_runner import BatchRunner
+    from notion_sync import NotionSync
+    from notion_updater import get_notion_updater
+    from web_scraper import get_scraper
+    
+    parser = argparse.ArgumentParser(
+        prog='main.py sync',
+        description='Classifica os mods da database do Notion sem Priority ou com URL/conteúdo alterado'
+    )
+    parser.add_argument('-o', '--output', default='sync_results.jsonl',
+                        help='Arquivo JSONL de saída (padrão: sync_results.jsonl)')
+    parser.add_argument('--url-property', default=None,
+                        help='Propriedade com a URL do mod (padrão: NOTION_URL_PROPERTY ou "URL")')
+    parser.add_argument('--check-content', action='store_true',
+                        help='Baixa páginas já classificadas para detectar conteúdo alterado')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Máximo de mods a classificar nesta execução')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Apenas lista as linhas que seriam classificadas')
+    parser.add_argument('--scrape-workers', type=int, default=4)
+    parser.add_argument('--llm-workers', type=int, default=2)
+    parser.add_argument('--notion-workers', type=int, default=1)
+    add_cache_args(parser)
+    add_journal_args(parser)
+    args = parser.parse_args(argv)
+    
+    state = get_default_state_store()
+    sync = NotionSync(
+        get_notion_updater(), state,
+        scraper=get_scraper() if args.check_content else None,
+        url_property=args.url_property,
+        check_content=args.check_content
+    )
+    candidates = sync.iter_candidates(limit=args.limit)
+    
+    if args.dry_run:
+        for mod_url, notion_page_id in candidates:
+            print(f"{notion_page_id}\t{mod_url}")
+        counts = {'error': 0}
+    else:
+        pipeline = ModClassifierPipeline(
+            use_cache=not args.no_cache, refresh_cache=args.refresh_cache,
+            state_store=state, force=args.force, spend_cap=make_spend_cap(args),
+            pre_classifier=make_pre_classifier(args), cascade=make_cascade(args),
+            async_fetch=args.async_fetch, forced_keys=sync.forced
+        )
+        journal = make_journal(args, 'sync:' + (sync.updater.database_id or ''))
+        runner = BatchRunner(
+            pipeline,
+            scrape_workers=args.scrape_workers,
+            llm_workers=args.llm_workers,
+            notion_workers=args.notion_workers,
+            journal=journal
+        )
+        counts = runner.run(candidates, args.output)
+        print(f"\nResultados gravados em {args.output}")
+        print(f"OK: {counts['ok']}  Erros: {counts['error']}  Total: {counts['total']}")
+        print_decisions(counts)
+        finish_journal(journal, counts)
+        print_spending(pipeline.spend_cap)
+        print_token_usage()
+        print_pre_classifier(pipeline.pre_classifier)
+        print_cascade(pipeline.cascade)
+        print_hedging(pipeline.cascade)
+        print_fetcher(pipeline)
+        print_metrics(args)
+    
+    stats = sync.stats
+    print(f"Linhas lidas: {stats['rows']}  Pendentes: {stats['queued']}  "
+          f"Puladas: {stats['skipped']}  Sem URL: {stats['no_url']}\n")
+    return 0 if counts['error'] == 0 else 2
+
+
+def run_serve(argv) -> int:
+    """
+    Modo daemon: API HTTP local que mantém clientes e caches aquecidos.
+    
+    Args:
+        argv: Argumentos após "serve"
+        
+    Returns:
+        int: Código de saída do processo
+    """
+    import argparse
+    from classifier_daemon import DEFAULT_HOST, DEFAULT_PORT, ClassifierDaemon, serve
+    
+    parser = argparse.ArgumentParser(
+        prog='main.py serve',
+        description='Recebe mods por HTTP (POST /jobs) e classifica em segundo plano'
+    )
+    parser.add_argument('--host', default=os.getenv('DAEMON_HOST', DEFAULT_HOST),
+                        help=f'Endereço de escuta (padrão: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=int(os.getenv('DAEMON_PORT', DEFAULT_PORT)),
+                        help=f'Porta (padrão: {DEFAULT_PORT})')
+    parser.add_argument('--scrape-workers', type=int, default=4)
+    parser.add_argument('--llm-workers', type=int, default=2)
+    parser.add_argument('--notion-workers', type=int, default=1)
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help='Jobs na fila + em execução antes de responder 429 (padrão: 4x o pool)')
+    add_cache_args(parser)
+    args = parser.parse_args(argv)
+    
+    pipeline = ModClassifierPipeline(
+        use_cache=not args.no_cache, refresh_cache=args.refresh_cache,
+        state_store=get_default_state_store(), force=args.force,
+        spend_cap=make_spend_cap(args), pre_classifier=make_pre_classifier(args),
+        cascade=make_cascade(args), async_fetch=args.async_fetch
+    )
+    daemon = ClassifierDaemon(
+        pipeline,
+        scrape_workers=args.scrape_workers,
+        llm_workers=args.llm_workers,
+        notion_workers=args.notion_workers,
+        max_pending=args.max_pending
+    )
+    daemon.warm_up()
+    serve(daemon, host=args.host, port=args.port)
+    
+    stats = daemon.stats()
+    print(f"\nJobs: {stats['submitted']} recebidos, {stats['ok']} ok, {stats['error']} erros, "
+          f"{stats['deduplicated']} repetidos, {stats['rejected']} recusados (fila cheia)")
+    print_spending(pipeline.spend_cap)
+    print_token_usage()
+    print_pre_classifier(pipeline.pre_classifier)
+    print_cascade(pipeline.cascade)
+    print_hedging(pipeline.cascade)
+    print_fetcher(pipeline)
+    print_metrics(args)
+    return 0
+
+
 def main():
     """
     Função principal do script.
     """
+    setup()
+    if len(sys.argv) >= 2 and sys.argv[1] == 'batch':
+        sys.exit(run_batch(sys.argv[2:]))
+    if len(sys.argv) >= 2 and sys.argv[1] == 'sync':
+        sys.exit(run_sync(sys.argv[2:]))
+    if len(sys.argv) >= 2 and sys.argv[1] == 'serve':
+        sys.exit(run_serve(sys.argv[2:]))
+    
     if len(sys.argv) < 2:
-        print("""\nUso: python main.py <mod_url> [notion_page_id]
+        print("""\nUso: python main.py <mod_url> [notion_page_id] [--no-cache | --refresh-cache]
+       python main.py batch <arquivo.csv|arquivo.jsonl> [-o results.jsonl]
+       python main.py sync [--check-content] [--limit N] [--dry-run]
+       python main.py serve [--port 8787] [--max-pending N]
         
 Exemplos:
   python main.py "https://modthesims.info/d/12345"
   python main.py "https://modthesims.info/d/12345" "abc123def456"
+  python main.py batch mods.csv -o resultados.jsonl --llm-workers 4
+  python main.py sync --limit 200
+  python main.py serve --llm-workers 4
   
 Variaveis de ambiente necessárias:
   LLM_API_KEY        - API key do provedor LLM
   LLM_MODEL          - Modelo LLM (padrão: gpt-4o)
   NOTION_API_KEY     - Token de integração do Notion
   NOTION_DATABASE_ID - ID da database do Notion (opcional)
+  LLM_CACHE          - "0" desabilita o cache de classificações
+  LLM_CACHE_PATH     - Arquivo SQLite do cache (padrão: .cache/classifications.sqlite3)
         """)
         sys.exit(1)
     
-    mod_url = sys.argv[1]
-    notion_page_id = sys.argv[2] if len(sys.argv) > 2 else None
+    import argparse
+    parser = argparse.ArgumentParser(prog='main.py')
+    parser.add_argument('mod_url')
+    parser.add_argument('notion_page_id', nargs='?')
+    add_cache_args(parser)
+    args = parser.parse_args()
+    
+    mod_url = args.mod_url
+    notion_page_id = args.notion_page_id
     
     try:
-        pipeline = ModClassifierPipeline()
+        pipeline = ModClassifierPipeline(
+            use_cache=not args.no_cache, refresh_cache=args.refresh_cache,
+            state_store=get_default_state_store(), force=args.force,
+            spend_cap=make_spend_cap(args), pre_classifier=make_pre_classifier(args),
+            cascade=make_cascade(args), async_fetch=args.async_fetch
+        )
         result = pipeline.process_mod(mod_url, notion_page_id)
         
         # Exibe resultado formatado
         print("\n" + "="*70)
         print("🎮  RESULTADO DA CLASSIFICAÇÃO")
         print("="*70)
-        print(f"\nPrioridade: {result['priority']} ({result.get('priority_label', '')})")
+        print(f"\nDecisão: {result.get('decision', 'new')}")
+        print(f"Prioridade: {result['priority']} ({result.get('priority_label', '')})")
         
         if result.get('sub_category'):
             print(f"Sub-categoria: {result['sub_category']} - {result.get('sub_category_label', '')}")
         
         print(f"\nJustificativa:")
         print(f"{result.get('notes_reason', 'N/A')}")
+        
+        stages = [f"{item['stage']} {item['ms']:.0f} ms" for item in result['metrics']
+                  if item['stage'] in ('scrape', 'classify', 'notion')]
+        print(f"\nEtapas: {', '.join(stages)}")
         print("\n" + "="*70 + "\n")
+        if args.metrics_out:
+            get_metrics().write(args.metrics_out)
         
         sys.exit(0)
         
     except Exception as e:
-        logger.error(f"Erro fatal: {str(e)}")
+        logger.error("Erro fatal: %s", e)
         sys.exit(1)
 
 
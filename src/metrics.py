@@ -0,0 +1,267 @@
+"""Metrics Module - Spans por etapa, histogramas por execução e exportação (Prometheus/JSONL)."""
+
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from client_registry import registry
+
+PREFIX = 'ts4'
+
+# Amostras guardadas por série para os percentis (count e sum são exatos)
+MAX_SAMPLES = 10000
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_local = threading.local()
+
+
+def percentile(values: List[float], quantile: float) -> float:
+    """Percentil por vizinho mais próximo (0 se não houver amostras)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(quantile * (len(ordered) - 1))))]
+
+
+class MetricsRegistry:
+    """
+    Histogramas e contadores agregados da execução.
+
+    Cada série é identificada pelo nome e pelos rótulos (ex.:
+    stage_seconds{stage="scrape"}). Os histogramas guardam as últimas
+    MAX_SAMPLES amostras para p50/p95/p99, então o custo fica limitado
+    mesmo no modo daemon.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple, Dict] = {}
+        self._counters: Dict[Tuple, float] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict) -> Tuple:
+        return (name,) + tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Registra uma amostra no histograma name{labels}."""
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    'count': 0, 'sum': 0.0, 'samples': deque(maxlen=MAX_SAMPLES)
+                }
+            histogram['count'] += 1
+            histogram['sum'] += value
+            histogram['samples'].append(value)
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """Soma value ao contador name{labels}."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def summary(self) -> List[Dict]:
+        """
+        Resume todas as séries.
+
+        Returns:
+            Lista de dicts com name, labels, type ('histogram' ou 'counter') e
+            count/sum/p50/p95/p99 (histogramas) ou value (contadores)
+        """
+        with self._lock:
+            histograms = [(key, dict(h, samples=list(h['samples']))) for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+        rows = []
+        for key, histogram in sorted(histograms):
+            row = {'name': key[0], 'labels': dict(key[1:]), 'type': 'histogram',
+                   'count': histogram['count'], 'sum': round(histogram['sum'], 6)}
+            for quantile in QUANTILES:
+                row[f'p{int(quantile * 100)}'] = round(percentile(histogram['samples'], quantile), 6)
+            rows.append(row)
+        for key, value in sorted(counters):
+            rows.append({'name': key[0], 'labels': dict(key[1:]), 'type': 'counter', 'value': value})
+        return rows
+
+    def to_prometheus(self) -> str:
+        """Exporta as séries no formato texto do Prometheus (histogramas como summary)."""
+        lines = []
+        typed = set()
+        for row in self.summary():
+            name = f"{PREFIX}_{row['name']}"
+            if name not in typed:
+                lines.append(f"# TYPE {name} {'summary' if row['type'] == 'histogram' else 'counter'}")
+                typed.add(name)
+            if row['type'] == 'counter':
+                lines.append(f"{name}{_labels(row['labels'])} {row['value']}")
+                continue
+            for quantile in QUANTILES:
+                labels = dict(row['labels'], quantile=str(quantile))
+                lines.append(f"{name}{_labels(labels)} {row[f'p{int(quantile * 100)}']}")
+            lines.append(f"{name}_sum{_labels(row['labels'])} {row['sum']}")
+            lines.append(f"{name}_count{_labels(row['labels'])} {row['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str) -> None:
+        """
+        Grava as métricas em arquivo.
+
+        Args:
+            path: Arquivo .prom (texto do Prometheus) ou qualquer outro (JSON lines,
+                uma série por linha)
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.prom'):
+                f.write(self.to_prometheus())
+                return
+            for row in self.summary():
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def reset(self) -> None:
+        """Descarta todas as séries."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' '))
+        for key, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def get_metrics() -> MetricsRegistry:
+    """Retorna o registro de métricas compartilhado do processo."""
+    return registry.get_or_create(('metrics',), MetricsRegistry)
+
+
+@contextmanager
+def trace() -> Iterator[List[Dict]]:
+    """
+    Coleta os spans de um mod na thread atual.
+
+    Yields:
+        Lista preenchida com um dict por span concluído (na ordem de término)
+    """
+    previous = getattr(_local, 'trace', None), getattr(_local, 'stack', None)
+    spans: List[Dict] = []
+    _local.trace, _local.stack = spans, []
+    try:
+        yield spans
+    finally:
+        _local.trace, _local.stack = previous
+
+
+@contextmanager
+def span(stage: str, **attrs) -> Iterator[Dict]:
+    """
+    Mede uma etapa: duração no histograma stage_seconds{stage} e, dentro de
+    um trace(), um dict com stage, ms e os atributos anotados.
+
+    Args:
+        stage: Nome da etapa (scrape, classify, llm, notion, ...)
+        **attrs: Atributos iniciais do span
+
+    Yields:
+        Dict de atributos do span (também alterável com annotate())
+    """
+    record = dict(attrs)
+    stack = getattr(_local, 'stack', None)
+    if stack is not None:
+        stack.append(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        if stack is not None:
+            stack.pop()
+        record_span(stage, time.perf_counter() - started, **record)
+
+
+def record_span(stage: str, seconds: float, **attrs) -> Dict:
+    """
+    Registra uma etapa já medida (ex.: concluída em outra thread ou event loop).
+
+    Args:
+        stage: Nome da etapa
+        seconds: Duração medida
+        **attrs: Atributos do span
+
+    Returns:
+        Dict do span (stage, ms e atributos), também acrescentado ao trace() da thread
+    """
+    get_metrics().observe('stage_seconds', seconds, stage=stage)
+    record = {'stage': stage, 'ms': round(seconds * 1000, 1), **attrs}
+    spans = getattr(_local, 'trace', None)
+    if spans is not None:
+        spans.append(record)
+    return record
+
+
+def current_trace() -> Optional[Tuple[List[Dict], Optional[Dict]]]:
+    """
+    Captura o trace da thread atual para continuá-lo em outra thread (ver use_trace).
+
+    Returns:
+        Tupla (spans do trace, span aberto mais interno ou None), ou None fora de um trace()
+    """
+    spans = getattr(_local, 'trace', None)
+    if spans is None:
+        return None
+    stack = _local.stack
+    return spans, (stack[-1] if stack else None)
+
+
+@contextmanager
+def use_trace(context: Optional[Tuple[List[Dict], Optional[Dict]]]) -> Iterator[None]:
+    """
+    Continua na thread atual um trace capturado com current_trace().
+
+    Os spans concluídos entram na lista do trace original e annotate()
+    fora de um span desta thread vai para o span aberto na captura.
+
+    Args:
+        context: Retorno de current_trace() (None: a thread fica sem trace)
+    """
+    previous = getattr(_local, 'trace', None), getattr(_local, 'stack', None)
+    if context is None:
+        _local.trace, _local.stack = None, None
+    else:
+        spans, record = context
+        _local.trace, _local.stack = spans, [record] if record is not None else []
+    try:
+        yield
+    finally:
+        _local.trace, _local.stack = previous
+
+
+def annotate(**attrs) -> None:
+    """
+    Acrescenta atributos ao span aberto mais interno da thread (sem trace, não faz nada).
+
+    Valores numéricos são somados aos que já existem (ex.: tokens de uma
+    chamada de reparo somam aos da chamada original).
+    """
+    stack = getattr(_local, 'stack', None)
+    if not stack:
+        return
+    record = stack[-1]
+    for key, value in attrs.items():
+        current = record.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) \
+                and isinstance(current, (int, float)) and not isinstance(current, bool):
+            record[key] = round(current + value, 6)
+        else:
+            record[key] = value
+
@@ -0,0 +1,149 @@
+"""Mod State Module - Registro local (SQLite) do que já foi classificado por página."""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from client_registry import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = '.cache/mod_state.sqlite3'
+
+
+def content_hash(mod_content: Dict) -> str:
+    """
+    Hash do texto extraído de um mod (espaços normalizados).
+
+    Args:
+        mod_content: Conteúdo retornado pelo WebScraper
+
+    Returns:
+        Hash SHA-256 em hexadecimal
+    """
+    text = ' '.join(str(mod_content.get('full_text') or '').split())
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _key(page_id: str) -> str:
+    """Normaliza o ID da página (com ou sem hífens); URLs são usadas como estão."""
+    if '://' in page_id:
+        return page_id
+    return page_id.replace('-', '').lower()
+
+
+class ModStateStore:
+    """
+    Estado por mod (página do Notion ou URL): fingerprint da última classificação.
+
+    Guarda a URL, o hash do conteúdo extraído, a versão do prompt, o modelo
+    e a classificação gravada. O pipeline usa esses dados para pular o LLM
+    e o Notion quando nada mudou, e o modo sync para saber quais linhas já
+    classificadas tiveram a URL ou o conteúdo alterados.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        """
+        Inicializa o registro.
+
+        Args:
+            path: Caminho do arquivo SQLite
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS mod_state (
+                page_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                content_hash TEXT,
+                classified_at REAL NOT NULL,
+                prompt_version TEXT,
+                model TEXT,
+                classification TEXT
+            )
+            """
+        )
+        # Bases criadas antes do fingerprint completo não têm as novas colunas
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(mod_state)")}
+        for column in ('prompt_version', 'model', 'classification'):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE mod_state ADD COLUMN {column} TEXT")
+        self._conn.commit()
+
+    def get(self, page_id: str) -> Optional[Dict]:
+        """
+        Retorna o estado registrado da página.
+
+        Args:
+            page_id: ID da página no Notion
+
+        Returns:
+            Dict com url, content_hash, classified_at, prompt_version, model
+            e classification, ou None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, content_hash, classified_at, prompt_version, model, classification "
+                "FROM mod_state WHERE page_id = ?",
+                (_key(page_id),)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'url': row[0],
+            'content_hash': row[1],
+            'classified_at': row[2],
+            'prompt_version': row[3],
+            'model': row[4],
+            'classification': json.loads(row[5]) if row[5] else None,
+        }
+
+    def record(self, page_id: str, url: str, mod_content: Dict,
+               prompt_version: Optional[str] = None, model: Optional[str] = None,
+               classification: Optional[Dict] = None) -> None:
+        """
+        Registra que o mod foi classificado com este conteúdo.
+
+        Args:
+            page_id: ID da página no Notion (ou a URL, para mods sem página)
+            url: URL do mod
+            mod_content: Conteúdo extraído que foi classificado
+            prompt_version: Versão (hash) do prompt do classificador
+            model: Modelo que classificou
+            classification: Classificação gravada
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mod_state "
+                "(page_id, url, content_hash, classified_at, prompt_version, model, classification) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (_key(page_id), url, content_hash(mod_content), time.time(),
+                 prompt_version, model,
+                 json.dumps(classification, ensure_ascii=False) if classification else None)
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Fecha a conexão com o SQLite."""
+        with self._lock:
+            self._conn.close()
+
+
+def get_default_state_store() -> ModStateStore:
+    """
+    Retorna o registro de estado compartilhado (caminho em MOD_STATE_PATH).
+
+    Returns:
+        ModStateStore compartilhado no processo
+    """
+    path = os.getenv('MOD_STATE_PATH', DEFAULT_STATE_PATH)
+    return registry.get_or_create(('mod_state', path), lambda: ModStateStore(path))
@@ -0,0 +1,136 @@
+"""Notion Sync Module - Descobre na database do Notion os mods que precisam de classificação."""
+
+import os
+import logging
+from typing import Dict, Iterator, Optional, Tuple
+
+from mod_state import ModStateStore, content_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL_PROPERTY = 'URL'
+PRIORITY_PROPERTY = 'Priority'
+
+
+def get_row_url(page: Dict, url_property: str = DEFAULT_URL_PROPERTY) -> Optional[str]:
+    """
+    Lê a URL do mod de uma linha da database.
+
+    Usa a propriedade indicada (tipo url, rich_text ou title) e, se ela
+    não existir, a primeira propriedade do tipo url.
+
+    Args:
+        page: Objeto de página do Notion
+        url_property: Nome da propriedade com a URL do mod
+
+    Returns:
+        URL ou None se a linha não tiver URL
+    """
+    properties = page.get('properties', {})
+    prop = properties.get(url_property)
+    if prop is None:
+        prop = next((p for p in properties.values() if p.get('type') == 'url'), None)
+    if not prop:
+        return None
+
+    prop_type = prop.get('type')
+    if prop_type == 'url':
+        return prop.get('url') or None
+    if prop_type in ('rich_text', 'title'):
+        text = ''.join(rt.get('plain_text', '') for rt in prop.get(prop_type, []))
+        return text.strip() or None
+    return None
+
+
+def has_priority(page: Dict) -> bool:
+    """Indica se a linha já tem Priority definida (select ou number)."""
+    prop = page.get('properties', {}).get(PRIORITY_PROPERTY) or {}
+    if prop.get('type') == 'select':
+        return prop.get('select') is not None
+    if prop.get('type') == 'number':
+        return prop.get('number') is not None
+    return False
+
+
+class NotionSync:
+    """
+    Percorre a database do Notion e seleciona as linhas a classificar.
+
+    Uma linha é enviada ao pipeline se não tem Priority, se a URL mudou
+    desde a última classificação ou (com check_content) se o texto da
+    página mudou. A database é lida em streaming, página a página.
+    """
+
+    def __init__(self, updater, state: ModStateStore, scraper=None,
+                 url_property: Optional[str] = None, check_content: bool = False):
+        """
+        Inicializa a sincronização.
+
+        Args:
+            updater: NotionUpdater com database_id configurado
+            state: Registro local das classificações anteriores
+            scraper: WebScraper (obrigatório com check_content)
+            url_property: Propriedade com a URL (padrão: NOTION_URL_PROPERTY ou "URL")
+            check_content: Se True, baixa páginas já classificadas para detectar mudanças
+        """
+        self.updater = updater
+        self.state = state
+        self.scraper = scraper
+        self.url_property = url_property or os.getenv('NOTION_URL_PROPERTY', DEFAULT_URL_PROPERTY)
+        self.check_content = check_content
+        self.stats = {'rows': 0, 'no_url': 0, 'skipped': 0, 'queued': 0}
+        # Linhas sem Priority: reclassificadas mesmo com fingerprint inalterado
+        self.forced = set()
+
+    def _decide(self, page: Dict, url: str) -> Optional[str]:
+        """Retorna o motivo para classificar a linha, ou None para pular."""
+        if not has_priority(page):
+            return 'unclassified'
+
+        previous = self.state.get(page['id'])
+        if previous is None:
+            # Classificada manualmente ou antes do registro de estado existir
+            return None
+        if previous['url'] != url:
+            return 'url_changed'
+
+        if self.check_content and self.scraper is not None and previous.get('content_hash'):
+            try:
+                mod_content = self.scraper.extract_content(url)
+            except Exception as e:
+                logger.warning("Não foi possível verificar %s: %s", url, e)
+                return None
+            if content_hash(mod_content) != previous['content_hash']:
+                return 'content_changed'
+        return None
+
+    def iter_candidates(self, limit: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Produz os pares (url, page_id) que devem ser classificados.
+
+        Args:
+            limit: Número máximo de linhas a produzir
+
+        Yields:
+            Tuplas (url, page_id)
+        """
+        for page in self.updater.iter_database_pages():
+            self.stats['rows'] += 1
+            url = get_row_url(page, self.url_property)
+            if not url:
+                self.stats['no_url'] += 1
+                continue
+
+            reason = self._decide(page, url)
+            if reason is None:
+                self.stats['skipped'] += 1
+                continue
+
+            self.stats['queued'] += 1
+            if reason == 'unclassified':
+                self.forced.add(page['id'])
+            logger.info("Sync: %s (%s)", url, reason)
+            yield url, page['id']
+
+            if limit is not None and self.stats['queued'] >= limit:
+                break
@@ -2,12 +2,20 @@
 
 import os
 import logging
-from typing import Dict, Optional
-from notion_client import Client
+from typing import Dict, Iterable, Iterator, Optional
 from datetime import datetime
 
+from tenacity import Retrying
+
+from client_registry import import_lock, registry
+from metrics import span
+from rate_limit import TokenBucket, retry_policy
+
 logger = logging.getLogger(__name__)
 
+# Limite de caracteres de um rich_text do Notion
+NOTES_MAX_CHARS = 2000
+
 
 class NotionUpdater:
     """Cliente para atualizar páginas do Notion."""
@@ -26,9 +34,45 @@ class NotionUpdater:
         if not self.api_key:
             raise ValueError("Notion API key não fornecida")
         
-        self.client = Client(auth=self.api_key)
+        # SDK importado só quando há uma página para atualizar
+        with import_lock:
+            from notion_client import Client
+        # NOTION_BASE_URL aponta para outro servidor (ex.: o falso dos benchmarks)
+        base_url = os.getenv('NOTION_BASE_URL')
+        if base_url:
+            self.client = Client(auth=self.api_key, base_url=base_url)
+        else:
+            self.client = Client(auth=self.api_key)
+        
+        # O Notion permite ~3 requisições/s por integração
+        requests_per_second = float(os.getenv('NOTION_RPS', '3'))
+        self.rate_limiter = registry.get_or_create(
+            ('notion_rate_limiter', self.api_key),
+            lambda: TokenBucket(requests_per_second * 60, capacity=requests_per_second)
+        )
     
-    def update_page(self, page_id: str, classification: Dict) -> bool:
+    def _request(self, method, **kwargs):
+        """
+        Executa uma chamada à API do Notion respeitando o rate limit.
+        
+        Erros 429/5xx são repetidos automaticamente (Retry-After + backoff).
+        
+        Args:
+            method: Método do SDK (ex.: self.client.pages.update)
+            **kwargs: Argumentos da chamada
+            
+        Returns:
+            Resposta da API
+        """
+        endpoint = getattr(method, '__name__', 'request')
+        for attempt in Retrying(**retry_policy()):
+            with attempt:
+                self.rate_limiter.acquire()
+                with span('notion_request', endpoint=endpoint):
+                    return method(**kwargs)
+    
+    def update_page(self, page_id: str, classification: Dict,
+                    write_id: Optional[str] = None) -> bool:
         """
         Atualiza uma página do Notion com classificação.
         
@@ -37,44 +81,74 @@ class NotionUpdater:
         Args:
             page_id: ID da página no Notion
             classification: Dict com priority, priority_label, notes_reason, etc.
+            write_id: Id da gravação (JobJournal); se o Notes já tem o bloco com
+                esse id, a página não é alterada de novo
             
         Returns:
-            True se atualizado com sucesso
+            True se atualizado com sucesso (ou se já estava atualizado)
         """
         try:
-            logger.info(f"Atualizando página {page_id}...")
+            logger.debug("Atualizando página %s...", page_id)
             
             # 1. Primeiro, obtém o conteúdo atual da página
-            page = self.client.pages.retrieve(page_id=page_id)
+            page = self._request(self.client.pages.retrieve, page_id=page_id)
             
             # 2. Extrai o Notes atual (se existir)
             existing_notes = self._get_existing_notes(page)
+            if already_written(existing_notes, write_id):
+                logger.info("Página %s já tem a classificação %s; nada a gravar", page_id, write_id)
+                return True
             
-            # 3. Monta o novo conteúdo do Notes (APPEND)
-            new_notes_content = self._build_notes_content(classification)
-            
-            # 4. Combina Notes existente + novo conteúdo
-            if existing_notes and existing_notes.strip():
-                # APPEND: adiciona ao final do Notes existente
-                combined_notes = f"{existing_notes}\n\n{new_notes_content}"
-                logger.info("Adicionando classificação ao Notes existente (APPEND)")
-            else:
-                combined_notes = new_notes_content
-                logger.info("Criando novo Notes (não havia conteúdo anterior)")
-            
-            # 5. Prepara propriedades para atualizar
-            properties = self._build_properties(classification, combined_notes)
+            # 3-5. Monta Notes (APPEND) e propriedades
+            properties = self._compose_update(existing_notes, classification, write_id)
             
             # 6. Atualiza a página
-            self.client.pages.update(page_id=page_id, properties=properties)
+            self._request(self.client.pages.update, page_id=page_id, properties=properties)
             
-            logger.info(f"Página {page_id} atualizada com sucesso")
+            logger.debug("Página %s atualizada com sucesso", page_id)
             return True
             
         except Exception as e:
-            logger.error(f"Erro ao atualizar página {page_id}: {str(e)}")
+            logger.error("Erro ao atualizar página %s: %s", page_id, e)
             raise
     
+    def _compose_update(self, existing_notes: str, classification: Dict,
+                        write_id: Optional[str] = None) -> Dict:
+        """
+        Combina o Notes existente com a nova classificação (APPEND).
+        
+        Args:
+            existing_notes: Conteúdo atual do Notes
+            classification: Classificação do mod
+            write_id: Id da gravação incluído no cabeçalho do bloco (opcional)
+            
+        Returns:
+            Dict de propriedades no formato do Notion
+        """
+        # Monta o novo conteúdo do Notes
+        new_notes_content = self._build_notes_content(classification, write_id)
+        
+        # Combina Notes existente + novo conteúdo
+        if existing_notes and existing_notes.strip():
+            # APPEND: adiciona ao final do Notes existente
+            combined_notes = f"{existing_notes}\n\n{new_notes_content}"
+            logger.debug("Adicionando classificação ao Notes existente (APPEND)")
+        else:
+            combined_notes = new_notes_content
+            logger.debug("Criando novo Notes (não havia conteúdo anterior)")
+        
+        # Acima do limite do Notion o corte é no conteúdo antigo: o bloco novo
+        # (com a marca do write_id no cabeçalho) precisa chegar inteiro
+        if len(combined_notes) > NOTES_MAX_CHARS:
+            if len(new_notes_content) >= NOTES_MAX_CHARS - 1:
+                combined_notes = new_notes_content[:NOTES_MAX_CHARS]
+            else:
+                combined_notes = '…' + combined_notes[-(NOTES_MAX_CHARS - 1):]
+            logger.debug("Notes acima de %d caracteres; início do conteúdo antigo descartado",
+                         NOTES_MAX_CHARS)
+        
+        return self._build_properties(classification, combined_notes)
+    
     def _get_existing_notes(self, page: Dict) -> str:
         """
         Extrai o conteúdo atual do campo Notes.
@@ -99,23 +173,27 @@ class NotionUpdater:
             return ''
             
         except Exception as e:
-            logger.warning(f"Erro ao extrair Notes existente: {e}")
+            logger.warning("Erro ao extrair Notes existente: %s", e)
             return ''
     
-    def _build_notes_content(self, classification: Dict) -> str:
+    def _build_notes_content(self, classification: Dict, write_id: Optional[str] = None) -> str:
         """
         Constrói o conteúdo a ser adicionado ao Notes.
         
         Args:
             classification: Dict com a classificação
+            write_id: Id da gravação, anexado ao cabeçalho (opcional)
             
         Returns:
             Texto formatado para adicionar ao Notes
         """
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
+        header = f"Classificação Automática - {timestamp}"
+        if write_id:
+            header += f" {write_marker(write_id)}"
         
         content_parts = [
-            f"[Classificação Automática - {timestamp}]",
+            f"[{header}]",
             f"Priority: {classification.get('priority')} ({classification.get('priority_label', '')})"
         ]
         
@@ -162,7 +240,7 @@ class NotionUpdater:
             'rich_text': [
                 {
                     'type': 'text',
-                    'text': {'content': combined_notes[:2000]}  # Notion limit
+                    'text': {'content': combined_notes[:NOTES_MAX_CHARS]}  # Notion limit
                 }
             ]
         }
@@ -180,27 +258,249 @@ class NotionUpdater:
             Objeto da página
         """
         try:
-            return self.client.pages.retrieve(page_id=page_id)
+            return self._request(self.client.pages.retrieve, page_id=page_id)
         except Exception as e:
-            logger.error(f"Erro ao obter página {page_id}: {e}")
+            logger.error("Erro ao obter página %s: %s", page_id, e)
             raise
+    
+    def iter_database_pages(self, page_size: int = 100,
+                            query_filter: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Percorre as páginas da database, uma página de resultados por vez.
+        
+        Os resultados são produzidos conforme a paginação avança, sem
+        carregar a database inteira na memória.
+        
+        Args:
+            page_size: Linhas por chamada de databases.query (máx. 100)
+            query_filter: Filtro opcional no formato da API do Notion
+            
+        Yields:
+            Objetos de página do Notion
+        """
+        if not self.database_id:
+            raise ValueError("NOTION_DATABASE_ID não configurado")
+        
+        cursor = None
+        while True:
+            kwargs = {'database_id': self.database_id, 'page_size': page_size}
+            if cursor:
+                kwargs['start_cursor'] = cursor
+            if query_filter:
+                kwargs['filter'] = query_filter
+            response = self._request(self.client.databases.query, **kwargs)
+            yield from response.get('results', [])
+            if not response.get('has_more'):
+                break
+            cursor = response.get('next_cursor')
+    
+    def close(self):
+        """Fecha o cliente HTTP do Notion."""
+        self.client.close()
+
+
+def write_marker(write_id: str) -> str:
+    """Marca do id da gravação no cabeçalho do bloco do Notes."""
+    return f"#{write_id}"
+
+
+def already_written(notes: str, write_id: Optional[str]) -> bool:
+    """True se o Notes já contém o bloco gravado com write_id."""
+    return bool(write_id) and f" {write_marker(write_id)}]" in notes
+
+
+def _normalize_page_id(page_id: str) -> str:
+    """Normaliza IDs do Notion (com ou sem hífens) para comparação."""
+    return page_id.replace('-', '').lower()
+
+
+class BulkNotionUpdater(NotionUpdater):
+    """
+    Atualizador do Notion para lotes grandes.
+    
+    As classificações são enfileiradas e gravadas em flush(). Várias
+    classificações da mesma página são coalescidas (vale a última), o Notes
+    existente de lotes grandes é obtido em poucas chamadas paginadas de
+    databases.query em vez de um pages.retrieve por página, e todas as
+    chamadas passam pelo token bucket do Notion com retry automático em
+    429/5xx.
+    """
+    
+    def __init__(self, api_key: Optional[str] = None, database_id: Optional[str] = None,
+                 flush_size: int = 100, scan_min_batch: Optional[int] = None,
+                 scan_max_requests: Optional[int] = None):
+        """
+        Inicializa o atualizador em lote.
+        
+        Args:
+            api_key: Notion API token (opcional, usa env var)
+            database_id: ID da database (opcional, usa env var)
+            flush_size: Grava automaticamente quando a fila atinge este tamanho
+            scan_min_batch: Menor lote que consulta a database em vez de
+                pages.retrieve (padrão: NOTION_SCAN_MIN_BATCH ou 10)
+            scan_max_requests: Máximo de chamadas de databases.query por flush
+                (padrão: NOTION_SCAN_MAX_REQUESTS ou 20)
+        """
+        super().__init__(api_key=api_key, database_id=database_id)
+        self.flush_size = flush_size
+        self.scan_min_batch = max(1, scan_min_batch or int(os.getenv('NOTION_SCAN_MIN_BATCH', 10)))
+        self.scan_max_requests = scan_max_requests or int(os.getenv('NOTION_SCAN_MAX_REQUESTS', 20))
+        self._pending: Dict[str, Dict] = {}
+        self._write_ids: Dict[str, Optional[str]] = {}
+        self.coalesced = 0
+    
+    def enqueue(self, page_id: str, classification: Dict,
+                write_id: Optional[str] = None) -> Dict[str, object]:
+        """
+        Enfileira a classificação de uma página.
+        
+        Args:
+            page_id: ID da página no Notion
+            classification: Classificação do mod
+            write_id: Id da gravação (JobJournal), como em update_page
+            
+        Returns:
+            Resultados do flush automático, se ele ocorreu (senão vazio)
+        """
+        if page_id in self._pending:
+            self.coalesced += 1
+        self._pending[page_id] = classification
+        self._write_ids[page_id] = write_id
+        if len(self._pending) >= self.flush_size:
+            return self.flush()
+        return {}
+    
+    def prefetch_notes(self, page_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        Obtém o Notes de várias páginas consultando a database.
+        
+        Cada chamada de databases.query traz até 100 linhas, mas a database
+        pode ser muito maior que o lote. Por isso a consulta só é usada em
+        lotes de pelo menos scan_min_batch páginas e é limitada a uma chamada
+        a cada scan_min_batch páginas pedidas (e a scan_max_requests): no pior
+        caso, com nenhuma página encontrada, o custo extra fica em
+        1/scan_min_batch das chamadas. A paginação para assim que todas as
+        páginas pedidas foram vistas; as que faltarem são buscadas
+        individualmente com pages.retrieve.
+        
+        Args:
+            page_ids: IDs das páginas
+            
+        Returns:
+            Dict {page_id: Notes atual}
+        """
+        wanted = {_normalize_page_id(page_id): page_id for page_id in page_ids}
+        notes: Dict[str, str] = {}
+        
+        if self.database_id and len(wanted) >= self.scan_min_batch:
+            page_size = 100
+            max_rows = page_size * min(self.scan_max_requests, len(wanted) // self.scan_min_batch)
+            scanned = 0
+            for page in self.iter_database_pages(page_size=page_size):
+                scanned += 1
+                original_id = wanted.get(_normalize_page_id(page['id']))
+                if original_id is not None:
+                    notes[original_id] = self._get_existing_notes(page)
+                    if len(notes) == len(wanted):
+                        break
+                if scanned >= max_rows:
+                    logger.info("Consulta à database interrompida após %s linhas; "
+                                "%s páginas serão buscadas individualmente",
+                                scanned, len(wanted) - len(notes))
+                    break
+        
+        for page_id in wanted.values():
+            if page_id not in notes:
+                page = self._request(self.client.pages.retrieve, page_id=page_id)
+                notes[page_id] = self._get_existing_notes(page)
+        
+        return notes
+    
+    def flush(self) -> Dict[str, object]:
+        """
+        Grava todas as classificações enfileiradas.
+        
+        Returns:
+            Dict {page_id: True ou a exceção que impediu a gravação}
+        """
+        if not self._pending:
+            return {}
+        
+        pending, self._pending = self._pending, {}
+        write_ids, self._write_ids = self._write_ids, {}
+        logger.info("Gravando %s páginas no Notion (%s atualizações coalescidas)",
+                    len(pending), self.coalesced)
+        
+        results: Dict[str, object] = {}
+        try:
+            existing = self.prefetch_notes(pending.keys())
+        except Exception as e:
+            logger.error("Erro ao obter Notes existentes: %s", e)
+            return {page_id: e for page_id in pending}
+        
+        for page_id, classification in pending.items():
+            try:
+                notes = existing.get(page_id, '')
+                if already_written(notes, write_ids.get(page_id)):
+                    logger.info("Página %s já tem a classificação %s; nada a gravar",
+                                page_id, write_ids[page_id])
+                    results[page_id] = True
+                    continue
+                properties = self._compose_update(notes, classification, write_ids.get(page_id))
+                self._request(self.client.pages.update, page_id=page_id, properties=properties)
+                results[page_id] = True
+            except Exception as e:
+                logger.error("Erro ao atualizar página %s: %s", page_id, e)
+                results[page_id] = e
+        
+        return results
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
 
 
 def update_notion_page(page_id: str, 
                        classification: Dict,
                        api_key: Optional[str] = None,
-                       database_id: Optional[str] = None) -> bool:
+                       database_id: Optional[str] = None,
+                       write_id: Optional[str] = None) -> bool:
     """
     Função de conveniência para atualizar página do Notion.
     
+    Reaproveita o NotionUpdater do registro do processo para a mesma API key.
+    
     Args:
         page_id: ID da página no Notion
         classification: Classificação do mod
         api_key: API key (opcional)
         database_id: Database ID (opcional)
+        write_id: Id da gravação (JobJournal) para não anexar o mesmo bloco duas vezes
         
     Returns:
         True se atualizado com sucesso
     """
-    updater = NotionUpdater(api_key=api_key, database_id=database_id)
-    return updater.update_page(page_id, classification)
+    updater = get_notion_updater(api_key=api_key, database_id=database_id)
+    return updater.update_page(page_id, classification, write_id=write_id)
+
+
+def get_notion_updater(api_key: Optional[str] = None,
+                       database_id: Optional[str] = None) -> NotionUpdater:
+    """
+    Retorna o NotionUpdater compartilhado para (api_key, database_id).
+    
+    Args:
+        api_key: API key (opcional, usa env var)
+        database_id: Database ID (opcional, usa env var)
+        
+    Returns:
+        Instância compartilhada de NotionUpdater
+    """
+    api_key = api_key or os.getenv('NOTION_API_KEY') or os.getenv('NOTION_TOKEN')
+    database_id = database_id or os.getenv('NOTION_DATABASE_ID') or os.getenv('NOTION_DB_ID')
+    key = ('notion', api_key, database_id)
+    return registry.get_or_create(
+        key, lambda: NotionUpdater(api_key=api_key, database_id=database_id)
+    )
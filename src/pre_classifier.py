@@ -0,0 +1,342 @@
+"""Pre-Classifier Module - Classificação local por regras antes de chamar o LLM."""
+
+import os
+import re
+import random
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from classification_schema import PRIORITY_LABELS
+
+logger = logging.getLogger(__name__)
+
+# Confiança mínima padrão por prioridade para dispensar o LLM
+DEFAULT_THRESHOLDS = {0: 0.9, 1: 0.95, 5: 0.85}
+
+# Caracteres do texto principal considerados além do título e da descrição
+TEXT_WINDOW_CHARS = 1500
+
+# Penalidades de confiança
+DESCRIPTION_ONLY_PENALTY = 0.15
+CONFLICT_PENALTY = 0.3
+
+# Sinais de gameplay: um mod "visual" que os menciona deixa de ser caso óbvio
+GAMEPLAY_RE = re.compile(
+    r'\b(script|ts4script|tuning|interactions?|intera[cç](?:ão|ões)|traits?|careers?|carreiras?|'
+    r'aspirations?|aspira[cç](?:ão|ões)|skills?|buffs?|moodlets?|autonomy|autonomia|'
+    r'gameplay|overhaul|events?|eventos?|need decay|necessidades)\b',
+    re.IGNORECASE
+)
+
+
+class Rule:
+    """
+    Regra de classificação local por palavras-chave.
+
+    Uma regra casa quando algum dos padrões aparece no título (confiança
+    cheia) ou só na descrição/início do texto (confiança reduzida).
+    Regras de mods visuais são descartadas quando há sinais de gameplay.
+    """
+
+    def __init__(self, name: str, priority: int, patterns: List[str], confidence: float,
+                 sub_category: str = '', sub_category_label: str = '',
+                 scores: Optional[Dict[str, int]] = None, reason: str = '',
+                 reject_gameplay: bool = True, requires: Optional[List[str]] = None):
+        """
+        Args:
+            name: Nome da regra (aparece nos logs e na classificação)
+            priority: Prioridade atribuída (0-5)
+            patterns: Expressões regulares procuradas no texto
+            confidence: Confiança quando o padrão aparece no título
+            sub_category: Código da sub-categoria (ex.: "5A")
+            sub_category_label: Nome da sub-categoria
+            scores: Passos do roteiro {'remocao', 'framework', 'essencial'} (opcional)
+            reason: Justificativa gravada no Notes
+            reject_gameplay: Se True, sinais de gameplay anulam a regra
+            requires: Padrões dos quais pelo menos um também precisa aparecer (opcional)
+        """
+        self.name = name
+        self.priority = priority
+        self.pattern = re.compile(r'\b(?:' + '|'.join(patterns) + r')\b', re.IGNORECASE)
+        self.confidence = confidence
+        self.sub_category = sub_category
+        self.sub_category_label = sub_category_label
+        self.scores = scores
+        self.reason = reason
+        self.reject_gameplay = reject_gameplay
+        self.requires = (
+            re.compile(r'\b(?:' + '|'.join(requires) + r')\b', re.IGNORECASE) if requires else None
+        )
+
+    def match(self, title: str, context: str) -> float:
+        """
+        Retorna a confiança da regra para o mod (0 se não casar).
+
+        Args:
+            title: Título do mod
+            context: Descrição e início do texto principal
+        """
+        if self.pattern.search(title):
+            confidence = self.confidence
+        elif self.pattern.search(context):
+            confidence = self.confidence - DESCRIPTION_ONLY_PENALTY
+        else:
+            return 0.0
+        if self.requires is not None and not self.requires.search(f"{title}\n{context}"):
+            return 0.0
+        if self.reject_gameplay and GAMEPLAY_RE.search(f"{title}\n{context}"):
+            return 0.0
+        return confidence
+
+    def classification(self, mod_content: Dict, confidence: float) -> Dict:
+        """Monta a classificação no mesmo formato da resposta do LLM."""
+        result = {
+            'priority': self.priority,
+            'priority_label': PRIORITY_LABELS[self.priority],
+            'sub_category': self.sub_category,
+            'sub_category_label': self.sub_category_label,
+            'mod_name': mod_content.get('title', ''),
+            'creator': '',
+            'notes_reason': f"{self.reason} (classificação local, regra {self.name})",
+            'pre_classifier': {'rule': self.name, 'confidence': round(confidence, 2)},
+        }
+        if self.scores:
+            result.update(self.scores)
+            result['score'] = sum(self.scores.values())
+        return result
+
+
+# Regras padrão: só casos que o roteiro decide sem ambiguidade
+RULES = [
+    Rule(
+        'framework', 1,
+        [r'core', r'library', r'framework', r'xml injector', r'lot51 core', r'mod ?guard',
+         r'better exceptions'],
+        confidence=0.95,
+        requires=[r'required (?:for|by) (?:other|many|several) mods', r'dependency',
+                  r'depend[eê]ncia', r'requisito (?:de|para) outros mods', r'xml injector',
+                  r'lot51 core', r'better exceptions', r'mod ?guard'],
+        scores={'remocao': 4, 'framework': 1, 'essencial': 3},
+        reason="Biblioteca/framework exigido por outros mods: remoção quebra saves e dependentes",
+        reject_gameplay=False,
+    ),
+    Rule(
+        'visual-global', 0,
+        [r'loading screens?', r'tela de carregamento', r'main menu', r'menu principal',
+         r'map overrides?', r'world map', r'mapa do mundo', r'custom fonts?', r'fonts? overrides?',
+         r'icons? pack', r'plumbob'],
+        confidence=0.9,
+        scores={'remocao': 1, 'framework': 0, 'essencial': 0},
+        reason="Override visual global sem função mecânica: remoção só tem impacto estético",
+    ),
+    Rule(
+        'cas', 5,
+        [r'cas', r'hair(?:style)?s?', r'cabelos?', r'clothing', r'clothes', r'roupas?', r'dress(?:es)?',
+         r'vestidos?', r'tops?', r'bottoms?', r'shoes', r'sapatos', r'earrings?', r'brincos?',
+         r'accessor(?:y|ies)', r'acess[oó]rios?', r'make ?up', r'maquiagem', r'lipsticks?',
+         r'eyelashes', r'lashes', r'cílios', r'skin ?(?:blend|detail|tone)s?', r'swatches',
+         r'sliders?'],
+        confidence=0.9,
+        sub_category='5A', sub_category_label='CAS (roupas, cabelos, acessórios)',
+        reason="Conteúdo de CAS puramente estético, sem impacto em saves ou outros mods",
+    ),
+    Rule(
+        'build-buy', 5,
+        [r'build ?/ ?buy', r'buy mode', r'build mode', r'furniture', r'm[oó]veis', r'clutter',
+         r'decor(?:ation)?s?', r'sofas?', r'chairs?', r'cadeiras?', r'wallpapers?'],
+        confidence=0.85,
+        sub_category='5B', sub_category_label='Build/Buy',
+        reason="Objetos de Build/Buy decorativos, sem função de gameplay",
+    ),
+    Rule(
+        'reshade', 5,
+        [r'reshade', r'gshade', r'presets?'],
+        confidence=0.9,
+        sub_category='5C', sub_category_label='Reshades/Presets',
+        reason="Reshade/preset visual, removível sem impacto no jogo",
+    ),
+    Rule(
+        'poses', 5,
+        [r'pose ?packs?', r'poses', r'pose player'],
+        confidence=0.9,
+        sub_category='5E', sub_category_label='Animações/Poses',
+        reason="Pacote de poses/animações para screenshots, sem impacto mecânico",
+    ),
+]
+
+
+def _parse_thresholds(value: str) -> Dict[int, float]:
+    """Converte "0=0.9,5=0.8" em {0: 0.9, 5: 0.8}."""
+    thresholds = {}
+    for part in value.split(','):
+        if '=' not in part:
+            continue
+        priority, threshold = part.split('=', 1)
+        thresholds[int(priority.strip())] = float(threshold.strip())
+    return thresholds
+
+
+class PreClassifier:
+    """
+    Estágio local que classifica os mods óbvios sem chamar o LLM.
+
+    Cada mod é avaliado pelas regras; se a melhor regra atingir a confiança
+    mínima da sua prioridade e nenhuma regra de outra prioridade também
+    casar, a classificação local é usada. Os demais seguem para o LLM.
+
+    Para medir a concordância com o LLM, uma fração (audit_rate) dos casos
+    decididos localmente também é enviada ao LLM; nos casos que já iriam ao
+    LLM, o palpite local abaixo do limiar é comparado com a resposta.
+    """
+
+    def __init__(self, rules: Optional[List[Rule]] = None,
+                 thresholds: Optional[Dict[int, float]] = None,
+                 audit_rate: Optional[float] = None):
+        """
+        Args:
+            rules: Regras avaliadas (padrão: RULES)
+            thresholds: Confiança mínima por prioridade (padrão: DEFAULT_THRESHOLDS
+                atualizado por PRECLASSIFIER_THRESHOLDS, ex.: "0=0.9,5=0.8")
+            audit_rate: Fração dos casos locais conferida com o LLM
+                (padrão: PRECLASSIFIER_AUDIT_RATE ou 0)
+        """
+        self.rules = rules if rules is not None else RULES
+        if thresholds is None:
+            thresholds = dict(DEFAULT_THRESHOLDS)
+            thresholds.update(_parse_thresholds(os.getenv('PRECLASSIFIER_THRESHOLDS', '')))
+        self.thresholds = thresholds
+        if audit_rate is None:
+            audit_rate = float(os.getenv('PRECLASSIFIER_AUDIT_RATE', '0'))
+        self.audit_rate = audit_rate
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._stats = {
+            'local': 0, 'llm': 0,
+            'audited': 0, 'audited_agree': 0,
+            'guessed': 0, 'guessed_agree': 0,
+        }
+
+    def predict(self, mod_content: Dict) -> Optional[Dict]:
+        """
+        Avalia as regras para o mod.
+
+        Args:
+            mod_content: Conteúdo extraído do mod
+
+        Returns:
+            Classificação da melhor regra com a chave 'pre_classifier'
+            ({'rule', 'confidence'}), ou None se nenhuma regra casar
+        """
+        title = mod_content.get('title') or ''
+        context = '\n'.join([
+            mod_content.get('description') or '',
+            (mod_content.get('full_text') or '')[:TEXT_WINDOW_CHARS],
+        ])
+
+        matches = []
+        for rule in self.rules:
+            confidence = rule.match(title, context)
+            if confidence > 0:
+                matches.append((confidence, rule))
+        if not matches:
+            return None
+
+        matches.sort(key=lambda match: match[0], reverse=True)
+        confidence, best = matches[0]
+        if any(rule.priority != best.priority for _, rule in matches[1:]):
+            confidence -= CONFLICT_PENALTY
+        return best.classification(mod_content, confidence)
+
+    def is_confident(self, prediction: Optional[Dict]) -> bool:
+        """Retorna True se a predição atinge o limiar da sua prioridade."""
+        if prediction is None:
+            return False
+        threshold = self.thresholds.get(prediction['priority'])
+        return threshold is not None and prediction['pre_classifier']['confidence'] >= threshold
+
+    def classify_many(self, mod_contents: List[Dict],
+                      classify: Callable[[List[Dict]], List[Optional[Dict]]]) -> List[Optional[Dict]]:
+        """
+        Classifica localmente os casos óbvios e envia os demais ao LLM.
+
+        Args:
+            mod_contents: Lista de conteúdos de mods
+            classify: Função que classifica uma lista de conteúdos com o LLM
+                (mesma ordem, None para os que falharam)
+
+        Returns:
+            Lista de classificações na mesma ordem da entrada
+        """
+        results: List[Optional[Dict]] = [None] * len(mod_contents)
+        predictions = [self.predict(mod_content) for mod_content in mod_contents]
+        pending = []
+        for index, prediction in enumerate(predictions):
+            if self.is_confident(prediction) and not self._audit():
+                results[index] = prediction
+                self._count('local')
+            else:
+                pending.append(index)
+
+        if pending:
+            classified = classify([mod_contents[index] for index in pending])
+            for index, classification in zip(pending, classified):
+                results[index] = classification
+                self._compare(mod_contents[index], predictions[index], classification)
+        return results
+
+    def classify(self, mod_content: Dict, classify: Callable[[Dict], Dict]) -> Dict:
+        """
+        Versão de classify_many() para um único mod.
+
+        Args:
+            mod_content: Conteúdo extraído do mod
+            classify: Função que classifica o conteúdo com o LLM
+
+        Returns:
+            Classificação local ou do LLM
+        """
+        return self.classify_many([mod_content], lambda contents: [classify(contents[0])])[0]
+
+    def _audit(self) -> bool:
+        """Sorteia se um caso confiante também vai ao LLM para conferência."""
+        if self.audit_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.audit_rate
+
+    def _count(self, key: str, agreed: Optional[bool] = None) -> None:
+        with self._lock:
+            self._stats[key] += 1
+            if agreed:
+                self._stats[f"{key}_agree"] += 1
+
+    def _compare(self, mod_content: Dict, prediction: Optional[Dict],
+                 classification: Optional[Dict]) -> None:
+        """Registra a chamada ao LLM e compara com o palpite local, se houver."""
+        self._count('llm')
+        if prediction is None or classification is None:
+            return
+        agreed = prediction['priority'] == classification.get('priority')
+        self._count('audited' if self.is_confident(prediction) else 'guessed', agreed)
+        if not agreed:
+            logger.info(
+                "Pré-classificador divergiu do LLM em %r: regra %s -> %s, LLM -> %s",
+                mod_content.get('title', ''), prediction['pre_classifier']['rule'],
+                prediction['priority'], classification.get('priority')
+            )
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Retorna os contadores e as taxas de concordância com o LLM.
+
+        'audited' são casos acima do limiar conferidos com o LLM;
+        'guessed' são palpites abaixo do limiar (ajudam a calibrar os limiares).
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        for key in ('audited', 'guessed'):
+            stats[f"{key}_agreement"] = (
+                stats[f"{key}_agree"] / stats[key] if stats[key] else None
+            )
+        return stats
@@ -0,0 +1,426 @@
+"""Prompt Builder Module - Monta a mensagem do LLM dentro de um orçamento de tokens."""
+
+import os
+import re
+import math
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from client_registry import import_lock, registry
+
+logger = logging.getLogger(__name__)
+
+# Orçamento padrão de tokens de entrada da mensagem do usuário (sem o prompt do sistema)
+DEFAULT_INPUT_BUDGET = 3000
+
+# Orçamento de cada seção, em ordem de prioridade. O que uma seção não usa
+# passa para as seguintes; o conteúdo geral fica com o restante.
+SECTION_BUDGETS: List[Tuple[str, int]] = [
+    ('title', 40),
+    ('description', 250),
+    ('requirements', 600),
+    ('changelog', 250),
+    ('content', 0),
+]
+
+SECTION_TITLES = {
+    'title': 'Título',
+    'description': 'Descrição',
+    'requirements': 'Requisitos e conflitos',
+    'changelog': 'Changelog',
+    'content': 'Conteúdo',
+}
+
+# Tokens de saída esperados de uma classificação (JSON com justificativa)
+EXPECTED_OUTPUT_TOKENS = 400
+
+# Desconto das APIs de lote (OpenAI e Anthropic cobram metade)
+BATCH_DISCOUNT = 0.5
+
+# Pedido extra do primeiro nível da cascata de modelos (ver llm_cascade)
+CONFIDENCE_INSTRUCTION = (
+    'Inclua também o campo "confidence": a sua certeza sobre a prioridade escolhida, de 0 a 1.\n'
+)
+
+# Preço por 1M de tokens (entrada, saída) em USD, por prefixo do modelo.
+# Valores de referência; LLM_PRICE_INPUT / LLM_PRICE_OUTPUT sobrescrevem.
+MODEL_PRICES: List[Tuple[str, float, float]] = [
+    ('gpt-4o-mini', 0.15, 0.60),
+    ('gpt-4o', 2.50, 10.00),
+    ('gpt-4.1-nano', 0.10, 0.40),
+    ('gpt-4.1-mini', 0.40, 1.60),
+    ('gpt-4.1', 2.00, 8.00),
+    ('gpt-4-turbo', 10.00, 30.00),
+    ('gpt-3.5', 0.50, 1.50),
+    ('claude-3-5-haiku', 0.80, 4.00),
+    ('claude-3-haiku', 0.25, 1.25),
+    ('claude-haiku', 0.80, 4.00),
+    ('claude-3-opus', 15.00, 75.00),
+    ('claude-opus', 15.00, 75.00),
+    ('claude', 3.00, 15.00),
+    ('gemini-1.5-flash', 0.075, 0.30),
+    ('gemini-2.0-flash', 0.10, 0.40),
+    ('gemini-1.5-pro', 1.25, 5.00),
+    ('gemini', 1.25, 5.00),
+]
+
+# Trechos sem valor para a classificação (navegação, pedidos de apoio, avisos legais...)
+BOILERPLATE_RE = re.compile(
+    r'cookie|privacy policy|terms of (service|use)|all rights reserved|sign (in|up)|log ?in\b'
+    r'|subscribe|newsletter|follow (me|us)|join (my|our) (discord|patreon)|support (me|my work)'
+    r'|buy me a (coffee|ko-?fi)|ko-?fi|click here|advertisement|share (this|on)|report (this|abuse)'
+    r'|política de privacidade|termos de uso|todos os direitos|inscreva-se|siga-me|clique aqui',
+    re.IGNORECASE
+)
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+TOKEN_PIECE_RE = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+
+
+class TokenCounter:
+    """
+    Contagem local de tokens para o provedor ativo.
+
+    Com o tiktoken instalado, modelos da OpenAI usam o tokenizer exato.
+    Nos demais casos a contagem é uma aproximação por palavras que trata
+    melhor texto misto português/inglês do que dividir caracteres por 4:
+    palavras longas e com acentos quebram em mais tokens.
+    """
+
+    # Ajuste da aproximação por provedor (tokenizers da Anthropic e do
+    # Gemini geram um pouco mais de tokens que os da OpenAI)
+    PROVIDER_FACTORS = {'openai': 1.0, 'anthropic': 1.15, 'google': 1.05}
+
+    def __init__(self, provider: str, model: str):
+        """
+        Inicializa o contador.
+
+        Args:
+            provider: 'openai', 'anthropic' ou 'google'
+            model: Nome do modelo
+        """
+        self.provider = provider
+        self.model = model
+        self.factor = self.PROVIDER_FACTORS.get(provider, 1.1)
+        self._encoding = self._load_encoding() if provider == 'openai' else None
+
+    def _load_encoding(self):
+        """Carrega o tokenizer da OpenAI, se o tiktoken estiver instalado."""
+        try:
+            with import_lock:
+                import tiktoken
+        except ImportError:
+            return None
+        try:
+            return tiktoken.encoding_for_model(self.model)
+        except KeyError:
+            return tiktoken.get_encoding('o200k_base')
+        except Exception as e:
+            logger.debug("Tokenizer indisponível para %s: %s", self.model, e)
+            return None
+
+    @property
+    def exact(self) -> bool:
+        """Indica se a contagem usa o tokenizer do provedor."""
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        """
+        Conta (ou estima) os tokens de um texto.
+
+        Args:
+            text: Texto a contar
+
+        Returns:
+            Número de tokens
+        """
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        tokens = 0
+        for piece in TOKEN_PIECE_RE.findall(text):
+            if len(piece) <= 4:
+                tokens += 1
+            elif piece.isascii():
+                tokens += math.ceil(len(piece) / 4)
+            else:
+                tokens += math.ceil(len(piece) / 3)
+        return math.ceil(tokens * self.factor)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Corta o texto para caber em max_tokens, em fronteira de frase quando possível.
+
+        Args:
+            text: Texto a cortar
+            max_tokens: Máximo de tokens
+
+        Returns:
+            Texto cortado (ou o original, se já couber)
+        """
+        if max_tokens <= 0:
+            return ''
+        if self.count(text) <= max_tokens:
+            return text
+
+        kept: List[str] = []
+        used = 0
+        for sentence in SENTENCE_RE.split(text):
+            tokens = self.count(sentence) + 1
+            if used + tokens > max_tokens:
+                if not kept:
+                    # Primeira frase já não cabe: corta por palavras
+                    words = sentence.split()
+                    low, high = 0, len(words)
+                    while low < high:
+                        mid = (low + high + 1) // 2
+                        if self.count(' '.join(words[:mid])) <= max_tokens:
+                            low = mid
+                        else:
+                            high = mid - 1
+                    kept.append(' '.join(words[:low]))
+                break
+            kept.append(sentence)
+            used += tokens
+        return ' '.join(kept)
+
+
+def drop_boilerplate(text: str) -> Tuple[str, int]:
+    """
+    Remove frases de boilerplate e frases repetidas.
+
+    Args:
+        text: Texto normalizado
+
+    Returns:
+        (texto sem boilerplate, número de frases removidas)
+    """
+    kept = []
+    seen = set()
+    dropped = 0
+    for sentence in SENTENCE_RE.split(text):
+        key = sentence.strip().lower()
+        if not key:
+            continue
+        if key in seen or (len(key) < 300 and BOILERPLATE_RE.search(key)):
+            dropped += 1
+            continue
+        seen.add(key)
+        kept.append(sentence)
+    return ' '.join(kept), dropped
+
+
+def model_prices(model: str) -> Tuple[float, float]:
+    """
+    Preço por 1M de tokens (entrada, saída) do modelo.
+
+    Args:
+        model: Nome do modelo
+
+    Returns:
+        Tupla (entrada, saída) em USD; (0, 0) se desconhecido
+    """
+    input_price = os.getenv('LLM_PRICE_INPUT')
+    output_price = os.getenv('LLM_PRICE_OUTPUT')
+    if input_price and output_price:
+        return float(input_price), float(output_price)
+    model_lower = model.lower()
+    for prefix, price_in, price_out in MODEL_PRICES:
+        if model_lower.startswith(prefix) or f'/{prefix}' in model_lower:
+            return price_in, price_out
+    return 0.0, 0.0
+
+
+def usage_cost(model: str, usage: Dict[str, int], discount: float = 1.0) -> float:
+    """
+    Custo em USD de uma chamada a partir do uso de tokens informado pelo provedor.
+
+    Args:
+        model: Nome do modelo
+        usage: Dict retornado por llm_client.extract_usage()
+        discount: Multiplicador do preço (ex.: BATCH_DISCOUNT)
+
+    Returns:
+        Custo da chamada em USD
+    """
+    price_in, price_out = model_prices(model)
+    usd = (usage.get('input_tokens', 0) * price_in + usage.get('output_tokens', 0) * price_out)
+    return usd / 1_000_000 * discount
+
+
+class PromptBuilder:
+    """
+    Monta a mensagem do usuário respeitando um orçamento de tokens.
+
+    Cada seção (título, descrição, requisitos/conflitos, changelog e o
+    conteúdo geral) tem um orçamento próprio, preenchido em ordem de
+    prioridade; a sobra de uma seção passa para as seguintes. Boilerplate
+    e frases repetidas são removidos antes de qualquer corte.
+    """
+
+    def __init__(self, counter: TokenCounter, budget: Optional[int] = None):
+        """
+        Inicializa o builder.
+
+        Args:
+            counter: Contador de tokens do provedor ativo
+            budget: Tokens de entrada da mensagem (padrão: LLM_INPUT_TOKENS ou 3000)
+        """
+        self.counter = counter
+        self.budget = budget or int(os.getenv('LLM_INPUT_TOKENS', DEFAULT_INPUT_BUDGET))
+
+    def _sections(self, mod_content: Dict) -> Dict[str, str]:
+        """Separa o conteúdo do mod nas seções com orçamento."""
+        sections = dict(mod_content.get('sections') or {})
+        text = {
+            'title': mod_content.get('title') or 'N/A',
+            'description': mod_content.get('description') or '',
+            'requirements': sections.get('requirements', ''),
+            'changelog': sections.get('changelog', ''),
+        }
+        if sections:
+            # Extrator do site: a descrição completa entra como conteúdo geral
+            text['content'] = sections.get('description', '')
+            if text['content'].startswith(text['description'][:200]):
+                text['description'] = ''
+        else:
+            text['content'] = mod_content.get('full_text') or ''
+        return text
+
+    def build(self, mod_content: Dict, budget: Optional[int] = None,
+              instruction: bool = True) -> Dict:
+        """
+        Monta a mensagem do usuário.
+
+        Args:
+            mod_content: Dicionário com title, description, full_text e
+                (opcional) sections do extrator do site
+            budget: Orçamento de tokens desta mensagem (padrão: self.budget)
+            instruction: Se False, omite a instrução final (mods empacotados)
+
+        Returns:
+            Dict com message, tokens (total da mensagem), sections (tokens
+            por seção), dropped (frases de boilerplate removidas) e
+            truncated (seções cortadas)
+        """
+        texts = self._sections(mod_content)
+        template_tokens = self.counter.count(self._render({name: '' for name in texts}, instruction))
+        remaining = max(0, (budget or self.budget) - template_tokens)
+
+        parts: Dict[str, str] = {}
+        tokens: Dict[str, int] = {}
+        truncated: List[str] = []
+        dropped = 0
+        # Seções com orçamento próprio primeiro; o que sobrar vai para o conteúdo
+        for name, section_budget in SECTION_BUDGETS:
+            text = texts.get(name) or ''
+            if not text:
+                continue
+            if name not in ('title',):
+                text, removed = drop_boilerplate(text)
+                dropped += removed
+            limit = remaining if name == 'content' else min(section_budget, remaining)
+            cut = self.counter.truncate(text, limit)
+            if len(cut) < len(text):
+                truncated.append(name)
+            parts[name] = cut
+            tokens[name] = self.counter.count(cut)
+            remaining = max(0, remaining - tokens[name])
+
+        message = self._render(parts, instruction)
+        return {
+            'message': message,
+            'tokens': self.counter.count(message),
+            'sections': tokens,
+            'dropped': dropped,
+            'truncated': truncated,
+        }
+
+    @staticmethod
+    def _render(parts: Dict[str, str], instruction: bool = True) -> str:
+        """Formata as seções na mensagem enviada ao LLM."""
+        lines = [f"\n{SECTION_TITLES['title']}: {parts.get('title') or 'N/A'}\n"]
+        for name in ('description', 'requirements', 'changelog'):
+            if parts.get(name):
+                lines.append(f"{SECTION_TITLES[name]}:\n{parts[name]}\n")
+        lines.append(f"{SECTION_TITLES['content']}:\n{parts.get('content', '')}\n")
+        if instruction:
+            lines.append("Classifique este mod seguindo as instruções.\n")
+        return '\n'.join(lines)
+
+
+class BudgetExceededError(RuntimeError):
+    """O custo previsto da chamada ultrapassa o limite de gasto do lote."""
+
+
+class SpendingCap:
+    """
+    Limite de gasto (custo previsto em USD) de uma execução em lote.
+
+    Cada chamada ao LLM reserva o seu custo previsto antes de ser feita;
+    quando a reserva ultrapassaria o limite, BudgetExceededError é
+    levantado e a chamada não acontece.
+    """
+
+    def __init__(self, max_usd: float):
+        """
+        Inicializa o limite.
+
+        Args:
+            max_usd: Gasto máximo previsto em USD
+        """
+        self.max_usd = max_usd
+        self.spent = 0.0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        """Indica se alguma chamada já foi recusada por falta de orçamento."""
+        return self.refused > 0
+
+    def charge(self, usd: float) -> None:
+        """
+        Reserva o custo previsto de uma chamada.
+
+        Args:
+            usd: Custo previsto em USD
+
+        Raises:
+            BudgetExceededError: Se o limite seria ultrapassado
+        """
+        with self._lock:
+            if self.spent + usd > self.max_usd:
+                self.refused += 1
+                raise BudgetExceededError(
+                    f"Limite de gasto do lote atingido (US$ {self.spent:.4f} de US$ {self.max_usd:.4f})"
+                )
+            self.spent += usd
+
+    def refund(self, usd: float) -> None:
+        """
+        Devolve a reserva de uma chamada que não chegou a ser cobrada.
+
+        Args:
+            usd: Custo reservado em charge()
+        """
+        with self._lock:
+            self.spent = max(0.0, self.spent - usd)
+
+
+def get_token_counter(provider: str, model: str) -> TokenCounter:
+    """
+    Retorna o contador de tokens compartilhado para (provedor, modelo).
+
+    Args:
+        provider: 'openai', 'anthropic' ou 'google'
+        model: Nome do modelo
+
+    Returns:
+        TokenCounter compartilhado no processo
+    """
+    return registry.get_or_create(
+        ('token_counter', provider, model), lambda: TokenCounter(provider, model)
+    )
@@ -0,0 +1,250 @@
+"""Rate Limit Module - Token buckets e política de retry com backoff para APIs externas."""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from tenacity import (
+    before_sleep_log,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+from tenacity.wait import wait_base
+
+from client_registry import registry
+
+logger = logging.getLogger(__name__)
+
+# Limites padrão por provedor: (requisições/min, tokens/min)
+DEFAULT_PROVIDER_LIMITS: Dict[str, Tuple[float, float]] = {
+    'openai': (500, 30000),
+    'anthropic': (50, 40000),
+    'google': (60, 32000),
+}
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Erros de rede/timeout dos SDKs (identificados pelo nome para não importar os SDKs)
+RETRYABLE_ERROR_NAMES = {
+    'APIConnectionError', 'APITimeoutError', 'RateLimitError', 'InternalServerError',
+    'ResourceExhausted', 'ServiceUnavailable', 'DeadlineExceeded', 'TooManyRequests',
+    'ConnectError', 'ReadTimeout', 'ConnectTimeout', 'RemoteProtocolError',
+    'ConnectionError', 'Timeout', 'RequestTimeoutError',
+}
+
+
+class TokenBucket:
+    """
+    Token bucket com reabastecimento contínuo.
+
+    A taxa é dada por minuto. Cada aquisição reserva tokens, podendo deixar
+    o saldo negativo; quem reservou espera o tempo necessário para o saldo
+    voltar a zero. Assim chamadas concorrentes são atendidas em ordem sem
+    exceder a taxa média. Funciona tanto com threads quanto com asyncio;
+    reservas maiores que o consumo real podem ser devolvidas com refund().
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Inicializa o bucket.
+
+        Args:
+            rate_per_minute: Tokens repostos por minuto
+            capacity: Máximo de tokens acumulados (padrão: um minuto de taxa)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        """
+        Reserva tokens e retorna quanto tempo esperar antes de usá-los.
+
+        Args:
+            amount: Quantidade de tokens
+
+        Returns:
+            Tempo de espera em segundos (0 se disponível agora)
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, amount: float = 1) -> None:
+        """Bloqueia a thread até os tokens estarem disponíveis."""
+        delay = self.reserve(amount)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, amount: float = 1) -> None:
+        """Aguarda (sem bloquear o event loop) até os tokens estarem disponíveis."""
+        delay = self.reserve(amount)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def refund(self, amount: float) -> None:
+        """Devolve ao saldo tokens reservados e não consumidos."""
+        if amount <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class ProviderRateLimiter:
+    """Limites combinados de requisições/min e tokens/min de um provedor."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        """
+        Inicializa o limitador.
+
+        Args:
+            requests_per_minute: Máximo de requisições por minuto
+            tokens_per_minute: Máximo de tokens (entrada + saída) por minuto
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, tokens: int) -> None:
+        """Aguarda cota para uma requisição de `tokens` tokens (threads)."""
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: int) -> None:
+        """Aguarda cota para uma requisição de `tokens` tokens (asyncio)."""
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def refund_tokens(self, tokens: int) -> None:
+        """Devolve a parte da reserva de tokens/min que a requisição não usou."""
+        self.tokens.refund(tokens)
+
+
+def get_provider_limiter(provider: str) -> ProviderRateLimiter:
+    """
+    Retorna o limitador compartilhado do provedor.
+
+    Os limites padrão podem ser trocados com LLM_RPM e LLM_TPM.
+
+    Args:
+        provider: 'openai', 'anthropic' ou 'google'
+
+    Returns:
+        ProviderRateLimiter compartilhado no processo
+    """
+    default_rpm, default_tpm = DEFAULT_PROVIDER_LIMITS.get(provider, (60, 30000))
+    rpm = float(os.getenv('LLM_RPM', default_rpm))
+    tpm = float(os.getenv('LLM_TPM', default_tpm))
+    return registry.get_or_create(
+        ('rate_limiter', provider, rpm, tpm),
+        lambda: ProviderRateLimiter(rpm, tpm)
+    )
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """Extrai o status HTTP de exceções dos SDKs (OpenAI, Anthropic, Google, Notion)."""
+    for attr in ('status_code', 'status', 'code'):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, 'response', None)
+    value = getattr(response, 'status_code', None)
+    return value if isinstance(value, int) else None
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """
+    Lê o cabeçalho Retry-After de uma exceção HTTP, se houver.
+
+    Args:
+        exc: Exceção levantada pelo SDK
+
+    Returns:
+        Segundos a aguardar ou None
+    """
+    headers = getattr(exc, 'headers', None)
+    if headers is None:
+        headers = getattr(getattr(exc, 'response', None), 'headers', None)
+    if not headers:
+        return None
+
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Indica se o erro é temporário (429, 5xx, timeout, falha de conexão)."""
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(exc).__mro__)
+
+
+class wait_retry_after(wait_base):
+    """Espera o Retry-After do servidor ou, se ausente, backoff exponencial com jitter."""
+
+    def __init__(self, fallback: wait_base, max_wait: float = 120.0):
+        self.fallback = fallback
+        self.max_wait = max_wait
+
+    def __call__(self, retry_state) -> float:
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        delay = retry_after_seconds(exc) if exc is not None else None
+        if delay is None:
+            return self.fallback(retry_state)
+        return min(delay, self.max_wait)
+
+
+def retry_policy(max_attempts: Optional[int] = None) -> Dict:
+    """
+    Parâmetros de tenacity.Retrying/AsyncRetrying para chamadas de API.
+
+    Tenta de novo apenas erros temporários, respeitando Retry-After e usando
+    backoff exponencial com jitter completo. O número de tentativas pode ser
+    configurado com API_MAX_RETRIES.
+
+    Args:
+        max_attempts: Número máximo de tentativas (padrão: API_MAX_RETRIES ou 5)
+
+    Returns:
+        Dict de kwargs para Retrying/AsyncRetrying
+    """
+    if max_attempts is None:
+        max_attempts = int(os.getenv('API_MAX_RETRIES', '5'))
+    return {
+        'retry': retry_if_exception(is_retryable),
+        'wait': wait_retry_after(wait_random_exponential(multiplier=1, max=60)),
+        'stop': stop_after_attempt(max_attempts),
+        'before_sleep': before_sleep_log(logger, logging.WARNING),
+        'reraise': True,
+    }
@@ -1,26 +1,94 @@
 """Web Scraper Module - Extrai conteúdo de páginas de mods."""
 
+import os
+import time
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+import tracemalloc
+from lxml import etree
 import logging
-from typing import Dict, Optional
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from client_registry import registry
+from extractors import Extractor, get_extractor, normalize, sniff_encoding
+from http_cache import HTTPCache, get_default_http_cache
+from metrics import annotate, get_metrics
 
 logger = logging.getLogger(__name__)
 
+# Scraper de cada processo do pool de parse (criado pelo initializer)
+_worker_scraper = None
+
+
+def _parse_workers_from_env() -> int:
+    """Lê SCRAPER_PARSE_WORKERS ('auto': um processo por núcleo; 0: parse na thread)."""
+    value = os.getenv('SCRAPER_PARSE_WORKERS', '0').strip().lower()
+    if value == 'auto':
+        return os.cpu_count() or 1
+    return int(value or 0)
+
+
+def _init_parse_worker(max_bytes: int, max_text_chars: int, chunk_size: int,
+                       trace_memory: bool) -> None:
+    """Prepara um processo do pool com os mesmos limites do scraper que o criou."""
+    global _worker_scraper
+    _worker_scraper = WebScraper(max_bytes=max_bytes, max_text_chars=max_text_chars,
+                                 chunk_size=chunk_size, trace_memory=trace_memory,
+                                 parse_workers=0)
+
+
+def _parse_in_worker(url: str, content: bytes, encoding: Optional[str]) -> Dict:
+    """Parse executado num processo do pool: recebe bytes e devolve o dict extraído."""
+    return _worker_scraper._parse(url, content, encoding=encoding)
+
 
 class WebScraper:
     """Classe para extração de conteúdo de páginas web."""
     
-    def __init__(self, timeout: int = 30):
+    def __init__(self, timeout: int = 30, pool_size: int = 10,
+                 cache: Optional[HTTPCache] = None,
+                 max_bytes: Optional[int] = None,
+                 max_text_chars: Optional[int] = None,
+                 chunk_size: int = 64 * 1024,
+                 trace_memory: Optional[bool] = None,
+                 parse_workers: Optional[int] = None):
         """
         Inicializa o scraper.
         
         Args:
             timeout: Timeout para requisições HTTP em segundos
+            pool_size: Conexões mantidas abertas por host (keep-alive)
+            cache: Cache HTTP para requisições condicionais (opcional)
+            max_bytes: Máximo de bytes baixados por página (padrão: SCRAPER_MAX_BYTES ou 2 MB)
+            max_text_chars: Texto principal suficiente para parar o parse
+                (padrão: SCRAPER_MAX_TEXT_CHARS ou 20000)
+            chunk_size: Tamanho dos blocos lidos da resposta
+            trace_memory: Mede o pico de memória do parse com tracemalloc em
+                fetch_stats['peak_kb'] (padrão: SCRAPER_TRACE_MEMORY; tem custo, use
+                só para diagnóstico). Só um parse por vez é medido; os simultâneos
+                trazem apenas a estimativa peak_kb_est
+            parse_workers: Processos para o parse do HTML (padrão:
+                SCRAPER_PARSE_WORKERS; 0 faz o parse em streaming na própria thread)
         """
         self.timeout = timeout
+        self.cache = cache
+        self.max_bytes = max_bytes or int(os.getenv('SCRAPER_MAX_BYTES', 2 * 1024 * 1024))
+        self.max_text_chars = max_text_chars or int(os.getenv('SCRAPER_MAX_TEXT_CHARS', 20000))
+        self.chunk_size = chunk_size
+        if trace_memory is None:
+            trace_memory = os.getenv('SCRAPER_TRACE_MEMORY', '0').lower() in ('1', 'true', 'yes')
+        self.trace_memory = trace_memory
+        self.parse_workers = _parse_workers_from_env() if parse_workers is None else parse_workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # hit: 304 (resultado reaproveitado), revalidate: página mudou (200
+        # em requisição condicional), miss: requisição sem validadores
+        self._cache_stats = {'hit': 0, 'revalidate': 0, 'miss': 0}
+        self._stats_lock = threading.Lock()
         self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
@@ -39,127 +107,372 @@ class WebScraper:
             requests.RequestException: Se houver erro na requisição
         """
         try:
-            logger.info(f"Extraindo conteúdo de: {url}")
-            
-            # Faz requisição HTTP
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
+            logger.info("Extraindo conteúdo de: %s", url)
             
-            # Parse HTML
-            soup = BeautifulSoup(response.content, 'lxml')
-            
-            # Remove scripts e styles
-            for tag in soup(['script', 'style', 'nav', 'footer', 'header']):
-                tag.decompose()
-            
-            # Extrai informações
-            title = self._extract_title(soup)
-            description = self._extract_description(soup)
-            full_text = self._extract_text(soup)
-            
-            result = {
-                'url': url,
-                'title': title,
-                'description': description,
-                'full_text': full_text,
-                'word_count': len(full_text.split())
-            }
-            
-            logger.info(f"Extração concluída: {result['word_count']} palavras")
+            # Requisição condicional se a página já está no cache
+            cached = self.cache.get(url) if self.cache is not None else None
+            result = self._fetch(url, cached)
+            if result is None:
+                # 304, mas o extrator mudou e o corpo em cache é parcial: baixa de novo
+                result = self._fetch(url, None)
             return result
             
         except requests.Timeout:
-            logger.error(f"Timeout ao acessar {url}")
+            logger.error("Timeout ao acessar %s", url)
             raise
         except requests.RequestException as e:
-            logger.error(f"Erro ao acessar {url}: {str(e)}")
+            logger.error("Erro ao acessar %s: %s", url, e)
             raise
         except Exception as e:
-            logger.error(f"Erro inesperado: {str(e)}")
+            logger.error("Erro inesperado: %s", e)
             raise
     
-    def _extract_title(self, soup: BeautifulSoup) -> str:
-        """Extrai o título da página."""
-        # Tenta várias opções de título
-        title = None
-        
-        # Meta title ou og:title
-        meta_title = soup.find('meta', property='og:title')
-        if meta_title and meta_title.get('content'):
-            title = meta_title['content']
-        
-        # Tag title
-        if not title and soup.title:
-            title = soup.title.string
-        
-        # H1
-        if not title:
-            h1 = soup.find('h1')
-            if h1:
-                title = h1.get_text(strip=True)
-        
-        return title or 'Sem título'
-    
-    def _extract_description(self, soup: BeautifulSoup) -> str:
-        """Extrai a descrição da página."""
-        # Tenta meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc and meta_desc.get('content'):
-            return meta_desc['content']
-        
-        # Tenta og:description
-        og_desc = soup.find('meta', property='og:description')
-        if og_desc and og_desc.get('content'):
-            return og_desc['content']
-        
-        # Primeiro parágrafo
-        p = soup.find('p')
-        if p:
-            return p.get_text(strip=True)[:500]
-        
-        return ''
-    
-    def _extract_text(self, soup: BeautifulSoup) -> str:
-        """Extrai todo o texto relevante da página."""
-        # Tenta encontrar conteúdo principal
-        main_content = None
-        
-        # Procura por tags comuns de conteúdo
-        for selector in ['article', 'main', '[role="main"]', '.content', '#content']:
-            main_content = soup.select_one(selector)
-            if main_content:
+    def _fetch(self, url: str, cached: Optional[Dict]) -> Optional[Dict[str, str]]:
+        """
+        Faz o GET (condicional se houver entrada no cache) e a extração.
+        
+        Args:
+            url: URL da página
+            cached: Entrada do cache HTTP (None para uma requisição incondicional)
+            
+        Returns:
+            Extração da página, ou None se o 304 não pôde ser aproveitado (ver _not_modified)
+        """
+        headers = self._conditional_headers(cached)
+        
+        # Faz requisição HTTP (corpo lido em streaming)
+        response = self.session.get(url, timeout=self.timeout, headers=headers, stream=True)
+        
+        try:
+            if response.status_code == 304 and cached:
+                return self._not_modified(url, cached)
+            
+            response.raise_for_status()
+            self._count('revalidate' if headers else 'miss')
+            
+            encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '') else None
+            complete = True
+            if self.parse_workers:
+                # Download aqui, parse (CPU, preso ao GIL) num processo do pool
+                body = self._read_body(response.iter_content(chunk_size=self.chunk_size))
+                result = self._parse_body(url, body, encoding=encoding)
+            elif self.cacheable(response.headers):
+                # O corpo só é guardado para gravar no cache
+                received: List[bytes] = []
+                
+                def chunks():
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        received.append(chunk)
+                        yield chunk
+                
+                result = self._parse_stream(url, chunks(), encoding=encoding, buffered=True)
+                body = b''.join(received)
+                # Com parada antecipada o corpo guardado é só o início da página
+                complete = not result['fetch_stats']['stopped_early']
+            else:
+                body = None
+                result = self._parse_stream(
+                    url, response.iter_content(chunk_size=self.chunk_size), encoding=encoding
+                )
+        finally:
+            response.close()
+        
+        return self._store(url, body, result, response.headers, bool(headers), complete)
+    
+    def cacheable(self, headers) -> bool:
+        """True se a resposta vai para o cache HTTP (só com ETag ou Last-Modified)."""
+        return self.cache is not None and bool(headers.get('ETag') or headers.get('Last-Modified'))
+    
+    @staticmethod
+    def _conditional_headers(cached: Optional[Dict]) -> Dict[str, str]:
+        """Cabeçalhos If-None-Match / If-Modified-Since da entrada em cache."""
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+    
+    def _not_modified(self, url: str, cached: Dict) -> Optional[Dict[str, str]]:
+        """
+        Resposta 304: reaproveita a extração em cache (refeita se o extrator mudou).
+        
+        Returns:
+            Extração da página, ou None se o extrator mudou e o corpo em cache
+            é parcial (a página precisa ser baixada de novo)
+        """
+        extracted = cached['extracted']
+        outdated = extracted.get('extractor') != get_extractor(url).id
+        if outdated and not cached.get('complete', True):
+            logger.info("Página não modificada (304), mas o corpo em cache é parcial; baixando de novo")
+            return None
+        self._count('hit')
+        annotate(http_cache='hit')
+        self.cache.touch(url)
+        if outdated:
+            return self._reparse_cached(url, cached)
+        logger.info("Página não modificada (304), reaproveitando extração em cache")
+        return extracted
+    
+    def _store(self, url: str, body: Optional[bytes], result: Dict, headers,
+               conditional: bool, complete: bool = True) -> Dict[str, str]:
+        """
+        Grava o corpo e a extração no cache HTTP e registra as métricas da página.
+        
+        Só respostas com ETag ou Last-Modified são guardadas: sem validador
+        a entrada nunca seria reaproveitada por um 304.
+        
+        Args:
+            url: URL da página
+            body: Corpo lido (até max_bytes; None sem cache)
+            result: Extração feita do corpo
+            headers: Cabeçalhos da resposta (ETag, Last-Modified)
+            conditional: A requisição foi condicional (If-None-Match/If-Modified-Since)
+            complete: O corpo foi lido inteiro (False com parada antecipada do parse)
+            
+        Returns:
+            A própria extração
+        """
+        if body is not None and self.cacheable(headers):
+            self.cache.put(
+                url, body,
+                etag=headers.get('ETag'),
+                last_modified=headers.get('Last-Modified'),
+                extracted=result,
+                complete=complete
+            )
+        
+        stats = result['fetch_stats']
+        memory = {key: stats[key] for key in ('peak_kb', 'peak_kb_est') if key in stats}
+        annotate(http_cache='revalidate' if conditional else 'miss', bytes=stats['bytes'],
+                 parse_ms=stats['parse_ms'], **memory)
+        metrics = get_metrics()
+        metrics.observe('fetch_bytes', stats['bytes'])
+        metrics.observe('parse_seconds', stats['parse_ms'] / 1000)
+        logger.info(
+            "Extração concluída: %s palavras (%s KB lidos, parse %s ms%s%s)",
+            result['word_count'], stats['bytes'] // 1024, stats['parse_ms'],
+            ', truncado' if stats['truncated'] else '',
+            ', parada antecipada' if stats['stopped_early'] else ''
+        )
+        return result
+    
+    def _reparse_cached(self, url: str, cached: Dict) -> Dict[str, str]:
+        """Refaz a extração do corpo em cache quando as regras do extrator mudaram."""
+        body = self.cache.get_body(url)
+        if body is None:
+            return cached['extracted']
+        logger.info("Página não modificada (304), extrator atualizado: refazendo o parse do cache")
+        result = self._parse_body(url, body)
+        self.cache.put(url, body, etag=cached.get('etag'),
+                       last_modified=cached.get('last_modified'), extracted=result)
+        return result
+    
+    def _read_body(self, chunks: Iterable[bytes]) -> bytes:
+        """Lê o corpo da resposta até max_bytes (o parse trunca no mesmo ponto)."""
+        body = []
+        total = 0
+        for chunk in chunks:
+            body.append(chunk)
+            total += len(chunk)
+            if total >= self.max_bytes:
                 break
+        return b''.join(body)
+    
+    def _parse_body(self, url: str, content: bytes,
+                    encoding: Optional[str] = None) -> Dict[str, str]:
+        """
+        Faz o parse de um HTML já baixado, no pool de processos se configurado.
+        
+        Só os bytes e a URL atravessam o limite entre processos; o extrator é
+        escolhido no processo do pool pelo domínio da URL.
+        """
+        if not self.parse_workers:
+            return self._parse(url, content, encoding=encoding)
+        return self._parse_pool().submit(_parse_in_worker, url, content, encoding).result()
+    
+    def _parse_pool(self):
+        """Cria (uma vez) o pool de processos do parse."""
+        with self._pool_lock:
+            if self._pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                
+                # spawn: o processo atual já tem threads (fork não é seguro aqui)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.parse_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_parse_worker,
+                    initargs=(self.max_bytes, self.max_text_chars, self.chunk_size, self.trace_memory)
+                )
+                logger.debug("Pool de parse com %s processos", self.parse_workers)
+            return self._pool
+    
+    def _parse(self, url: str, content: bytes,
+               extractor: Optional[Extractor] = None,
+               encoding: Optional[str] = None) -> Dict[str, str]:
+        """
+        Faz o parse de um HTML já baixado.
+        
+        Args:
+            url: URL da página
+            content: Corpo HTML bruto
+            extractor: Regras de extração (padrão: escolhidas pelo domínio da URL)
+            encoding: Codificação declarada no Content-Type (opcional)
+            
+        Returns:
+            Dicionário com url, title, description, full_text e word_count
+        """
+        chunks = (content[i:i + self.chunk_size] for i in range(0, len(content), self.chunk_size))
+        return self._parse_stream(url, chunks, encoding=encoding, extractor=extractor)
+    
+    def _parse_stream(self, url: str, chunks: Iterable[bytes],
+                      encoding: Optional[str] = None,
+                      extractor: Optional[Extractor] = None,
+                      buffered: bool = False) -> Dict[str, str]:
+        """
+        Faz o parse incremental do HTML conforme os blocos chegam.
         
-        # Se não encontrou, usa body
-        if not main_content:
-            main_content = soup.find('body')
+        A leitura para ao atingir max_bytes ou assim que o handler tem as
+        seções do extrator, sem montar a árvore do documento.
         
-        if main_content:
-            # Extrai texto com espaços entre elementos
-            text = main_content.get_text(separator=' ', strip=True)
-            # Limpa espaços múltiplos
-            text = ' '.join(text.split())
-            return text
+        Args:
+            url: URL da página
+            chunks: Blocos de bytes do corpo
+            encoding: Codificação declarada no Content-Type (opcional)
+            extractor: Regras de extração (padrão: escolhidas pelo domínio da URL)
+            buffered: Os blocos também são guardados por quem chama (para o
+                cache), o que entra na estimativa de pico de memória
+            
+        Returns:
+            Dicionário com url, title, description, full_text, word_count,
+            sections, extractor e fetch_stats (bytes, truncated,
+            stopped_early, parse_ms, peak_kb_est e, só quando medido com
+            tracemalloc, peak_kb)
+        """
+        extractor = extractor or get_extractor(url)
+        handler = extractor.handler(self.max_text_chars)
+        parser = None
+        
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        
+        total = 0
+        truncated = False
+        peak_chunk = 0
+        parse_seconds = 0.0
+        try:
+            for chunk in chunks:
+                if total + len(chunk) > self.max_bytes:
+                    chunk = chunk[:self.max_bytes - total]
+                    truncated = True
+                total += len(chunk)
+                peak_chunk = max(peak_chunk, len(chunk))
+                
+                if parser is None:
+                    parser = etree.HTMLParser(
+                        target=handler, encoding=encoding or sniff_encoding(chunk)
+                    )
+                
+                started = time.perf_counter()
+                parser.feed(chunk)
+                parse_seconds += time.perf_counter() - started
+                
+                if truncated or handler.done:
+                    break
+            
+            if parser is not None:
+                started = time.perf_counter()
+                parser.close()
+                parse_seconds += time.perf_counter() - started
+        finally:
+            if tracing:
+                peak_bytes = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        
+        # Estimativa (não é medição): maior bloco + texto acumulado
+        # (+ o corpo inteiro, se quem chama o guarda para o cache)
+        estimated_bytes = peak_chunk + sum(handler.lengths.values())
+        if buffered:
+            estimated_bytes += total
+        
+        sections = handler.section_texts()
+        title = (handler.meta.get('og:title')
+                 or normalize(''.join(handler.title_parts))
+                 or normalize(''.join(handler.h1_parts))
+                 or 'Sem título')
+        description = (handler.meta.get('description')
+                       or handler.meta.get('og:description')
+                       or normalize(''.join(handler.first_p_parts))[:500])
+        if sections.get('description'):
+            # O extrator do site sabe onde está a descrição; a meta tag costuma ser genérica
+            description = sections['description'][:500]
+        full_text = handler.main_text()
         
-        return ''
+        result = {
+            'url': url,
+            'title': title,
+            'description': description,
+            'full_text': full_text,
+            'word_count': len(full_text.split()),
+            'sections': sections if not extractor.first_only else {},
+            'extractor': extractor.id,
+            'fetch_stats': {
+                'bytes': total,
+                'truncated': truncated,
+                'stopped_early': handler.done and not truncated,
+                'parse_ms': round(parse_seconds * 1000, 1),
+                'peak_kb_est': round(estimated_bytes / 1024, 1),
+            }
+        }
+        if tracing:
+            # Medição do tracemalloc (de todo o processo enquanto durou este parse)
+            result['fetch_stats']['peak_kb'] = round(peak_bytes / 1024, 1)
+        return result
+    
+    def _count(self, outcome: str) -> None:
+        with self._stats_lock:
+            self._cache_stats[outcome] += 1
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Retorna os contadores do cache HTTP desta execução.
+        
+        Returns:
+            Dict com hit (304), revalidate (página mudou, 200 em requisição
+            condicional) e miss (requisição sem validadores)
+        """
+        with self._stats_lock:
+            return dict(self._cache_stats)
     
     def close(self):
-        """Fecha a sessão HTTP."""
+        """Fecha a sessão HTTP e o pool de parse."""
         self.session.close()
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
 
 
 def extract_mod_content(url: str) -> Dict[str, str]:
     """
     Função de conveniência para extrair conteúdo de mod.
     
+    Reaproveita o WebScraper (e sua sessão HTTP) do registro do processo.
+    
     Args:
         url: URL da página do mod
         
     Returns:
         Dicionário com informações do mod
     """
-    scraper = WebScraper()
-    try:
-        return scraper.extract_content(url)
-    finally:
-        scraper.close()
+    return get_scraper().extract_content(url)
+
+
+def get_scraper() -> WebScraper:
+    """Retorna o WebScraper compartilhado do processo."""
+    return registry.get_or_create(
+        ('scraper',), lambda: WebScraper(cache=get_default_http_cache())
+    )
@@ -0,0 +1,6 @@
+"""Configuração dos testes: os módulos de src/ são importados pelo nome, como em main.py."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
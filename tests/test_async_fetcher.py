@@ -0,0 +1,95 @@
+"""Testes dos redirecionamentos no AsyncFetcher (limites e robots.txt por salto)."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from async_fetcher import AsyncFetcher, RobotsDisallowedError
+from http_cache import HTTPCache
+from web_scraper import WebScraper
+
+PAGE = b'<html><head><title>Mod</title></head><body><article>Adds new hair.</article></body></html>'
+
+
+def start_server(routes, log):
+    """Servidor local: routes mapeia caminho -> (status, cabeçalhos, corpo)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            log.append((self.server.server_address[1], self.path))
+            status, headers, body = routes.get(self.path, (404, {}, b''))
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+
+@pytest.fixture
+def sites():
+    log = []
+    target_routes = {
+        '/robots.txt': (200, {}, b'User-agent: *\nDisallow: /blocked\n'),
+        '/page': (200, {'Content-Type': 'text/html', 'ETag': '"v1"'}, PAGE),
+        '/blocked': (200, {'Content-Type': 'text/html'}, PAGE),
+    }
+    target, target_url = start_server(target_routes, log)
+    origin_routes = {
+        '/start': (301, {'Location': f"{target_url}/page"}, b''),
+        '/bad': (302, {'Location': f"{target_url}/blocked"}, b''),
+        '/loop': (302, {'Location': '/loop'}, b''),
+    }
+    origin, origin_url = start_server(origin_routes, log)
+    yield origin_url, target_url, log
+    origin.shutdown()
+    target.shutdown()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    scraper = WebScraper(cache=HTTPCache(str(tmp_path / 'http')), parse_workers=0)
+    fetcher = AsyncFetcher(scraper=scraper, crawl_delay=0, respect_robots=True)
+    yield fetcher
+    fetcher.close()
+    scraper.close()
+
+
+def test_cross_host_redirect_goes_through_the_target_host(sites, fetcher):
+    origin_url, target_url, log = sites
+
+    result = fetcher.extract_content(f"{origin_url}/start")
+
+    assert result['title'] == 'Mod'
+    assert (int(target_url.rsplit(':', 1)[1]), '/robots.txt') in log
+    assert set(fetcher._hosts) == {origin_url, target_url}
+    stats = fetcher.stats()
+    assert stats['redirected'] == 1 and stats['fetched'] == 1
+    # O cache fica com a URL pedida, como no WebScraper
+    assert fetcher.scraper.cache.get(f"{origin_url}/start") is not None
+
+
+def test_redirect_to_a_disallowed_url_is_blocked(sites, fetcher):
+    origin_url, target_url, log = sites
+
+    with pytest.raises(RobotsDisallowedError):
+        fetcher.extract_content(f"{origin_url}/bad")
+
+    assert (int(target_url.rsplit(':', 1)[1]), '/blocked') not in log
+    assert fetcher.stats()['robots_blocked'] == 1
+
+
+def test_redirect_loop_is_bounded(sites, fetcher):
+    origin_url, _, _ = sites
+
+    with pytest.raises(httpx.TooManyRedirects):
+        fetcher.extract_content(f"{origin_url}/loop")
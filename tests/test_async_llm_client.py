@@ -0,0 +1,123 @@
+"""Testes do AsyncLLMClient e da etapa de classificação do BatchRunner com --async-llm."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import async_llm_client
+from async_llm_client import AsyncLLMClient
+from batch_runner import BatchRunner
+from classification_cache import ClassificationCache
+from main import ModClassifierPipeline
+from prompt_builder import SpendingCap
+from rate_limit import ProviderRateLimiter, TokenBucket
+
+CLASSIFICATION = {
+    'priority': 3, 'priority_label': 'Verde', 'score': 4, 'remocao': 2,
+    'framework': 0, 'essencial': 2, 'sub_category': '3C',
+    'sub_category_label': 'Família', 'mod_name': 'Mod de teste',
+    'creator': '', 'notes_reason': 'Classificação do teste.',
+}
+
+MOD = {'url': 'https://example.com/mods/1', 'title': 'Family Mod',
+       'description': 'Adds family interactions.', 'full_text': 'Family interactions for sims.'}
+
+
+class FakeCompletions:
+    """chat.completions do AsyncOpenAI, respondendo com as mensagens dadas."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.bodies = []
+
+    async def create(self, **body):
+        self.bodies.append(body)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20, prompt_tokens_details=None)
+        message = SimpleNamespace(content=self.replies.pop(0))
+        return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv('LLM_API_KEY', 'test')
+    monkeypatch.setenv('LLM_MODEL', 'gpt-4o-mini')
+    client = AsyncLLMClient(cache=ClassificationCache(str(tmp_path / 'cache.sqlite3')))
+    yield client
+    client.close()
+
+
+def fake_sdk(client, *replies):
+    completions = FakeCompletions(*replies)
+    client._async_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return completions
+
+
+def test_submit_shares_cache_key_and_spend_cap_with_sync_client(client):
+    completions = fake_sdk(client, json.dumps(CLASSIFICATION))
+    cap = SpendingCap(1.0)
+
+    result = client.submit(MOD, spend_cap=cap).result(timeout=10)
+
+    assert result['priority'] == 3
+    assert cap.spent > 0
+    # Mesma chave do classify_mod síncrono: a segunda chamada vem do cache
+    assert client.cache.get(client.cache_key(MOD)) == result
+    assert client.submit(MOD).result(timeout=10) == result
+    assert len(completions.bodies) == 1
+
+
+def test_ask_confidence_uses_its_own_cache_entry(client):
+    completions = fake_sdk(client, json.dumps(CLASSIFICATION), json.dumps(dict(CLASSIFICATION, confidence=0.9)))
+
+    client.submit(MOD).result(timeout=10)
+    result = client.submit(MOD, ask_confidence=True).result(timeout=10)
+
+    assert result['confidence'] == 0.9
+    assert client.cache_key(MOD) != client.cache_key(MOD, ask_confidence=True)
+    assert 'confidence' in completions.bodies[1]['messages'][-1]['content']
+
+
+def test_invalid_response_goes_through_parse_or_repair(client, monkeypatch):
+    fake_sdk(client, '{"priority": 3')
+    repaired = []
+
+    def parse_or_repair(response):
+        repaired.append(response)
+        return dict(CLASSIFICATION)
+
+    monkeypatch.setattr(client, 'parse_or_repair', parse_or_repair)
+    assert client.submit(MOD).result(timeout=10)['priority'] == 3
+    assert repaired == ['{"priority": 3']
+
+
+def test_unused_reserved_tokens_are_refunded(client):
+    fake_sdk(client, json.dumps(CLASSIFICATION))
+    # Bucket que praticamente não reabastece durante o teste
+    client.rate_limiter = ProviderRateLimiter(600, 600)
+    bucket = client.rate_limiter.tokens = TokenBucket(0.001, capacity=100000)
+    before = bucket._tokens
+
+    client.submit(MOD, use_cache=False).result(timeout=10)
+
+    # A reserva (entrada + max_output_tokens) volta, só os 120 tokens usados ficam
+    assert before - bucket._tokens == pytest.approx(120, abs=1)
+
+
+def test_batch_runner_classifies_through_async_client(client, tmp_path, monkeypatch):
+    fake_sdk(client, json.dumps(CLASSIFICATION), json.dumps(CLASSIFICATION))
+    monkeypatch.setattr(async_llm_client, 'get_async_llm_client', lambda: client)
+    monkeypatch.delenv('NOTION_API_KEY', raising=False)
+    monkeypatch.delenv('NOTION_TOKEN', raising=False)
+    pipeline = ModClassifierPipeline(use_cache=False, async_llm=True)
+    monkeypatch.setattr(pipeline, 'scrape', lambda url: dict(MOD, url=url))
+
+    output = tmp_path / 'results.jsonl'
+    counts = BatchRunner(pipeline, llm_workers=2).run(
+        [('https://example.com/mods/1', None), ('https://example.com/mods/2', None)], str(output)
+    )
+
+    assert counts['ok'] == 2
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert {r['classification']['priority'] for r in results} == {3}
+    assert client.usage_stats()['calls'] == 2
@@ -0,0 +1,110 @@
+"""Testes do parse e do reparo das respostas empacotadas (llm_packing)."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from classification_cache import ClassificationCache
+from classification_schema import ClassificationError
+from llm_client import LLMClient
+from llm_packing import PACKED_REPAIR_PROMPT, classify_packed, parse_packed_response
+
+CLASSIFICATION = {
+    'priority': 3, 'priority_label': 'Verde', 'score': 4, 'remocao': 2,
+    'framework': 0, 'essencial': 2, 'sub_category': '3C',
+    'sub_category_label': 'Família', 'mod_name': 'Mod de teste',
+    'creator': '', 'notes_reason': 'Classificação do teste.',
+}
+
+MODS = [
+    {'url': f'https://example.com/mods/{n}', 'title': f'Hair {n}',
+     'description': 'CAS hair.', 'full_text': 'New hairstyle.'}
+    for n in (1, 2, 3)
+]
+
+
+def packed(*items) -> str:
+    return json.dumps({'classifications': list(items)}, ensure_ascii=False)
+
+
+def item(item_id, **changes):
+    return dict(CLASSIFICATION, id=item_id, **changes)
+
+
+class FakeCompletions:
+    """chat.completions do OpenAI, respondendo com as mensagens dadas."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.bodies = []
+
+    def create(self, **body):
+        self.bodies.append(body)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20, prompt_tokens_details=None)
+        message = SimpleNamespace(content=self.replies.pop(0))
+        return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv('LLM_API_KEY', 'test')
+    monkeypatch.setenv('LLM_MODEL', 'gpt-4o-mini')
+    monkeypatch.setenv('LLM_STREAM', '0')
+    client = LLMClient(cache=ClassificationCache(str(tmp_path / 'cache.sqlite3')))
+    yield client
+    client.close()
+
+
+def fake_sdk(client, *replies):
+    completions = FakeCompletions(*replies)
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return completions
+
+
+def test_parse_ignores_fences_and_reports_item_errors():
+    response = '```json\n' + packed(item('1'), item('2', priority_label='Azul')) + '\n```'
+
+    results, errors = parse_packed_response(response, ['1', '2', '3'])
+
+    assert list(results) == ['1']
+    assert any(error.startswith('mod id=2: ') and 'priority_label' in error for error in errors)
+    assert 'mod id=3: classificação ausente' in errors
+
+
+def test_parse_rejects_response_without_list():
+    with pytest.raises(ClassificationError) as caught:
+        parse_packed_response('{"classifications": [{"id": "1",', ['1', '2'])
+    assert caught.value.response.startswith('{"classifications"')
+
+
+def test_invalid_items_are_repaired_once_before_classifying_alone(client):
+    completions = fake_sdk(
+        client,
+        packed(item('1'), item('2', sub_category='')),
+        packed(item('1', priority=5, priority_label='Roxo', sub_category='5A'), item('2'), item('3')),
+    )
+
+    results = classify_packed(client, MODS, pack_size=3)
+
+    assert len(completions.bodies) == 2
+    repair = completions.bodies[1]
+    assert repair['messages'][0]['content'] == PACKED_REPAIR_PROMPT
+    assert 'mod id=2: ' in repair['messages'][1]['content']
+    assert 'mod id=3: classificação ausente' in repair['messages'][1]['content']
+    # O item válido da primeira resposta não é trocado pelo da correção
+    assert [result['priority'] for result in results] == [3, 3, 3]
+    assert client.usage_stats()['repairs'] == 1
+
+
+def test_malformed_pack_is_repaired_instead_of_reclassified(client):
+    completions = fake_sdk(
+        client,
+        'Aqui está: {"classifications": [' + json.dumps(item('1')) + ',',
+        packed(item('1'), item('2'), item('3')),
+    )
+
+    results = classify_packed(client, MODS, pack_size=3)
+
+    assert len(completions.bodies) == 2
+    assert all(result['notes_reason'] == CLASSIFICATION['notes_reason'] for result in results)
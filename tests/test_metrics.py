@@ -0,0 +1,86 @@
+"""Testes dos spans nos caminhos que rodam fora da thread do mod (hedge e lotes coletados)."""
+
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import llm_client
+from batch_runner import BatchRunner
+from llm_hedging import Hedger
+from main import ModClassifierPipeline
+from metrics import annotate, span, trace
+
+CLASSIFICATION = {
+    'priority': 3, 'priority_label': 'Verde', 'score': 4, 'remocao': 2,
+    'framework': 0, 'essencial': 2, 'sub_category': '3C',
+    'sub_category_label': 'Família', 'mod_name': 'Mod de teste',
+    'creator': '', 'notes_reason': 'Classificação do teste.',
+}
+
+
+class FakeClient:
+    """LLMClient mínimo para o Hedger: uma chamada 'llm' que demora delay segundos."""
+
+    def __init__(self, model: str, delay: float):
+        self.model = model
+        self.delay = delay
+
+    def request_classification(self, user_message):
+        with span('llm', model=self.model):
+            time.sleep(self.delay)
+        annotate(retries=1)
+        return dict(CLASSIFICATION)
+
+    def charge_prediction(self, user_message, spend_cap):
+        pass
+
+
+@pytest.fixture
+def hedger():
+    hedger = Hedger(FakeClient('primario', delay=1.0), 'secundario', initial_delay=0.05)
+    hedger.secondary = lambda: FakeClient('secundario', delay=0)
+    yield hedger
+    hedger.close()
+
+
+def test_hedge_threads_continue_the_caller_trace(hedger):
+    with trace() as spans:
+        with span('classify'):
+            result = hedger.classify('mensagem')
+
+    assert result['model'] == 'secundario'
+    assert {'stage': 'llm', 'model': 'secundario'} in [
+        {key: value for key, value in s.items() if key in ('stage', 'model')} for s in spans
+    ]
+    # annotate() fora de um span da thread do hedge vai para o span de quem chamou
+    assert spans[-1]['stage'] == 'classify' and spans[-1]['retries'] >= 1
+
+
+def test_collected_paths_record_spans_per_mod(tmp_path, monkeypatch):
+    fake = SimpleNamespace(
+        hedger=lambda: None,
+        ensure_client=lambda: None,
+        classify_packed=lambda contents, **kwargs: [dict(CLASSIFICATION) for _ in contents],
+    )
+    monkeypatch.setattr(llm_client, 'get_llm_client', lambda *args, **kwargs: fake)
+    monkeypatch.delenv('NOTION_API_KEY', raising=False)
+    monkeypatch.delenv('NOTION_TOKEN', raising=False)
+    pipeline = ModClassifierPipeline(use_cache=False)
+
+    def scrape(url):
+        with span('scrape'):
+            return {'url': url, 'title': 'Hair', 'description': 'CAS hair.', 'full_text': url}
+
+    monkeypatch.setattr(pipeline, 'scrape', scrape)
+    output = tmp_path / 'results.jsonl'
+    counts = BatchRunner(pipeline).run_packed(
+        [('https://example.com/mods/1', None), ('https://example.com/mods/2', None)], str(output),
+        pack_size=2
+    )
+
+    assert counts['ok'] == 2
+    for result in (json.loads(line) for line in output.read_text().splitlines()):
+        assert [s['stage'] for s in result['metrics']] == ['scrape', 'classify']
+        assert result['metrics'][1]['mods'] == 2
@@ -0,0 +1,60 @@
+"""Testes da composição do Notes no NotionUpdater."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from notion_updater import NOTES_MAX_CHARS, NotionUpdater, already_written
+
+CLASSIFICATION = {
+    'priority': 3, 'priority_label': 'Verde', 'sub_category': '3C',
+    'sub_category_label': 'Família', 'notes_reason': 'Classificação do teste.',
+}
+
+
+class FakePages:
+    """pages do SDK do Notion com uma única página em memória."""
+
+    def __init__(self, notes: str):
+        self.notes = notes
+        self.updates = []
+
+    def retrieve(self, page_id):
+        rich_text = [{'plain_text': self.notes}] if self.notes else []
+        return {'properties': {'Notes': {'type': 'rich_text', 'rich_text': rich_text}}}
+
+    def update(self, page_id, properties):
+        self.updates.append(properties)
+        self.notes = properties['Notes']['rich_text'][0]['text']['content']
+
+
+@pytest.fixture
+def updater(monkeypatch):
+    monkeypatch.setenv('NOTION_RPS', '1000')
+    return NotionUpdater(api_key='secret_test', database_id='db')
+
+
+def test_write_marker_survives_notes_over_the_limit(updater):
+    old_notes = 'Anotação antiga. ' * 150
+    assert len(old_notes) > NOTES_MAX_CHARS
+    pages = FakePages(old_notes)
+    updater.client = SimpleNamespace(pages=pages)
+
+    assert updater.update_page('page', CLASSIFICATION, write_id='3f2a9c1b7d4e')
+    assert updater.update_page('page', CLASSIFICATION, write_id='3f2a9c1b7d4e')
+
+    assert len(pages.updates) == 1
+    assert len(pages.notes) == NOTES_MAX_CHARS
+    assert already_written(pages.notes, '3f2a9c1b7d4e')
+    assert pages.notes.endswith('Justificativa: Classificação do teste.')
+
+
+def test_long_new_block_keeps_its_header(updater):
+    classification = dict(CLASSIFICATION, notes_reason='x' * (NOTES_MAX_CHARS + 100))
+
+    properties = updater._compose_update('Notas antigas', classification, write_id='abc123')
+
+    notes = properties['Notes']['rich_text'][0]['text']['content']
+    assert len(notes) == NOTES_MAX_CHARS
+    assert notes.startswith('[Classificação Automática - ')
+    assert already_written(notes, 'abc123')
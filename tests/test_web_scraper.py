@@ -0,0 +1,91 @@
+"""Testes do cache HTTP no WebScraper (validadores, contadores e corpos parciais)."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_cache import HTTPCache
+from web_scraper import WebScraper
+
+ARTICLE = b'<html><head><title>Mod</title></head><body><article>Adds new hair.</article>'
+FILLER = b'<div>' + b'x' * 200_000 + b'</div></body></html>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    """/plain sem validadores; /etag e /long com ETag (304 se não mudou)."""
+
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        validated = self.path != '/plain'
+        if validated and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = ARTICLE + (FILLER if self.path == '/long' else b'</body></html>')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if validated:
+            self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def scraper(tmp_path):
+    scraper = WebScraper(cache=HTTPCache(str(tmp_path / 'http')), chunk_size=4096, parse_workers=0)
+    scraper.session.trust_env = False
+    yield scraper
+    scraper.close()
+
+
+def test_response_without_validators_is_not_cached(server, scraper):
+    scraper.extract_content(f"{server}/plain")
+    scraper.extract_content(f"{server}/plain")
+
+    assert scraper.cache.get(f"{server}/plain") is None
+    assert scraper.cache_stats() == {'hit': 0, 'revalidate': 0, 'miss': 2}
+
+
+def test_etag_response_is_revalidated(server, scraper):
+    first = scraper.extract_content(f"{server}/etag")
+    second = scraper.extract_content(f"{server}/etag")
+
+    assert second == first
+    assert Handler.requests == [('/etag', None), ('/etag', '"v1"')]
+    assert scraper.cache_stats() == {'hit': 1, 'revalidate': 0, 'miss': 1}
+
+
+def test_partial_body_is_refetched_when_the_extractor_changes(server, scraper):
+    url = f"{server}/long"
+    result = scraper.extract_content(url)
+    assert result['fetch_stats']['stopped_early']
+    cached = scraper.cache.get(url)
+    assert cached['complete'] is False
+
+    # Entrada gravada por uma versão anterior do extrator
+    body = scraper.cache.get_body(url)
+    scraper.cache.put(url, body, etag='"v1"', last_modified=None,
+                      extracted=dict(cached['extracted'], extractor='antigo'), complete=False)
+
+    refreshed = scraper.extract_content(url)
+
+    assert refreshed['extractor'] == result['extractor']
+    assert Handler.requests == [('/long', None), ('/long', '"v1"'), ('/long', None)]
+    assert scraper.cache_stats() == {'hit': 0, 'revalidate': 0, 'miss': 2}